@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+"""Compares the peak memory of decoding a large /get response
+the old way (decode everything, then build dict based articles)
+with the streaming decoder and the slotted Article"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import dataclasses
+import tracemalloc
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import pocket
+import jsonstream
+import mock_pocket
+
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclasses.dataclass
+class LegacyArticle:
+    """The Article as it was before: a plain dataclass with a list of tags"""
+    item_id: str
+    given_url: str
+    resolved_url: str
+    given_title: str
+    resolved_title: str
+    tags: List[str]
+    time_added: str
+    rename_status: pocket.RenameStatus = pocket.RenameStatus.UNCHANGED
+
+def make_payload(num_items: int) -> bytes:
+    """Builds a /get response with num_items synthetic items
+
+    Arguments:
+        num_items {int} -- Number of items
+
+    Returns:
+        bytes -- The encoded response
+    """
+    rng = random.Random(42)
+    items = {}
+    for idx in range(num_items):
+        item = mock_pocket.make_item(idx, rng)
+        items[item['item_id']] = item
+    return json.dumps({'status': 1, 'complete': 1, 'list': items, 'since': 1600000000}).encode('utf-8')
+
+def decode_legacy(payload: bytes) -> list:
+    items = json.loads(payload)['list']
+    return [LegacyArticle(item_id,
+                          a['given_url'],
+                          a['resolved_url'],
+                          a.get('given_title'),
+                          a.get('resolved_title'),
+                          [*a.get('tags', {})],
+                          a.get('time_added'))
+            for item_id, a in items.items()]
+
+def decode_streaming(payload: bytes) -> list:
+    decoder = jsonstream.ListDecoder()
+    articles = []
+    view = memoryview(payload)
+    for offset in range(0, len(payload), CHUNK_SIZE):
+        for item_id, article_data in decoder.feed(bytes(view[offset:offset+CHUNK_SIZE])):
+            articles.append(pocket.Pocket._parse_item(item_id, article_data)[0])
+    decoder.close()
+    return articles
+
+def measure(decode, payload: bytes):
+    """Measures peak and retained memory of a decode function
+
+    Returns:
+        Tuple[int, int] -- Peak and retained bytes
+    """
+    tracemalloc.start()
+    articles = decode(payload)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del articles
+    return peak, retained
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=100000, help='Number of items (default: 100000)')
+    args = parser.parse_args()
+    payload = make_payload(args.items)
+    print(f'{args.items} items, payload {len(payload) / 2**20:.1f} MiB')
+    results = {}
+    for name, decode in (('legacy', decode_legacy), ('streaming', decode_streaming)):
+        peak, retained = measure(decode, payload)
+        results[name] = peak
+        print(f'{name:>10}: peak {peak / 2**20:7.1f} MiB, retained {retained / 2**20:7.1f} MiB')
+    print(f'Peak reduced by {1 - results["streaming"] / results["legacy"]:.0%}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+
+"""Measures list downloads, renames and TUI drawing against the local mock API.
+Results are written as JSON, pass an earlier result file with --compare to see regressions"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import random
+import argparse
+import tempfile
+import platform
+import subprocess
+import tracemalloc
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import bulk
+import pocket
+import pocket_rename
+import mock_pocket
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+# Number of articles renamed by the rename benchmarks
+DEFAULT_RENAMES = 200
+# Size of the list the renames of a mapping file are picked from, per rename
+RENAME_FILE_LIST_FACTOR = 15
+# Changes smaller than this are reported as noise
+DEFAULT_THRESHOLD = 0.1
+
+# Metrics where a larger value is better, lower is better for all others
+HIGHER_IS_BETTER = {'renames_per_second'}
+
+Result = Dict[str, float]
+
+
+class NullWindow:
+    """Stands in for a curses window, so drawing can be measured without a terminal.
+    Only the time spent in the app is measured, not the terminal output"""
+
+    def __init__(self, rows: int = 50, cols: int = 200):
+        self.size = (rows, cols)
+        self.calls = 0
+
+    def getmaxyx(self):
+        return self.size
+
+    def _call(self, *args):
+        self.calls += 1
+
+    addstr = move = clrtoeol = refresh = scroll = setscrreg = scrollok = _call
+
+def best_of(repeat: int, run: Callable[[], float]) -> float:
+    """Runs a measurement several times
+
+    Returns:
+        float -- The fastest run
+    """
+    return min(run() for _ in range(repeat))
+
+def mock_app(server: mock_pocket.MockPocketServer) -> pocket.Pocket:
+    pocket.BASE_URL = server.base_url
+    return pocket.Pocket('mock-consumer-key', access_token=mock_pocket.ACCESS_TOKEN)
+
+def bench_get_articles(size: int, latency: float, repeat: int) -> Result:
+    """Downloads the whole list"""
+    library = mock_pocket.MockLibrary(size, archived_ratio=0)
+    with mock_pocket.MockPocketServer(library, latency=latency) as server:
+
+        async def get_articles():
+            async with mock_app(server) as app:
+                return await app.get_articles()
+
+        def timed():
+            start = time.perf_counter()
+            asyncio.run(get_articles())
+            return time.perf_counter() - start
+        seconds = best_of(repeat, timed)
+        tracemalloc.start()
+        articles = asyncio.run(get_articles())
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # Body sizes of all runs, per download
+        runs = repeat + 1
+        wire = server.bytes_sent / runs
+        decoded = server.bytes_encoded / runs
+    assert len(articles) == size
+    return {'seconds': seconds, 'peak_mib': peak / 2**20, 'wire_mib': wire / 2**20, 'decoded_mib': decoded / 2**20}
+
+def bench_rename(mode: str, renames: int, latency: float) -> Result:
+    """Renames articles one after another ('single'), concurrently ('concurrent')
+    or batched through rename_articles ('bulk')"""
+    library = mock_pocket.MockLibrary(renames, archived_ratio=0)
+    with mock_pocket.MockPocketServer(library, latency=latency) as server:
+
+        async def run():
+            async with mock_app(server) as app:
+                articles = await app.get_articles()
+                start = time.perf_counter()
+                if mode == 'single':
+                    for article in articles:
+                        await app.rename_article(article, f'Renamed {article.item_id}')
+                elif mode == 'concurrent':
+                    await asyncio.gather(*(app.rename_article(a, f'Renamed {a.item_id}')
+                                           for a in articles))
+                else:
+                    await app.rename_articles([(a, f'Renamed {a.item_id}') for a in articles])
+                return time.perf_counter() - start
+        seconds = asyncio.run(run())
+    return {'seconds': seconds, 'renames_per_second': renames / seconds}
+
+def bench_rename_file(renames: int, latency: float) -> Result:
+    """Renames articles spread over a larger list from a mapping file, as --rename-file does.
+    The list is loaded without details, so the /get requests show whether the tags are
+    loaded together or again for every rename"""
+    library = mock_pocket.MockLibrary(renames * RENAME_FILE_LIST_FACTOR, archived_ratio=0)
+    item_ids = list(library.items)[::RENAME_FILE_LIST_FACTOR][:renames]
+    with tempfile.TemporaryDirectory() as directory, \
+            mock_pocket.MockPocketServer(library, latency=latency) as server:
+        mapping_path = os.path.join(directory, 'mapping.jsonl')
+        with open(mapping_path, mode='w', encoding='utf-8') as mapping_file:
+            for item_id in item_ids:
+                mapping_file.write(json.dumps({'item_id': item_id, 'title': f'Renamed {item_id}'}) + '\n')
+
+        async def run():
+            async with mock_app(server) as app:
+                start = time.perf_counter()
+                summary = await bulk.rename_from_file(app, mapping_path, os.path.join(directory, 'results.jsonl'))
+                return time.perf_counter() - start, summary
+        seconds, summary = asyncio.run(run())
+        get_requests = server.requests.get('/get', 0)
+    assert summary == {'SUCCESS': renames}, summary
+    # Listing and loading the tags take a few pages, not one request per rename
+    assert get_requests < renames / 4, f'{get_requests} /get requests for {renames} renames'
+    return {'seconds': seconds, 'renames_per_second': renames / seconds, 'get_requests': get_requests}
+
+def bench_tui(size: int, repeat: int) -> Result:
+    """Builds the list view and measures drawing, scrolling and filtering"""
+    rng = random.Random(42)
+    articles = [pocket.Pocket._parse_article(item['item_id'], item)
+                for item in (mock_pocket.make_item(idx, rng) for idx in range(size))]
+    window = NullWindow()
+    start = time.perf_counter()
+    view = pocket_rename.ArticleListView(window, articles)
+    build = time.perf_counter() - start
+
+    def draw():
+        start = time.perf_counter()
+        view.draw()
+        return time.perf_counter() - start
+
+    def scroll():
+        view.select(0)
+        steps = min(size - 1, 1000)
+        start = time.perf_counter()
+        for idx in range(1, steps + 1):
+            view.select(idx)
+        return (time.perf_counter() - start) / steps
+
+    def search():
+        view.set_filter(None)
+        start = time.perf_counter()
+        # Typed character by character, as in the TUI
+        query = 'synthetic 12'
+        for end in range(1, len(query) + 1):
+            view.set_filter(query[:end])
+        return time.perf_counter() - start
+
+    return {
+        'build_seconds': build,
+        'draw_ms': best_of(repeat, draw) * 1000,
+        'scroll_step_ms': best_of(repeat, scroll) * 1000,
+        'filter_ms': best_of(repeat, search) * 1000
+    }
+
+def run_suite(sizes: List[int], renames: int, latency: float, repeat: int, only: List[str]) -> Dict[str, Result]:
+    """Runs the selected benchmarks
+
+    Returns:
+        Dict[str, Result] -- Metrics by benchmark name
+    """
+    benchmarks = {}
+    for size in sizes:
+        benchmarks[f'get_articles/{size}'] = lambda size=size: bench_get_articles(size, latency, repeat)
+    for mode in ('single', 'concurrent', 'bulk'):
+        benchmarks[f'rename_{mode}/{renames}'] = lambda mode=mode: bench_rename(mode, renames, latency)
+    benchmarks[f'rename_file/{renames}'] = lambda: bench_rename_file(renames, latency)
+    for size in sizes:
+        benchmarks[f'tui/{size}'] = lambda size=size: bench_tui(size, repeat)
+    results = {}
+    for name, benchmark in benchmarks.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results[name] = benchmark()
+        metrics = ', '.join(f'{metric} {value:.4g}' for metric, value in results[name].items())
+        print(f'{name:>24}: {metrics}')
+    return results
+
+def compare(baseline: Dict[str, Result], results: Dict[str, Result], threshold: float) -> int:
+    """Prints the changes against a baseline
+
+    Returns:
+        int -- Number of regressions
+    """
+    regressions = 0
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            if not old:
+                continue
+            change = value / old - 1
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            verdict = ''
+            if change > threshold:
+                verdict = 'REGRESSION'
+                regressions += 1
+            elif change < -threshold:
+                verdict = 'improved'
+            print(f'{name:>24} {metric:>20}: {old:10.4g} -> {value:10.4g} {verdict}')
+    return regressions
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='Comma separated list sizes (default: 1000,10000,100000)')
+    parser.add_argument('--renames', type=int, default=DEFAULT_RENAMES,
+                        help=f'Articles renamed per rename benchmark (default: {DEFAULT_RENAMES})')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Seconds the mock server delays every request (default: 0)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per timing, the best counts (default: 3)')
+    parser.add_argument('--only', action='append', default=[], metavar='PREFIX',
+                        help='Only run benchmarks starting with PREFIX, e.g. tui or get_articles/1000')
+    parser.add_argument('--output', help='Result file (default: results/<timestamp>.json)')
+    parser.add_argument('--compare', metavar='FILE', help='Earlier result file to compare with')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Relative change reported as regression (default: 0.1)')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = run_suite(sizes, args.renames, args.latency, args.repeat, args.only)
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S.json'))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump({
+            'meta': {
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'latency': args.latency,
+                'repeat': args.repeat
+            },
+            'results': results
+        }, file, indent=4)
+    print(f'Results written to {output}')
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['results']
+        if compare(baseline, results, args.threshold):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,476 @@
+#!/usr/bin/env python
+
+"""Local stand-in for the Pocket API, serving a synthetic library.
+Implements /get, /add, /send and /oauth/* closely enough for the app and the benchmarks,
+and can slow down or fail requests to see how the client copes"""
+
+import json
+import zlib
+import time
+import random
+import argparse
+import threading
+from urllib import parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Iterable, List, Tuple
+
+TAGS = ('news', 'tech', 'python', 'longread', 'recipes', 'science', 'to-watch')
+
+# Members of an item only sent with detailType complete
+COMPLETE_ONLY = ('tags', 'authors', 'image', 'images', 'domain_metadata')
+
+# Rate limit reported in the X-Limit-* headers, per hour
+DEFAULT_RATE_LIMIT = 100000
+
+# Content codings the server can answer with, most preferred first
+try:
+    import brotli
+    ENCODINGS = ('br', 'gzip', 'deflate')
+except ImportError:
+    brotli = None
+    ENCODINGS = ('gzip', 'deflate')
+
+REQUEST_TOKEN = 'mock-request-token'
+ACCESS_TOKEN = 'mock-access-token'
+USERNAME = 'mock-user'
+
+Item = Dict[str, any]
+
+def compress(content: bytes, encoding: str) -> bytes:
+    """Compresses a response body
+
+    Arguments:
+        content {bytes} -- The body
+        encoding {str} -- One of ENCODINGS
+
+    Returns:
+        bytes -- The compressed body
+    """
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(content) + compressor.flush()
+    if encoding == 'deflate':
+        return zlib.compress(content)
+    return brotli.compress(content, quality=5)
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    """Picks the content coding for an Accept-Encoding header
+
+    Arguments:
+        accept_encoding {str} -- The header, might be None
+
+    Returns:
+        str -- One of ENCODINGS, None if the body is sent uncompressed
+    """
+    accepted = set()
+    for coding in (accept_encoding or '').split(','):
+        name, _, quality = coding.strip().partition(';')
+        if quality.strip().replace(' ', '') in ('q=0', 'q=0.0'):
+            continue
+        accepted.add(name.strip().lower())
+    return next((encoding for encoding in ENCODINGS if encoding in accepted), None)
+
+
+def make_item(idx: int, rng: random.Random) -> Item:
+    """Builds a synthetic /get item
+
+    Arguments:
+        idx {int} -- Number of the item, determines id, URL and timestamp
+        rng {random.Random} -- Source of the random word count and tags
+
+    Returns:
+        Item -- The item as returned by /get
+    """
+    item_id = str(1000000 + idx)
+    url = f'https://example{idx % 500}.com/articles/{idx}'
+    return {
+        'item_id': item_id,
+        'resolved_id': item_id,
+        'given_url': url,
+        'given_title': '',
+        'resolved_title': f'Synthetic article number {idx}',
+        'resolved_url': url,
+        'excerpt': 'Lorem ipsum dolor sit amet ' * 4,
+        'status': '0',
+        'time_added': str(1500000000 + idx),
+        'word_count': str(rng.randint(100, 5000)),
+        'tags': {tag: {'item_id': item_id, 'tag': tag}
+                 for tag in rng.sample(TAGS, rng.randint(0, 3))},
+        'authors': {str(idx % 97): {
+            'item_id': item_id, 'author_id': str(idx % 97),
+            'name': f'Author {idx % 97}', 'url': f'https://example{idx % 500}.com/authors/{idx % 97}'}},
+        'image': {'item_id': item_id, 'src': f'https://example{idx % 500}.com/images/{idx}.jpg',
+                  'width': '1200', 'height': '800'},
+        'images': {'1': {'item_id': item_id, 'image_id': '1',
+                         'src': f'https://example{idx % 500}.com/images/{idx}.jpg',
+                         'width': '1200', 'height': '800', 'credit': '', 'caption': ''}},
+        'domain_metadata': {'name': f'Example {idx % 500}',
+                            'logo': f'https://example{idx % 500}.com/logo.png'}
+    }
+
+def _domain(url: str) -> str:
+    host = parse.urlsplit(url or '').hostname or ''
+    return host[4:] if host.startswith('www.') else host
+
+class MockLibrary:
+    """The list of a single account. Every change is stamped with a logical clock,
+    which is used as the since value of /get"""
+
+    def __init__(self,
+                 num_items: int = 1000,
+                 seed: int = 42,
+                 archived_ratio: float = 0.2,
+                 fixed_title_domains: Iterable[str] = ()):
+        """
+        Keyword Arguments:
+            num_items {int} -- Number of items to generate (default: {1000})
+            seed {int} -- Seed of the generated content (default: {42})
+            archived_ratio {float} -- Share of archived items (default: {0.2})
+            fixed_title_domains {Iterable[str]} -- Domains whose pages keep their
+            resolved title when re-added with a new one, like Pocket does for
+            pages it can parse (default: {()})
+        """
+        rng = random.Random(seed)
+        self.fixed_title_domains = frozenset(fixed_title_domains)
+        self.clock = 1600000000
+        self.items = {}
+        self._updated = {}
+        self._by_url = {}
+        # Sorted /get results, paging through the list reuses them until the next change
+        self._results = {}
+        for idx in range(num_items):
+            item = make_item(idx, rng)
+            if rng.random() < archived_ratio:
+                item['status'] = '1'
+            self._store(item)
+
+    def _tick(self) -> int:
+        self.clock += 1
+        self._results.clear()
+        return self.clock
+
+    def _store(self, item: Item):
+        self.items[item['item_id']] = item
+        self._updated[item['item_id']] = self.clock
+        self._by_url[item['given_url']] = item['item_id']
+
+    def get(self, params: Dict[str, any]) -> Dict[str, any]:
+        """Handles /get
+
+        Arguments:
+            params {Dict[str, any]} -- state, since, search, tag, domain, sort,
+            detailType, offset and count are supported
+
+        Returns:
+            Dict[str, any] -- The response
+        """
+        state = params.get('state', 'unread')
+        statuses = {'unread': ('0',), 'archive': ('1',), 'all': ('0', '1')}[state]
+        since = params.get('since')
+        if since is not None:
+            # Deltas include deleted items
+            since = int(since)
+            statuses += ('2',)
+        newest_first = params.get('sort', 'newest') != 'oldest'
+        search = (params.get('search') or '').lower()
+        tag = params.get('tag')
+        domain = (params.get('domain') or '').lower()
+        key = (statuses, since, search, tag, domain, newest_first)
+        items = self._results.get(key)
+        if items is None:
+            items = [item for item_id, item in self.items.items()
+                     if item['status'] in statuses
+                     and (since is None or self._updated[item_id] > since)
+                     and (not search
+                          or search in item.get('resolved_title', '').lower()
+                          or search in item.get('given_url', '').lower())
+                     and (tag is None
+                          or (tag == '_untagged_' and not item.get('tags'))
+                          or tag in item.get('tags', {}))
+                     and (not domain or _domain(item.get('resolved_url')) == domain)]
+            items.sort(key=lambda item: int(item.get('time_added') or 0), reverse=newest_first)
+            self._results[key] = items
+        offset = int(params.get('offset', 0))
+        count = params.get('count')
+        items = items[offset:] if count is None else items[offset:offset + int(count)]
+        if params.get('detailType', 'simple') == 'simple':
+            items = [{name: value for name, value in item.items() if name not in COMPLETE_ONLY}
+                     for item in items]
+        return {
+            'status': 1,
+            'complete': 1,
+            # Pocket sends an empty array instead of an empty object
+            'list': {item['item_id']: item for item in items} or [],
+            'since': self.clock
+        }
+
+    def add(self, params: Dict[str, any]) -> Item:
+        """Adds an item or updates the existing item with the same URL
+
+        Arguments:
+            params {Dict[str, any]} -- url, title, tags and time
+
+        Returns:
+            Item -- The added item
+        """
+        url = params['url']
+        self._tick()
+        item_id = self._by_url.get(url)
+        title = params.get('title') or ''
+        resolved_title = title
+        if item_id is None:
+            item_id = str(1000000 + len(self.items))
+        elif parse.urlsplit(url).hostname in self.fixed_title_domains:
+            resolved_title = self.items[item_id]['resolved_title']
+        tags = [tag.strip() for tag in (params.get('tags') or '').split(',') if tag.strip()]
+        item = {
+            'item_id': item_id,
+            'resolved_id': item_id,
+            'given_url': url,
+            'given_title': title,
+            'resolved_title': resolved_title,
+            'title': resolved_title,
+            'resolved_url': url,
+            'excerpt': '',
+            'status': '0',
+            'time_added': str(params.get('time') or self.clock),
+            'word_count': '0',
+            'tags': {tag: {'item_id': item_id, 'tag': tag} for tag in tags}
+        }
+        self._store(item)
+        return item
+
+    def send(self, actions: List[Dict[str, any]]) -> Tuple[List[any], List[any]]:
+        """Handles /send
+
+        Arguments:
+            actions {List[Dict[str, any]]} -- The actions
+
+        Returns:
+            Tuple[List[any], List[any]] -- Result and error of every action
+        """
+        results = []
+        errors = []
+        for action in actions:
+            try:
+                results.append(self._apply(action))
+                errors.append(None)
+            except (KeyError, ValueError) as exception:
+                results.append(False)
+                errors.append({'message': str(exception), 'type': 'Bad Request', 'code': 422})
+        return results, errors
+
+    def _apply(self, action: Dict[str, any]) -> any:
+        name = action.get('action')
+        if name == 'add':
+            return self.add(action)
+        if name == 'tag_rename':
+            old_tag, new_tag = action['old_tag'], action['new_tag']
+            for item_id, item in self.items.items():
+                if old_tag in item.get('tags', {}):
+                    item['tags'][new_tag] = item['tags'].pop(old_tag)
+                    self._updated[item_id] = self._tick()
+            return True
+        item = self.items[action['item_id']]
+        if item['status'] == '2':
+            raise KeyError(f'Item {action["item_id"]} was deleted')
+        tags = [tag.strip() for tag in (action.get('tags') or '').split(',') if tag.strip()]
+        if name == 'delete':
+            self.items[item['item_id']] = {'item_id': item['item_id'], 'status': '2'}
+            del self._by_url[item['given_url']]
+        elif name == 'archive':
+            item['status'] = '1'
+        elif name == 'readd':
+            item['status'] = '0'
+        elif name in ('tags_add', 'tags_replace', 'tags_remove', 'tags_clear'):
+            if name in ('tags_replace', 'tags_clear'):
+                item['tags'] = {}
+            for tag in tags:
+                if name == 'tags_remove':
+                    item['tags'].pop(tag, None)
+                else:
+                    item['tags'][tag] = {'item_id': item['item_id'], 'tag': tag}
+        else:
+            raise ValueError(f'Unsupported action {name}')
+        self._updated[item['item_id']] = self._tick()
+        return True
+
+class MockPocketServer:
+    """Serves a MockLibrary over HTTP on localhost from a background thread.
+    Use as a context manager, or call start() and stop()"""
+
+    def __init__(self,
+                 library: MockLibrary = None,
+                 latency: float = 0.0,
+                 error_rate: float = 0.0,
+                 rate_limit: int = DEFAULT_RATE_LIMIT,
+                 host: str = '127.0.0.1',
+                 port: int = 0,
+                 seed: int = None,
+                 compression: bool = True):
+        """
+        Keyword Arguments:
+            library {MockLibrary} -- The served list, 1000 generated items if not set (default: {None})
+            latency {float} -- Seconds every request is delayed (default: {0.0})
+            error_rate {float} -- Share of requests answered with a 503 error (default: {0.0})
+            rate_limit {int} -- Requests per hour reported in the X-Limit-* headers (default: {DEFAULT_RATE_LIMIT})
+            host {str} -- Interface to listen on (default: {'127.0.0.1'})
+            port {int} -- Port to listen on, a free one if 0 (default: {0})
+            seed {int} -- Seed of the injected errors (default: {None})
+            compression {bool} -- Compress bodies when the client accepts it (default: {True})
+        """
+        self.library = library if library is not None else MockLibrary()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.compression = compression
+        self.requests = {}
+        # Response body bytes before and after compression
+        self.bytes_encoded = 0
+        self.bytes_sent = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._window_start = time.time()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to use instead of pocket.BASE_URL"""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/v3'
+
+    def start(self) -> 'MockPocketServer':
+        """Starts serving in a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving and closes the socket"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'MockPocketServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.stop()
+
+    def _limit_headers(self) -> Dict[str, str]:
+        now = time.time()
+        if now - self._window_start >= 3600:
+            self._window_start = now
+            self._calls = 0
+        self._calls += 1
+        remaining = str(max(0, self.rate_limit - self._calls))
+        reset = str(int(3600 - (now - self._window_start)))
+        headers = {}
+        for bucket in ('User', 'Key'):
+            headers[f'X-Limit-{bucket}-Limit'] = str(self.rate_limit)
+            headers[f'X-Limit-{bucket}-Remaining'] = remaining
+            headers[f'X-Limit-{bucket}-Reset'] = reset
+        return headers
+
+    def handle(self, path: str, params: Dict[str, any]) -> Tuple[int, Dict[str, str], Dict[str, any]]:
+        """Answers a request
+
+        Arguments:
+            path {str} -- Request path
+            params {Dict[str, any]} -- Decoded request body
+
+        Returns:
+            Tuple[int, Dict[str, str], Dict[str, any]] -- Status code, headers and body
+        """
+        endpoint = path[len('/v3'):] if path.startswith('/v3') else path
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            headers = self._limit_headers()
+            if self.error_rate and self._rng.random() < self.error_rate:
+                headers['X-Error'] = 'Injected error'
+                return 503, headers, {'error': 'Injected error'}
+            if endpoint == '/oauth/request':
+                return 200, headers, {'code': REQUEST_TOKEN}
+            if endpoint == '/oauth/authorize':
+                return 200, headers, {'access_token': ACCESS_TOKEN, 'username': USERNAME}
+            if params.get('access_token') != ACCESS_TOKEN:
+                headers['X-Error'] = 'Invalid access token'
+                return 401, headers, {'error': 'Invalid access token'}
+            if endpoint == '/get':
+                return 200, headers, self.library.get(params)
+            if endpoint == '/add':
+                return 200, headers, {'status': 1, 'item': self.library.add(params)}
+            if endpoint == '/send':
+                results, errors = self.library.send(params.get('actions', []))
+                return 200, headers, {
+                    'status': 1 if all(e is None for e in errors) else 0,
+                    'action_results': results,
+                    'action_errors': errors
+                }
+        return 404, headers, {'error': f'Unknown endpoint {endpoint}'}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in one segment, otherwise delayed ACKs
+            # add 40ms to every keep-alive request
+            disable_nagle_algorithm = True
+            wbufsize = -1
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                params = json.loads(body) if body else {}
+                status, headers, response = server.handle(self.path, params)
+                content = json.dumps(response).encode('utf-8')
+                encoded_size = len(content)
+                encoding = None
+                if server.compression:
+                    encoding = negotiate_encoding(self.headers.get('Accept-Encoding'))
+                if encoding is not None:
+                    content = compress(content, encoding)
+                with server._lock:
+                    server.bytes_encoded += encoded_size
+                    server.bytes_sent += len(content)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                if encoding is not None:
+                    self.send_header('Content-Encoding', encoding)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=1000, help='Number of items (default: 1000)')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on (default: 8080)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds every request is delayed')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests failing with 503')
+    parser.add_argument('--no-compression', action='store_true', help='Always send uncompressed bodies')
+    args = parser.parse_args()
+    server = MockPocketServer(MockLibrary(args.items),
+                              latency=args.latency,
+                              error_rate=args.error_rate,
+                              port=args.port,
+                              compression=not args.no_compression)
+    print(f'Serving {args.items} items at {server.base_url}, access token {ACCESS_TOKEN}')
+    with server:
+        try:
+            server._thread.join()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == '__main__':
+    main()
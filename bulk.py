@@ -0,0 +1,314 @@
+"""Renames many articles from a mapping file without user interaction"""
+
+import os
+import csv
+import json
+import asyncio
+import logging
+import dataclasses
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+import pocket
+import titlecache
+import urls
+
+LOGGER = logging.getLogger(__name__)
+
+# Number of renames running at the same time
+DEFAULT_CONCURRENCY = 8
+
+# Result status of mapping entries that weren't renamed
+NOT_FOUND = 'NOT_FOUND'
+# The article is renamed by a later entry of the mapping
+DUPLICATE = 'DUPLICATE'
+ERROR = 'ERROR'
+SKIPPED = 'SKIPPED'
+# Status of entries that would be renamed by a dry run
+PLANNED = 'PLANNED'
+# The article already has the requested title
+SAME_TITLE = 'SAME_TITLE'
+
+
+@dataclasses.dataclass
+class PlannedRename:
+    """A mapping entry matched against the list"""
+    key: str
+    title: str
+    article: pocket.Article = None
+    # Why the rename is expected to be a no-op, None if it should go ahead
+    skip_reason: str = None
+
+def mapping_key(row: Dict[str, str]) -> str:
+    """Builds the key identifying the article of a mapping entry
+
+    Arguments:
+        row {Dict[str, str]} -- The entry, with either an item_id or a url
+
+    Raises:
+        ValueError: The entry has neither
+
+    Returns:
+        str -- 'id:<item_id>' or 'url:<canonical url>'
+    """
+    if row.get('item_id'):
+        return f'id:{row["item_id"]}'
+    if row.get('url'):
+        return f'url:{urls.canonicalize_url(row["url"])}'
+    raise ValueError(f'Entry without item_id or url: {row}')
+
+def read_mapping(path: str) -> Iterator[Tuple[str, str]]:
+    """Streams a mapping file. CSV files need a header with item_id or url
+    and title columns, all other files are read as JSON lines with the same keys
+
+    Arguments:
+        path {str} -- The mapping file
+
+    Yields:
+        Tuple[str, str] -- The article key and its new title
+    """
+    with open(path, newline='', encoding='utf-8') as mapping_file:
+        if path.lower().endswith('.csv'):
+            rows = enumerate(csv.DictReader(mapping_file), start=1)
+        else:
+            rows = _read_json_lines(path, mapping_file)
+        for line_number, row in rows:
+            title = row.get('title') or row.get('new_title')
+            try:
+                key = mapping_key(row)
+            except ValueError as value_error:
+                LOGGER.warning(f'{path}:{line_number}: {value_error}')
+                continue
+            if not title:
+                LOGGER.warning(f'{path}:{line_number}: No title for {key}')
+                continue
+            yield key, title
+
+def _read_json_lines(path: str, lines: Iterator[str]) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Parses JSON lines, skipping and reporting the lines which aren't JSON objects"""
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as value_error:
+            LOGGER.warning(f'{path}:{line_number}: Invalid JSON: {value_error}')
+            continue
+        if not isinstance(row, dict):
+            LOGGER.warning(f'{path}:{line_number}: Expected an object with item_id or url, and title')
+            continue
+        yield line_number, row
+
+def read_checkpoint(path: str) -> Set[str]:
+    """Reads the keys of all finished entries
+
+    Arguments:
+        path {str} -- The checkpoint file
+
+    Returns:
+        Set[str] -- The finished keys, empty if there's no checkpoint yet
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding='utf-8') as checkpoint_file:
+        return {line.rstrip('\n') for line in checkpoint_file if line.strip()}
+
+def rename_status_names(status: pocket.RenameStatus) -> str:
+    """Formats a rename status
+
+    Arguments:
+        status {pocket.RenameStatus} -- The status
+
+    Returns:
+        str -- Names of all set flags, separated by |
+    """
+    return '|'.join(flag.name for flag in pocket.RenameStatus if flag in status)
+
+def predict_skip(article: pocket.Article,
+                 title: str,
+                 title_cache: titlecache.TitleCache = None,
+                 clean_url: bool = True) -> Optional[str]:
+    """Predicts if a rename would leave the title as it is
+
+    Arguments:
+        article {pocket.Article} -- The article
+        title {str} -- The new title
+
+    Keyword Arguments:
+        title_cache {titlecache.TitleCache} -- Known outcomes of earlier renames (default: {None})
+        clean_url {bool} -- The article is re-added with its resolved url (default: {True})
+
+    Returns:
+        Optional[str] -- SAME_TITLE, or a reason from the title cache, None if the rename should go ahead
+    """
+    if article.get_title() == title:
+        return SAME_TITLE
+    if title_cache is None:
+        return None
+    return title_cache.predict(article.resolved_url if clean_url else article.given_url)
+
+async def plan_renames(app: pocket.Pocket,
+                       mapping_path: str,
+                       done: Set[str] = frozenset()) -> List[PlannedRename]:
+    """Matches the entries of a mapping file against the list in a single pass
+    and predicts which renames would be no-ops, using the title cache of app
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        mapping_path {str} -- CSV or JSON lines file with item_id or url, and title
+
+    Keyword Arguments:
+        done {Set[str]} -- Keys of entries to leave out (default: {frozenset()})
+
+    Returns:
+        List[PlannedRename] -- One plan per entry, later entries for the same article win.
+        Earlier ones, e.g. one by item_id and one by URL, are marked DUPLICATE
+    """
+    pending = {}
+    for key, title in read_mapping(mapping_path):
+        if key not in done:
+            pending[key] = title
+    found = {}
+    if pending:
+        async for article in app.iter_articles(state='all'):
+            for key in (f'id:{article.item_id}',
+                        f'url:{urls.canonicalize_url(article.given_url)}',
+                        f'url:{urls.canonicalize_url(article.resolved_url)}'):
+                if key in pending and key not in found:
+                    found[key] = article
+    plans = []
+    # The last entry of every article, the others would rename it at the same time
+    last_keys = {found[key].item_id: key for key in pending if key in found}
+    for key, title in pending.items():
+        article = found.get(key)
+        if article is None:
+            plans.append(PlannedRename(key, title, skip_reason=NOT_FOUND))
+        elif last_keys[article.item_id] != key:
+            plans.append(PlannedRename(key, title, article, DUPLICATE))
+        else:
+            plans.append(PlannedRename(key, title, article, predict_skip(article, title, app.title_cache)))
+    return plans
+
+async def plan_to_file(app: pocket.Pocket, mapping_path: str, results_path: str) -> Dict[str, int]:
+    """Writes the plan for a mapping file without renaming anything
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        mapping_path {str} -- CSV or JSON lines file with item_id or url, and title
+        results_path {str} -- JSON lines file the plan is written to
+
+    Returns:
+        Dict[str, int] -- Number of entries per planned status
+    """
+    summary = {}
+    with open(results_path, mode='w', encoding='utf-8') as results_file:
+        for plan in await plan_renames(app, mapping_path):
+            result = {'key': plan.key, 'title': plan.title}
+            if plan.article is not None:
+                result['item_id'] = plan.article.item_id
+                result['current_title'] = plan.article.get_title()
+            if plan.skip_reason is None:
+                result['status'] = PLANNED
+            elif plan.skip_reason in (NOT_FOUND, DUPLICATE):
+                result['status'] = plan.skip_reason
+            else:
+                result['status'] = SKIPPED
+                result['reason'] = plan.skip_reason
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+            results_file.write(json.dumps(result) + '\n')
+    return summary
+
+async def rename_from_file(app: pocket.Pocket,
+                           mapping_path: str,
+                           results_path: str,
+                           checkpoint_path: str = None,
+                           concurrency: int = DEFAULT_CONCURRENCY,
+                           skip_predicted: bool = True,
+                           progress: Callable[[Dict[str, str]], None] = None) -> Dict[str, int]:
+    """Renames all articles listed in a mapping file.
+    Every entry gets a line in the JSON lines results file. Finished entries are recorded
+    in the checkpoint, so an interrupted run continues where it stopped.
+    Renames predicted to leave the title unchanged are skipped, without being checkpointed
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        mapping_path {str} -- CSV or JSON lines file with item_id or url, and title
+        results_path {str} -- JSON lines file the results are appended to
+
+    Keyword Arguments:
+        checkpoint_path {str} -- File with the keys of finished entries
+        (default: {results_path + '.checkpoint'})
+        concurrency {int} -- Number of renames running at the same time (default: {DEFAULT_CONCURRENCY})
+        skip_predicted {bool} -- Skip renames predicted to be no-ops.
+        If False they are attempted and the prediction is added to the result (default: {True})
+        progress {Callable[[Dict[str, str]], None]} -- Called with every result
+        once it's written (default: {None})
+
+    Returns:
+        Dict[str, int] -- Number of entries per result status
+    """
+    if checkpoint_path is None:
+        checkpoint_path = results_path + '.checkpoint'
+    done = read_checkpoint(checkpoint_path)
+    plans = await plan_renames(app, mapping_path, done)
+    LOGGER.info(f'{len(plans)} renames pending, {len(done)} already done')
+    summary = {}
+    if not plans:
+        return summary
+    semaphore = asyncio.Semaphore(concurrency)
+    with open(results_path, mode='a', encoding='utf-8') as results_file, \
+            open(checkpoint_path, mode='a', encoding='utf-8') as checkpoint_file:
+
+        def record(key: str, result: Dict[str, str], finished: bool = True):
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+            results_file.write(json.dumps(dict(result, key=key)) + '\n')
+            results_file.flush()
+            # Failed entries are retried by the next run
+            if finished:
+                checkpoint_file.write(key + '\n')
+                checkpoint_file.flush()
+            if progress is not None:
+                progress(result)
+
+        async def rename(plan: PlannedRename):
+            key, article, title = plan.key, plan.article, plan.title
+            async with semaphore:
+                try:
+                    new_article = await app.rename_article(article, title)
+                except Exception as exception:
+                    LOGGER.error(f'Renaming {key} failed: {exception}')
+                    record(key, {
+                        'status': ERROR,
+                        'item_id': article.item_id,
+                        'title': title,
+                        'error': str(exception)
+                    }, finished=False)
+                    return
+                result = {
+                    'status': rename_status_names(new_article.rename_status),
+                    'item_id': new_article.item_id,
+                    'title': title,
+                    'new_title': new_article.get_title()
+                }
+                if plan.skip_reason is not None:
+                    result['predicted'] = plan.skip_reason
+                record(key, result)
+
+        renames = []
+        for plan in plans:
+            if plan.skip_reason == NOT_FOUND:
+                record(plan.key, {'status': NOT_FOUND, 'title': plan.title})
+            elif plan.skip_reason == DUPLICATE:
+                record(plan.key, {'status': DUPLICATE, 'item_id': plan.article.item_id, 'title': plan.title})
+            elif plan.skip_reason is not None and skip_predicted:
+                record(plan.key, {
+                    'status': SKIPPED,
+                    'reason': plan.skip_reason,
+                    'item_id': plan.article.item_id,
+                    'title': plan.title
+                }, finished=False)
+            else:
+                renames.append(plan)
+        # Loads the tags of all articles in a few large requests instead of one per rename
+        for plan, article in zip(renames, await app.hydrate([plan.article for plan in renames])):
+            plan.article = article
+        await asyncio.gather(*(rename(plan) for plan in renames))
+    return summary
@@ -0,0 +1,731 @@
+"""Long-running service renaming, tagging and exporting for several accounts.
+Jobs are submitted through a small JSON API over HTTP or a Unix socket"""
+
+import os
+import re
+import hmac
+import json
+import time
+import signal
+import secrets
+import asyncio
+import logging
+import itertools
+import collections
+import dataclasses
+from http import HTTPStatus
+from urllib import parse
+from typing import Callable, Dict, List, Optional, Tuple
+import pocket
+import bulk
+import export
+import dedup
+import journal
+import tagging
+import metrics
+import ratelimit
+import titlecache
+import transports
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Jobs running at the same time, at most one per account
+DEFAULT_MAX_JOBS = 4
+# Finished jobs kept for status requests
+DEFAULT_JOB_HISTORY = 1000
+# Largest accepted request body
+MAX_BODY_SIZE = 1024 * 1024
+
+# Directory next to the config with the journal and title cache of every account
+ACCOUNTS_DIR_NAME = 'accounts'
+# Directory next to the config all files of jobs are kept in, paths outside it are refused
+JOBS_DIR_NAME = 'jobs'
+# File next to the config with the token clients authenticate with, readable only by the user
+TOKEN_FILE_NAME = 'daemon-token'
+JOURNAL_FILE_NAME = 'renames.sqlite'
+TITLE_CACHE_FILE_NAME = 'titles.sqlite'
+
+# Job states
+QUEUED = 'QUEUED'
+RUNNING = 'RUNNING'
+DONE = 'DONE'
+FAILED = 'FAILED'
+CANCELLED = 'CANCELLED'
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+# Result status of exported items
+EXPORTED = 'EXPORTED'
+
+# Parameters of the job kinds which are file paths
+JOB_PATHS = {
+    'rename': ('mapping', 'results', 'checkpoint'),
+    'export': ('path',)
+}
+
+JsonResponse = Tuple[int, Dict[str, any]]
+
+
+@dataclasses.dataclass
+class Job:
+    """A unit of work for one account"""
+    job_id: str
+    account: str
+    kind: str
+    params: Dict[str, any]
+    status: str = QUEUED
+    created: float = dataclasses.field(default_factory=time.time)
+    started: float = None
+    finished: float = None
+    # Items processed so far, and the total once known
+    done: int = 0
+    total: int = None
+    # Number of items per result status
+    summary: Dict[str, int] = dataclasses.field(default_factory=dict)
+    error: str = None
+
+    def count(self, status: str, value: int = 1):
+        """Records processed items
+
+        Arguments:
+            status {str} -- Result status of the items
+
+        Keyword Arguments:
+            value {int} -- Number of items (default: {1})
+        """
+        self.done += value
+        self.summary[status] = self.summary.get(status, 0) + value
+
+    def items_per_second(self) -> float:
+        """Returns the throughput while the job was running
+
+        Returns:
+            float -- Processed items per second, 0 if the job hasn't started
+        """
+        if self.started is None:
+            return 0.0
+        elapsed = (self.finished or time.time()) - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, any]:
+        """Returns the job in a JSON serializable form
+
+        Returns:
+            Dict[str, any] -- The job
+        """
+        return dict(dataclasses.asdict(self), items_per_second=round(self.items_per_second(), 2))
+
+class Account:
+    """A Pocket instance with its own rate budget and job queue"""
+
+    def __init__(self, name: str, app: pocket.Pocket):
+        """
+        Arguments:
+            name {str} -- Name the account is addressed by in jobs
+            app {pocket.Pocket} -- The pocket instance of the account
+        """
+        self.name = name
+        self.app = app
+        self.queue = collections.deque()
+        self.running = None
+        self.jobs_done = 0
+        self.items_done = 0
+        self.busy_seconds = 0.0
+
+    def to_dict(self) -> Dict[str, any]:
+        """Returns the account status in a JSON serializable form
+
+        Returns:
+            Dict[str, any] -- The status
+        """
+        status = {
+            'queued': len(self.queue),
+            'running': self.running.job_id if self.running is not None else None,
+            'jobs_done': self.jobs_done,
+            'items_done': self.items_done,
+            'items_per_second': round(self.items_done / self.busy_seconds, 2) if self.busy_seconds else 0.0,
+            'rate_limit': self.app.rate_limiter.status()
+        }
+        if isinstance(self.app.metrics, metrics.MetricsCollector):
+            status['requests'] = self.app.metrics.report()['endpoints']
+        return status
+
+async def run_rename(app: pocket.Pocket, job: Job):
+    """Renames the articles of a mapping file.
+    Parameters: mapping, results (default: mapping.results.jsonl),
+    checkpoint, concurrency and force, as for the bulk rename of the command line
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        job {Job} -- The job
+    """
+    params = job.params
+    await bulk.rename_from_file(
+        app,
+        params['mapping'],
+        params.get('results') or params['mapping'] + '.results.jsonl',
+        checkpoint_path=params.get('checkpoint'),
+        concurrency=params.get('concurrency', bulk.DEFAULT_CONCURRENCY),
+        skip_predicted=not params.get('force', False),
+        progress=lambda result: job.count(result['status']))
+
+def _tag_arguments(params: Dict[str, any]) -> Tuple[tagging.ArticleQuery, tagging.TagChange]:
+    """Builds the query and change of a tag job
+
+    Arguments:
+        params {Dict[str, any]} -- Parameters of the job
+
+    Raises:
+        ValueError: Invalid parameters
+
+    Returns:
+        Tuple[tagging.ArticleQuery, tagging.TagChange] -- The query and the change
+    """
+    query_fields = [field.name for field in dataclasses.fields(tagging.ArticleQuery)]
+    try:
+        query = tagging.ArticleQuery(**{name: params[name] for name in query_fields if name in params})
+        change = tagging.TagChange(params.get('add', ()), params.get('remove', ()), params.get('rename'))
+    except (TypeError, re.error) as exception:
+        raise ValueError(f'Invalid parameters for tag: {exception}') from exception
+    if change.rename is not None and len(change.rename) != 2:
+        raise ValueError('rename needs the old and the new tag')
+    return query, change
+
+async def run_tag(app: pocket.Pocket, job: Job):
+    """Adds, removes or renames tags on the articles matching a query.
+    Parameters: the ArticleQuery fields (tag, domain, title, older_than, newer_than
+    and item_ids), state (default: all), and add, remove and rename (old and new name)
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        job {Job} -- The job
+    """
+    query, change = _tag_arguments(job.params)
+    articles = await tagging.select(app, query, job.params.get('state', 'all'))
+    job.total = len(articles)
+    await tagging.retag(app, articles, change, progress=lambda result: job.count(result['status']))
+
+async def run_export(app: pocket.Pocket, job: Job):
+    """Writes the list to an NDJSON or CSV file while it's downloaded.
+    Parameters: path, and optionally format, fields, state (default: all) and offset
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        job {Job} -- The job
+    """
+    params = job.params
+    offset = params.get('offset', 0)
+
+    def progress(next_offset: int):
+        # An interrupted export is continued from offset + done
+        job.count(EXPORTED, next_offset - offset - job.done)
+
+    await export.export(
+        app,
+        params['path'],
+        params.get('format'),
+        params.get('fields'),
+        params.get('state', 'all'),
+        offset,
+        progress=progress)
+
+async def run_dedup(app: pocket.Pocket, job: Job):
+    """Merges the articles saved more than once.
+    Parameters: optionally state (default: all) and dry_run
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        job {Job} -- The job
+    """
+    await dedup.deduplicate(app,
+                            job.params.get('state', 'all'),
+                            dry_run=bool(job.params.get('dry_run')),
+                            progress=lambda result: job.count(result['status']))
+
+def _require(kind: str, *names: str) -> Callable[[Dict[str, any]], None]:
+    def check(params: Dict[str, any]):
+        missing = [name for name in names if name not in params]
+        if missing:
+            raise ValueError(f'Missing parameters for {kind}: {", ".join(missing)}')
+    return check
+
+# Job kinds with their runner and a check of their parameters, raising ValueError
+JOB_KINDS: Dict[str, Tuple[Callable, Callable[[Dict[str, any]], None]]] = {
+    'rename': (run_rename, _require('rename', 'mapping')),
+    'tag': (run_tag, _tag_arguments),
+    'export': (run_export, _require('export', 'path')),
+    'dedup': (run_dedup, _require('dedup'))
+}
+
+class Daemon:
+    """Queues jobs per account and runs them, taking turns between the accounts.
+    All accounts share one transport, and so its connection pool,
+    while every account has its own rate limiter"""
+
+    def __init__(self,
+                 accounts: Dict[str, pocket.Pocket],
+                 token: str,
+                 jobs_dir: str,
+                 transport: transports.Transport = None,
+                 max_jobs: int = DEFAULT_MAX_JOBS,
+                 job_history: int = DEFAULT_JOB_HISTORY):
+        """
+        Arguments:
+            accounts {Dict[str, pocket.Pocket]} -- Pocket instances by account name
+            token {str} -- Secret every request has to send as bearer token
+            jobs_dir {str} -- Directory the files of jobs are read from and written to.
+            Relative paths are resolved below it, paths outside it are refused
+
+        Keyword Arguments:
+            transport {transports.Transport} -- The transport shared by the accounts,
+            closed with the daemon (default: {None})
+            max_jobs {int} -- Jobs running at the same time (default: {DEFAULT_MAX_JOBS})
+            job_history {int} -- Finished jobs kept for status requests (default: {DEFAULT_JOB_HISTORY})
+        """
+        self.accounts = {name: Account(name, app) for name, app in accounts.items()}
+        self.token = token
+        self.jobs_dir = os.path.realpath(jobs_dir)
+        self.transport = transport
+        self.max_jobs = max_jobs
+        self.job_history = job_history
+        self.jobs = collections.OrderedDict()
+        self.started = time.time()
+        self._ids = itertools.count(1)
+        self._tasks = {}
+        # Account which got the last turn, the next one starts looking after it
+        self._last_account = None
+        # Set while shutting down, no more jobs are started then
+        self._closing = False
+
+    def submit(self, account: str, kind: str, params: Dict[str, any]) -> Job:
+        """Queues a job
+
+        Arguments:
+            account {str} -- Name of the account
+            kind {str} -- One of JOB_KINDS
+            params {Dict[str, any]} -- Parameters of the job
+
+        Raises:
+            ValueError: Unknown account or kind, or invalid parameters, or the daemon is shutting down
+
+        Returns:
+            Job -- The queued job
+        """
+        if self._closing:
+            raise ValueError('The daemon is shutting down')
+        if account not in self.accounts:
+            raise ValueError(f'Unknown account {account}')
+        if kind not in JOB_KINDS:
+            raise ValueError(f'Unknown job kind {kind}, expected one of {", ".join(JOB_KINDS)}')
+        JOB_KINDS[kind][1](params)
+        params = dict(params)
+        for name in JOB_PATHS.get(kind, ()):
+            if params.get(name) is not None:
+                params[name] = self.job_path(params[name])
+        job = Job(str(next(self._ids)), account, kind, params)
+        self.jobs[job.job_id] = job
+        self.accounts[account].queue.append(job)
+        LOGGER.info(f'Queued {kind} job {job.job_id} for {account}')
+        self._prune()
+        self._schedule()
+        return job
+
+    def job_path(self, path: str) -> str:
+        """Resolves a file path of a job below the jobs directory
+
+        Arguments:
+            path {str} -- The path, relative to the jobs directory
+
+        Raises:
+            ValueError: The path leads outside the jobs directory
+
+        Returns:
+            str -- The absolute path, with symbolic links resolved
+        """
+        if not isinstance(path, str) or not path:
+            raise ValueError(f'Invalid path {path!r}')
+        resolved = os.path.realpath(os.path.join(self.jobs_dir, path))
+        if os.path.commonpath((resolved, self.jobs_dir)) != self.jobs_dir or resolved == self.jobs_dir:
+            raise ValueError(f'{path} is not inside the jobs directory {self.jobs_dir}')
+        return resolved
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancels a queued or running job
+
+        Arguments:
+            job_id {str} -- Id of the job
+
+        Returns:
+            Optional[Job] -- The job, None if it doesn't exist
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+        if job.status == QUEUED:
+            self.accounts[job.account].queue.remove(job)
+            job.status = CANCELLED
+            job.finished = time.time()
+        else:
+            self._tasks[job_id].cancel()
+        return job
+
+    def _next_job(self) -> Optional[Job]:
+        """Picks the next job, round robin over the idle accounts with queued jobs
+
+        Returns:
+            Optional[Job] -- The job, None if no account can start one
+        """
+        names = list(self.accounts)
+        start = names.index(self._last_account) + 1 if self._last_account in self.accounts else 0
+        for offset in range(len(names)):
+            account = self.accounts[names[(start + offset) % len(names)]]
+            if account.running is None and account.queue:
+                self._last_account = account.name
+                return account.queue.popleft()
+        return None
+
+    def _schedule(self):
+        """Starts queued jobs while there are free slots"""
+        while not self._closing and len(self._tasks) < self.max_jobs:
+            job = self._next_job()
+            if job is None:
+                return
+            self.accounts[job.account].running = job
+            job.status = RUNNING
+            job.started = time.time()
+            task = self._tasks[job.job_id] = asyncio.ensure_future(self._run(job))
+            # Also called if the task is cancelled before _run() started
+            task.add_done_callback(lambda _, job=job: self._finish(job))
+
+    async def _run(self, job: Job):
+        LOGGER.info(f'Started {job.kind} job {job.job_id} for {job.account}')
+        try:
+            await JOB_KINDS[job.kind][0](self.accounts[job.account].app, job)
+            job.status = DONE
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+        except Exception as exception:
+            LOGGER.error(f'{job.kind} job {job.job_id} for {job.account} failed: {exception}')
+            job.status = FAILED
+            job.error = str(exception)
+
+    def _finish(self, job: Job):
+        """Records a finished job and starts the next ones"""
+        if job.status == RUNNING:
+            # Cancelled before it started
+            job.status = CANCELLED
+        job.finished = time.time()
+        account = self.accounts[job.account]
+        account.running = None
+        account.jobs_done += 1
+        account.items_done += job.done
+        if job.started is not None:
+            account.busy_seconds += job.finished - job.started
+        del self._tasks[job.job_id]
+        LOGGER.info(f'{job.kind} job {job.job_id} for {job.account} {job.status.lower()}: {job.summary}')
+        self._schedule()
+
+    def _prune(self):
+        """Forgets the oldest finished jobs beyond the history size"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.job_history)]:
+            del self.jobs[job_id]
+
+    def status(self) -> Dict[str, any]:
+        """Returns the state of the accounts and the overall throughput
+
+        Returns:
+            Dict[str, any] -- The status
+        """
+        uptime = time.time() - self.started
+        items_done = sum(account.items_done for account in self.accounts.values()) + \
+            sum(self.jobs[job_id].done for job_id in self._tasks)
+        return {
+            'uptime_s': round(uptime, 3),
+            'running': len(self._tasks),
+            'queued': sum(len(account.queue) for account in self.accounts.values()),
+            'items_done': items_done,
+            'items_per_second': round(items_done / uptime, 2) if uptime > 0 else 0.0,
+            'accounts': {name: account.to_dict() for name, account in self.accounts.items()}
+        }
+
+    def handle(self, method: str, path: str, body: Dict[str, any]) -> JsonResponse:
+        """Answers an API request.
+        GET /status, GET /jobs, POST /jobs, GET /jobs/<id> and DELETE /jobs/<id>
+
+        Arguments:
+            method {str} -- HTTP method
+            path {str} -- Request path
+            body {Dict[str, any]} -- Decoded request body
+
+        Returns:
+            JsonResponse -- Status code and body
+        """
+        parts = [part for part in path.split('/') if part]
+        if parts == ['status'] and method == 'GET':
+            return HTTPStatus.OK, self.status()
+        if parts == ['jobs'] and method == 'GET':
+            return HTTPStatus.OK, {'jobs': [job.to_dict() for job in self.jobs.values()]}
+        if parts == ['jobs'] and method == 'POST':
+            params = {name: value for name, value in body.items() if name not in ('account', 'kind')}
+            try:
+                job = self.submit(body.get('account'), body.get('kind'), params)
+            except ValueError as value_error:
+                return HTTPStatus.BAD_REQUEST, {'error': str(value_error)}
+            return HTTPStatus.CREATED, job.to_dict()
+        if len(parts) == 2 and parts[0] == 'jobs' and method in ('GET', 'DELETE'):
+            job = self.cancel(parts[1]) if method == 'DELETE' else self.jobs.get(parts[1])
+            if job is None:
+                return HTTPStatus.NOT_FOUND, {'error': f'Unknown job {parts[1]}'}
+            return HTTPStatus.OK, job.to_dict()
+        return HTTPStatus.NOT_FOUND, {'error': f'Unknown endpoint {method} {path}'}
+
+    def authorize(self, headers: Dict[str, str], own_origins: Tuple[str, ...] = ()) -> Optional[JsonResponse]:
+        """Checks that a request comes from a local client knowing the token, and not from
+        a web page: browsers send an Origin with cross-site requests, and can't send a
+        JSON content type or an Authorization header without the API allowing it
+
+        Arguments:
+            headers {Dict[str, str]} -- Request headers, with lower case names
+
+        Keyword Arguments:
+            own_origins {Tuple[str, ...]} -- Origins of the API itself, which are accepted (default: {()})
+
+        Returns:
+            Optional[JsonResponse] -- The error response, None if the request is allowed
+        """
+        origin = headers.get('origin')
+        if origin is not None and origin not in own_origins:
+            return HTTPStatus.FORBIDDEN, {'error': f'Requests from {origin} are not allowed'}
+        scheme, _, token = headers.get('authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode(), self.token.encode()):
+            return HTTPStatus.UNAUTHORIZED, {'error': f'Missing or wrong token, see {TOKEN_FILE_NAME}'}
+        content_type = headers.get('content-type', '').partition(';')[0].strip().lower()
+        if content_type != 'application/json':
+            return HTTPStatus.UNSUPPORTED_MEDIA_TYPE, {'error': 'Content-Type must be application/json'}
+        return None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serves the HTTP/1.1 requests of a connection"""
+        sockname = writer.get_extra_info('sockname')
+        own_origins = ()
+        if isinstance(sockname, tuple):
+            own_origins = (f'http://{sockname[0]}:{sockname[1]}', f'http://localhost:{sockname[1]}')
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                refused = self.authorize(headers, own_origins)
+                if refused is not None or length > MAX_BODY_SIZE:
+                    status, response = refused or (HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                                   {'error': 'Request body too large'})
+                    # The body isn't read, so the connection can't be reused
+                    headers['connection'] = 'close'
+                else:
+                    body = await reader.readexactly(length)
+                    try:
+                        decoded = json.loads(body) if body else {}
+                        if not isinstance(decoded, dict):
+                            raise ValueError('Expected a JSON object')
+                    except ValueError as value_error:
+                        status, response = HTTPStatus.BAD_REQUEST, {'error': f'Invalid body: {value_error}'}
+                    else:
+                        status, response = self.handle(method.upper(), parse.urlsplit(target).path, decoded)
+                content = json.dumps(response).encode('utf-8')
+                writer.write(
+                    f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+                    'Content-Type: application/json\r\n'
+                    f'Content-Length: {len(content)}\r\n\r\n'.encode('latin-1') + content)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as exception:
+            LOGGER.debug(f'Dropping API connection: {exception}')
+        finally:
+            writer.close()
+
+    async def serve(self,
+                    host: str = DEFAULT_HOST,
+                    port: int = DEFAULT_PORT,
+                    socket_path: str = None,
+                    started: Callable[[asyncio.AbstractServer], None] = None):
+        """Serves the API until cancelled, then cancels the running jobs and closes the accounts
+
+        Keyword Arguments:
+            host {str} -- Interface to listen on (default: {DEFAULT_HOST})
+            port {int} -- Port to listen on (default: {DEFAULT_PORT})
+            socket_path {str} -- Listen on this Unix socket instead of TCP (default: {None})
+            started {Callable[[asyncio.AbstractServer], None]} -- Called once
+            the server is listening (default: {None})
+        """
+        if socket_path is not None:
+            server = await asyncio.start_unix_server(self._handle_connection, path=socket_path)
+        else:
+            server = await asyncio.start_server(self._handle_connection, host, port)
+        LOGGER.info(f'Serving the job API on {socket_path or f"{host}:{port}"}')
+        if started is not None:
+            started(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.close()
+            if socket_path is not None and os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+    async def close(self):
+        """Cancels the queued and running jobs and closes all accounts and the transport"""
+        self._closing = True
+        for account in self.accounts.values():
+            for job in account.queue:
+                job.status = CANCELLED
+                job.finished = time.time()
+            account.queue.clear()
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for account in self.accounts.values():
+            await account.app.close(close_transport=False)
+        if self.transport is not None:
+            await self.transport.close()
+
+def load_accounts(config: Dict[str, any],
+                  config_dir: str,
+                  transport: transports.Transport) -> Dict[str, pocket.Pocket]:
+    """Creates a Pocket instance for every account of the config.
+    Accounts are listed under ACCOUNTS by name, each with an access_token
+    and optionally max_concurrency and consumer_key. Without ACCOUNTS, the access token
+    of the POCKET section is used as the account 'default'.
+    Accounts with the same consumer key share its rate limit, the user limit is per account
+
+    Arguments:
+        config {Dict[str, any]} -- The app config
+        config_dir {str} -- Directory of the config, the accounts' files are kept below it
+        transport {transports.Transport} -- Transport shared by all accounts
+
+    Returns:
+        Dict[str, pocket.Pocket] -- Pocket instances by account name
+    """
+    consumer_key = config.get('POCKET', {}).get('consumer_key')
+    accounts = config.get('ACCOUNTS')
+    if not accounts:
+        accounts = {'default': {'access_token': config.get('POCKET', {}).get('access_token')}}
+    apps = {}
+    # A limiter of every consumer key, the others share its Key limit
+    key_limiters = {}
+    for name, account in accounts.items():
+        account_dir = os.path.join(config_dir, ACCOUNTS_DIR_NAME, name)
+        os.makedirs(account_dir, exist_ok=True)
+        account_key = account.get('consumer_key', consumer_key)
+        rate_limiter = ratelimit.RateLimiter(account.get('max_concurrency', ratelimit.DEFAULT_CONCURRENCY),
+                                             shared=key_limiters.get(account_key))
+        key_limiters.setdefault(account_key, rate_limiter)
+        apps[name] = pocket.Pocket(
+            account_key,
+            access_token=account.get('access_token'),
+            transport=transport,
+            rate_limiter=rate_limiter,
+            metrics=metrics.MetricsCollector(),
+            journal=journal.RenameJournal(os.path.join(account_dir, JOURNAL_FILE_NAME)),
+            title_cache=titlecache.TitleCache(os.path.join(account_dir, TITLE_CACHE_FILE_NAME)))
+    return apps
+
+def write_token(path: str) -> str:
+    """Generates a new API token and writes it to a file only the user can read
+
+    Arguments:
+        path {str} -- The token file, replaced if it exists
+
+    Returns:
+        str -- The token
+    """
+    token = secrets.token_urlsafe(32)
+    if os.path.exists(path):
+        os.unlink(path)
+    # Created with the permissions right away, so the token is never readable by others
+    descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(descriptor, 'w') as file:
+        file.write(token)
+    return token
+
+async def check_accounts(accounts: Dict[str, pocket.Pocket]) -> List[str]:
+    """Validates the access tokens and finishes interrupted renames of all accounts
+
+    Arguments:
+        accounts {Dict[str, pocket.Pocket]} -- Pocket instances by account name
+
+    Returns:
+        List[str] -- Names of the accounts whose token is not valid
+    """
+    async def check(name: str, app: pocket.Pocket) -> bool:
+        try:
+            if not await app.validate_access_token():
+                LOGGER.error(f'The access token of {name} is not valid')
+                return False
+            if len(app.journal):
+                LOGGER.info(f'Finishing {len(app.journal)} interrupted renames of {name}')
+                await app.replay_journal()
+        except Exception as exception:
+            LOGGER.error(f'Error checking account {name}: {exception}')
+        return True
+
+    valid = await asyncio.gather(*(check(name, app) for name, app in accounts.items()))
+    return [name for name, is_valid in zip(accounts, valid) if not is_valid]
+
+async def run(config: Dict[str, any],
+              config_dir: str,
+              host: str = DEFAULT_HOST,
+              port: int = DEFAULT_PORT,
+              socket_path: str = None,
+              max_jobs: int = DEFAULT_MAX_JOBS):
+    """Runs the daemon for the accounts of a config until it's stopped
+
+    Arguments:
+        config {Dict[str, any]} -- The app config
+        config_dir {str} -- Directory of the config
+
+    Keyword Arguments:
+        host {str} -- Interface to listen on (default: {DEFAULT_HOST})
+        port {int} -- Port to listen on (default: {DEFAULT_PORT})
+        socket_path {str} -- Listen on this Unix socket instead of TCP (default: {None})
+        max_jobs {int} -- Jobs running at the same time (default: {DEFAULT_MAX_JOBS})
+    """
+    accounts_config = config.get('ACCOUNTS') or {'default': {}}
+    # Enough connections for every account to use its whole rate budget
+    pool_size = sum(account.get('max_concurrency', ratelimit.DEFAULT_CONCURRENCY)
+                    for account in accounts_config.values())
+    transport = transports.default_transport(pool_size=max(pool_size, transports.DEFAULT_POOL_SIZE))
+    accounts = load_accounts(config, config_dir, transport)
+    invalid = await check_accounts(accounts)
+    if invalid:
+        print(f'Accounts with invalid access tokens: {", ".join(invalid)}')
+    jobs_dir = os.path.join(config_dir, JOBS_DIR_NAME)
+    os.makedirs(jobs_dir, exist_ok=True)
+    token_path = os.path.join(config_dir, TOKEN_FILE_NAME)
+    token = write_token(token_path)
+    daemon = Daemon(accounts, token, jobs_dir, transport, max_jobs)
+    serving = asyncio.ensure_future(daemon.serve(
+        host, port, socket_path,
+        started=lambda _: print(f'Serving {len(accounts)} accounts on {socket_path or f"{host}:{port}"}, '
+                                f'token in {token_path}, job files in {jobs_dir}')))
+    loop = asyncio.get_event_loop()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, serving.cancel)
+    except (NotImplementedError, AttributeError):
+        # Not supported on Windows
+        pass
+    try:
+        await serving
+    except asyncio.CancelledError:
+        pass
@@ -0,0 +1,186 @@
+"""Finds articles saved more than once and merges them into one"""
+
+import logging
+from typing import Callable, Dict, Iterable, List
+import pocket
+import urls
+
+LOGGER = logging.getLogger(__name__)
+
+# Result status of every group of duplicates
+MERGED = 'MERGED'
+ERROR = 'ERROR'
+# Status of groups which would be merged by a dry run
+PLANNED = 'PLANNED'
+
+
+def _url_keys(article: pocket.Article) -> Iterable[str]:
+    return {urls.canonicalize_url(url) for url in (article.given_url, article.resolved_url) if url}
+
+def _succeeded(future) -> bool:
+    return future.exception() is None and bool(future.result())
+
+def find_duplicates(articles: Iterable[pocket.Article]) -> List[List[pocket.Article]]:
+    """Groups the articles pointing to the same page. Given and resolved URLs are canonicalized,
+    so tracking parameters, http and https, and redirects to the same page are recognized.
+    Articles sharing any of their URLs end up in the same group.
+    Every article is looked up once in an index of the URLs seen so far
+
+    Arguments:
+        articles {Iterable[pocket.Article]} -- The articles
+
+    Returns:
+        List[List[pocket.Article]] -- Groups of at least two articles, in the order they were first seen
+    """
+    # Union find over the articles, the index maps every URL to the first article it was seen on
+    parents = []
+    index = {}
+    ordered = []
+
+    def find(idx: int) -> int:
+        while parents[idx] != idx:
+            parents[idx] = parents[parents[idx]]
+            idx = parents[idx]
+        return idx
+
+    for article in articles:
+        idx = len(ordered)
+        ordered.append(article)
+        parents.append(idx)
+        for key in _url_keys(article):
+            other = index.setdefault(key, idx)
+            if other != idx:
+                root, other_root = find(idx), find(other)
+                if root != other_root:
+                    # The earlier group absorbs the later one, which keeps the groups in list order
+                    parents[max(root, other_root)] = min(root, other_root)
+    groups = {}
+    for idx, article in enumerate(ordered):
+        groups.setdefault(find(idx), []).append(article)
+    return [group for group in groups.values() if len(group) > 1]
+
+def pick_survivor(group: List[pocket.Article]) -> pocket.Article:
+    """Picks the article which is kept: the one saved first
+
+    Arguments:
+        group {List[pocket.Article]} -- The duplicates
+
+    Returns:
+        pocket.Article -- The earliest added article, on ties the one with the lowest id
+    """
+    return min(group, key=lambda a: (int(a.time_added or 0), int(a.item_id) if a.item_id.isdigit() else 0))
+
+def merged_tags(group: List[pocket.Article]) -> List[str]:
+    """Returns the tags of all articles in a group
+
+    Arguments:
+        group {List[pocket.Article]} -- The duplicates, with their tags
+
+    Returns:
+        List[str] -- The sorted union of the tags
+    """
+    return sorted({tag for article in group for tag in article.tags})
+
+async def merge(app: pocket.Pocket,
+                groups: List[List[pocket.Article]],
+                batch_size: int = pocket.DEFAULT_BATCH_SIZE,
+                dry_run: bool = False,
+                progress: Callable[[Dict[str, any]], None] = None) -> List[Dict[str, any]]:
+    """Merges every group into its survivor. First the tags of the other articles
+    are added to the survivors, then the other articles are deleted.
+    Both steps are sent batch_size actions at a time through /send.
+    The articles of a group are only deleted once the survivor has all their tags
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        groups {List[List[pocket.Article]]} -- The duplicates, see find_duplicates().
+        Articles loaded without tags are hydrated first
+
+    Keyword Arguments:
+        batch_size {int} -- Number of actions per request (default: {pocket.DEFAULT_BATCH_SIZE})
+        dry_run {bool} -- Only report what would be merged (default: {False})
+        progress {Callable[[Dict[str, any]], None]} -- Called with every result (default: {None})
+
+    Returns:
+        List[Dict[str, any]] -- One result per group, in the same order, with the status,
+        the survivor's item_id, title and URL, the added tags and the ids of the removed articles, or the error
+    """
+    hydrated = iter(await app.hydrate([article for group in groups for article in group]))
+    groups = [[next(hydrated) for _ in group] for group in groups]
+    results = []
+    # Groups whose survivor needs tags, with the future of the tags_add action
+    adding = []
+    async with app.batch(batch_size) as batch:
+        for group in groups:
+            survivor = pick_survivor(group)
+            result = {
+                'item_id': survivor.item_id,
+                'title': survivor.get_title(),
+                'url': survivor.resolved_url or survivor.given_url,
+                'removed': [a.item_id for a in group if a is not survivor],
+                'added_tags': []
+            }
+            results.append(result)
+            if not all(article.hydrated for article in group):
+                # Merging without knowing the tags could lose them
+                result['status'] = ERROR
+                result['error'] = 'The tags could not be loaded'
+                continue
+            result['added_tags'] = [tag for tag in merged_tags(group) if tag not in survivor.tags]
+            if dry_run:
+                result['status'] = PLANNED
+            elif result['added_tags']:
+                adding.append((result, batch.add('tags_add', {
+                    'item_id': survivor.item_id,
+                    'tags': ','.join(result['added_tags'])
+                })))
+    for result, future in adding:
+        if not _succeeded(future):
+            error = future.exception() or 'Pocket reported no result'
+            LOGGER.error(f'Adding the tags of the duplicates to {result["item_id"]} failed: {error}')
+            result['status'] = ERROR
+            result['error'] = str(error)
+    deleting = []
+    async with app.batch(batch_size) as batch:
+        for result in results:
+            if 'status' not in result:
+                deleting.append((result, [batch.add('delete', {'item_id': item_id})
+                                          for item_id in result['removed']]))
+    for result, futures in deleting:
+        failed = [item_id for item_id, future in zip(result['removed'], futures)
+                  if not _succeeded(future)]
+        if failed:
+            LOGGER.error(f'Removing the duplicates {", ".join(failed)} of {result["item_id"]} failed')
+            result['status'] = ERROR
+            result['error'] = f'Could not remove {", ".join(failed)}'
+            result['removed'] = [item_id for item_id in result['removed'] if item_id not in failed]
+        else:
+            result['status'] = MERGED
+    if progress is not None:
+        for result in results:
+            progress(result)
+    return results
+
+async def deduplicate(app: pocket.Pocket,
+                      state: str = 'all',
+                      batch_size: int = pocket.DEFAULT_BATCH_SIZE,
+                      dry_run: bool = False,
+                      progress: Callable[[Dict[str, any]], None] = None) -> List[Dict[str, any]]:
+    """Finds and merges all duplicates in the list.
+    The list is loaded without tags, only the duplicates are loaded with them
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+
+    Keyword Arguments:
+        state {str} -- 'unread', 'archive', or 'all' (default: {'all'})
+        batch_size {int} -- Number of actions per request (default: {pocket.DEFAULT_BATCH_SIZE})
+        dry_run {bool} -- Only report what would be merged (default: {False})
+        progress {Callable[[Dict[str, any]], None]} -- Called with every result (default: {None})
+
+    Returns:
+        List[Dict[str, any]] -- One result per group of duplicates, see merge()
+    """
+    groups = find_duplicates([article async for article in app.iter_articles(state)])
+    LOGGER.info(f'Found {len(groups)} groups of duplicates')
+    return await merge(app, groups, batch_size, dry_run, progress)
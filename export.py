@@ -0,0 +1,208 @@
+"""Writes the list to NDJSON or CSV files while it's downloaded"""
+
+import os
+import sys
+import csv
+import json
+import logging
+from typing import Callable, Dict, List, Sequence, TextIO
+import pocket
+
+LOGGER = logging.getLogger(__name__)
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+FORMATS = (NDJSON, CSV)
+
+# Fields written if none are selected, any other member of a /get item can be selected too
+DEFAULT_FIELDS = (
+    'item_id',
+    'given_url',
+    'resolved_url',
+    'given_title',
+    'resolved_title',
+    'tags',
+    'time_added',
+    'status'
+)
+# Fields only sent with detailType complete
+COMPLETE_FIELDS = ('tags', 'authors', 'images', 'image', 'videos', 'domain_metadata')
+
+
+def export_format(path: str) -> str:
+    """Guesses the format from a file name
+
+    Arguments:
+        path {str} -- The file name
+
+    Returns:
+        str -- CSV for .csv files, NDJSON for all others
+    """
+    return CSV if path.lower().endswith('.csv') else NDJSON
+
+def item_record(item_id: str, item: Dict[str, any], fields: Sequence[str]) -> Dict[str, any]:
+    """Picks the selected fields of a /get item
+
+    Arguments:
+        item_id {str} -- The item id
+        item {Dict[str, any]} -- The decoded item
+        fields {Sequence[str]} -- Names of the fields
+
+    Returns:
+        Dict[str, any] -- The fields, missing ones are None. Tags are a sorted list of names
+    """
+    record = {}
+    for field in fields:
+        if field == 'item_id':
+            record[field] = item_id
+        elif field == 'tags':
+            record[field] = sorted(item.get('tags') or ())
+        else:
+            record[field] = item.get(field)
+    return record
+
+class NdjsonWriter:
+    """Writes one JSON object per line"""
+
+    def __init__(self, file: TextIO, fields: Sequence[str]):
+        self.file = file
+        self.fields = fields
+
+    def write_header(self):
+        """NDJSON has no header"""
+
+    def write(self, record: Dict[str, any]):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+class CsvWriter:
+    """Writes one row per item. Tags are joined by commas, nested values are written as JSON"""
+
+    def __init__(self, file: TextIO, fields: Sequence[str]):
+        self.file = file
+        self.fields = fields
+        self._writer = csv.writer(file)
+
+    def write_header(self):
+        self._writer.writerow(self.fields)
+
+    def write(self, record: Dict[str, any]):
+        row = []
+        for field in self.fields:
+            value = record[field]
+            if value is None:
+                value = ''
+            elif field == 'tags':
+                value = ','.join(value)
+            elif isinstance(value, (dict, list)):
+                value = json.dumps(value, ensure_ascii=False)
+            row.append(value)
+        self._writer.writerow(row)
+
+WRITERS = {NDJSON: NdjsonWriter, CSV: CsvWriter}
+
+async def export_to_file(app: pocket.Pocket,
+                         file: TextIO,
+                         fmt: str = NDJSON,
+                         fields: Sequence[str] = DEFAULT_FIELDS,
+                         state: str = 'all',
+                         offset: int = 0,
+                         header: bool = True,
+                         page_size: int = pocket.DEFAULT_PAGE_SIZE,
+                         progress: Callable[[int], None] = None) -> int:
+    """Pages through /get, oldest items first, and writes every item as soon as its page arrives
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        file {TextIO} -- File the items are written to
+
+    Keyword Arguments:
+        fmt {str} -- NDJSON or CSV (default: {NDJSON})
+        fields {Sequence[str]} -- Fields written of every item (default: {DEFAULT_FIELDS})
+        state {str} -- 'unread', 'archive', or 'all' (default: {'all'})
+        offset {int} -- Number of items to skip, to continue an earlier export (default: {0})
+        header {bool} -- Write the CSV header (default: {True})
+        page_size {int} -- Number of items per request (default: {pocket.DEFAULT_PAGE_SIZE})
+        progress {Callable[[int], None]} -- Called with the offset to continue from after every page,
+        and with the rows written so far if interrupted (default: {None})
+
+    Returns:
+        int -- Number of items written
+    """
+    writer = WRITERS[fmt](file, fields)
+    if header:
+        writer.write_header()
+    # Simple listings are much smaller, if they have all selected fields
+    details = any(field in COMPLETE_FIELDS for field in fields)
+    written = 0
+    try:
+        async for item_id, item in app.iter_items(state, offset, page_size, details=details):
+            writer.write(item_record(item_id, item, fields))
+            written += 1
+            if progress is not None and written % page_size == 0:
+                file.flush()
+                progress(offset + written)
+    except BaseException:
+        # The rows of the interrupted page are written too, so a continued export starts after them
+        file.flush()
+        if progress is not None and written % page_size:
+            progress(offset + written)
+        raise
+    file.flush()
+    if progress is not None and written % page_size:
+        progress(offset + written)
+    return written
+
+async def export(app: pocket.Pocket,
+                 path: str,
+                 fmt: str = None,
+                 fields: Sequence[str] = None,
+                 state: str = 'all',
+                 offset: int = 0,
+                 page_size: int = pocket.DEFAULT_PAGE_SIZE,
+                 progress: Callable[[int], None] = None) -> int:
+    """Exports the list to a file. With an offset, the items are appended to the file,
+    so an interrupted export is continued by passing the number of items it wrote
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        path {str} -- The file, - for stdout
+
+    Keyword Arguments:
+        fmt {str} -- NDJSON or CSV, guessed from the file name if not set (default: {None})
+        fields {Sequence[str]} -- Fields written of every item (default: {DEFAULT_FIELDS})
+        state {str} -- 'unread', 'archive', or 'all' (default: {'all'})
+        offset {int} -- Number of items to skip (default: {0})
+        page_size {int} -- Number of items per request (default: {pocket.DEFAULT_PAGE_SIZE})
+        progress {Callable[[int], None]} -- Called with the offset to continue from after every page,
+        and with the rows written so far if interrupted (default: {None})
+
+    Raises:
+        ValueError: Unknown format
+
+    Returns:
+        int -- Number of items written
+    """
+    fmt = fmt or export_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown export format {fmt}, expected one of {", ".join(FORMATS)}')
+    fields = list(fields or DEFAULT_FIELDS)
+    if path == '-':
+        return await export_to_file(app, sys.stdout, fmt, fields, state, offset,
+                                    offset == 0, page_size, progress)
+    # A continued export appends to the rows already written
+    header = offset == 0 or not os.path.exists(path) or os.path.getsize(path) == 0
+    mode = 'w' if offset == 0 else 'a'
+    with open(path, mode=mode, encoding='utf-8', newline='') as file:
+        return await export_to_file(app, file, fmt, fields, state, offset, header, page_size, progress)
+
+def split_fields(fields: str) -> List[str]:
+    """Splits a comma separated list of field names
+
+    Arguments:
+        fields {str} -- The list, None or empty for the default fields
+
+    Returns:
+        List[str] -- The field names
+    """
+    names = [field.strip() for field in (fields or '').split(',') if field.strip()]
+    return names or list(DEFAULT_FIELDS)
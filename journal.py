@@ -0,0 +1,165 @@
+"""Write-ahead journal of renames, so an interrupted rename can be finished later"""
+
+import json
+import time
+import sqlite3
+import logging
+from typing import Iterable, List, Tuple
+import pocket
+
+LOGGER = logging.getLogger(__name__)
+
+# Number of completion marks collected before they are written
+DEFAULT_FINISH_BATCH_SIZE = 50
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS renames (
+    item_id TEXT PRIMARY KEY,
+    given_url TEXT,
+    resolved_url TEXT,
+    given_title TEXT,
+    resolved_title TEXT,
+    tags TEXT,
+    time_added TEXT,
+    new_title TEXT,
+    clean_url INTEGER,
+    started REAL
+);
+'''
+
+class RenameJournal:
+    """SQLite backed journal of renames in progress, keyed by item_id.
+    An entry holding the original article is written before the article is changed
+    and removed once the rename has finished. Entries still present on startup
+    belong to renames which were interrupted and can be replayed"""
+
+    def __init__(self, path: str, finish_batch_size: int = DEFAULT_FINISH_BATCH_SIZE):
+        """Opens (and creates if needed) the journal
+
+        Arguments:
+            path {str} -- Path of the SQLite database
+
+        Keyword Arguments:
+            finish_batch_size {int} -- Number of completion marks collected
+            before they are written (default: {DEFAULT_FINISH_BATCH_SIZE})
+        """
+        self.path = path
+        self.finish_batch_size = finish_batch_size
+        self._finished = set()
+        self._connection = sqlite3.connect(path)
+        # Entries have to be on disk before the article is changed
+        self._connection.execute('PRAGMA journal_mode = WAL')
+        self._connection.execute('PRAGMA synchronous = FULL')
+        self._connection.executescript(SCHEMA)
+
+    def __len__(self) -> int:
+        self.flush()
+        return self._connection.execute('SELECT COUNT(*) FROM renames').fetchone()[0]
+
+    def begin(self, article: pocket.Article, new_title: str, clean_url: bool = True):
+        """Records a rename before it is started
+
+        Arguments:
+            article {pocket.Article} -- The article before the rename
+            new_title {str} -- The new title
+
+        Keyword Arguments:
+            clean_url {bool} -- The article is re-added with its resolved url (default: {True})
+        """
+        self.begin_many([(article, new_title)], clean_url)
+
+    def begin_many(self, renames: Iterable[Tuple[pocket.Article, str]], clean_url: bool = True):
+        """Records many renames in one transaction.
+        If an article already has an unfinished rename, the originally recorded
+        version of it is kept and only the new title is updated
+
+        Arguments:
+            renames {Iterable[Tuple[pocket.Article, str]]} -- Pairs of article and new title
+
+        Keyword Arguments:
+            clean_url {bool} -- The articles are re-added with their resolved url (default: {True})
+        """
+        started = time.time()
+        rows = []
+        for article, new_title in renames:
+            # A finished rename whose mark isn't written yet must not remove the new entry
+            if article.item_id in self._finished:
+                self._finished.discard(article.item_id)
+                self._connection.execute(
+                    'DELETE FROM renames WHERE item_id = ?', (article.item_id,))
+            rows.append((
+                article.item_id,
+                article.given_url,
+                article.resolved_url,
+                article.given_title,
+                article.resolved_title,
+                json.dumps(list(article.tags)),
+                article.time_added,
+                new_title,
+                int(clean_url),
+                started))
+        with self._connection:
+            self._connection.executemany(
+                'INSERT INTO renames VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (item_id) DO UPDATE SET '
+                'new_title = excluded.new_title, clean_url = excluded.clean_url',
+                rows)
+
+    def finish(self, item_id: str):
+        """Marks a rename as finished.
+        Marks are written in batches, a rename finished shortly before a crash
+        is replayed, which re-adds the already renamed article once more
+
+        Arguments:
+            item_id {str} -- Id of the renamed article
+        """
+        self.finish_many([item_id])
+
+    def finish_many(self, item_ids: Iterable[str]):
+        """Marks many renames as finished
+
+        Arguments:
+            item_ids {Iterable[str]} -- Ids of the renamed articles
+        """
+        self._finished.update(item_ids)
+        if len(self._finished) >= self.finish_batch_size:
+            self.flush()
+
+    def flush(self):
+        """Writes all collected completion marks"""
+        if not self._finished:
+            return
+        LOGGER.debug(f'Marking {len(self._finished)} renames as finished')
+        with self._connection:
+            self._connection.executemany(
+                'DELETE FROM renames WHERE item_id = ?', [(i,) for i in self._finished])
+        self._finished.clear()
+
+    def unfinished(self) -> List[Tuple[pocket.Article, str, bool]]:
+        """Returns all renames which were started but not finished, oldest first
+
+        Returns:
+            List[Tuple[pocket.Article, str, bool]] -- The original article,
+            the new title and whether the resolved url is used
+        """
+        self.flush()
+        rows = self._connection.execute(
+            'SELECT item_id, given_url, resolved_url, given_title, resolved_title, '
+            'tags, time_added, new_title, clean_url FROM renames ORDER BY started')
+        return [(pocket.Article(item_id,
+                                given_url,
+                                resolved_url,
+                                given_title,
+                                resolved_title,
+                                tuple(json.loads(tags)),
+                                time_added),
+                 new_title,
+                 bool(clean_url))
+                for (item_id, given_url, resolved_url, given_title, resolved_title,
+                     tags, time_added, new_title, clean_url)
+                in rows]
+
+    def close(self):
+        """Writes the collected completion marks and closes the database"""
+        self.flush()
+        self._connection.close()
@@ -0,0 +1,142 @@
+"""Incremental decoding of /get responses"""
+
+import re
+import json
+import codecs
+from typing import Dict, List, Tuple
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Parser states
+_START = 0
+_TOP_KEY = 1
+_TOP_VALUE = 2
+_LIST_START = 3
+_LIST_KEY = 4
+_LIST_VALUE = 5
+_DONE = 6
+
+
+class ListDecoder:
+    """Decodes a JSON object chunk by chunk and hands out the members of one
+    of its child objects (the item list of a /get response) as soon as they are complete.
+    All other top level members are collected and returned by close()"""
+
+    def __init__(self, list_key: str = 'list'):
+        """
+        Keyword Arguments:
+            list_key {str} -- Name of the member whose content is streamed (default: {'list'})
+        """
+        self.list_key = list_key
+        self.members = {}
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._state = _START
+        self._key = None
+
+    def feed(self, chunk: bytes) -> List[Tuple[str, Dict[str, any]]]:
+        """Adds a chunk of the response body
+
+        Arguments:
+            chunk {bytes} -- The next chunk
+
+        Returns:
+            List[Tuple[str, Dict[str, any]]] -- Key and value of every list member completed by this chunk
+        """
+        self._buffer += self._text_decoder.decode(chunk)
+        return self._parse(final=False)
+
+    def close(self) -> Dict[str, any]:
+        """Finishes decoding
+
+        Raises:
+            ValueError: The body is not a complete JSON object
+
+        Returns:
+            Dict[str, any] -- All top level members except the list.
+            An empty list is included as is
+        """
+        self._buffer += self._text_decoder.decode(b'', final=True)
+        self._parse(final=True)
+        if self._state != _DONE:
+            raise ValueError('Incomplete JSON response')
+        return self.members
+
+    def _decode_value(self, pos: int, final: bool):
+        """Decodes the value starting at pos
+
+        Returns:
+            Tuple[any, int] -- The value and the position after it, None if incomplete
+        """
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, pos)
+        except json.JSONDecodeError:
+            if final:
+                raise ValueError(f'Invalid JSON at position {pos}')
+            return None
+        # A number at the end of the buffer might continue in the next chunk
+        if end == len(self._buffer) and not final and isinstance(value, (int, float)):
+            return None
+        return value, end
+
+    def _parse(self, final: bool) -> List[Tuple[str, Dict[str, any]]]:
+        items = []
+        buffer = self._buffer
+        pos = 0
+        while True:
+            pos = WHITESPACE.match(buffer, pos).end()
+            if pos == len(buffer) or self._state == _DONE:
+                break
+            char = buffer[pos]
+            if self._state == _START:
+                if char != '{':
+                    raise ValueError('Expected a JSON object')
+                self._state = _TOP_KEY
+                pos += 1
+            elif self._state in (_TOP_KEY, _LIST_KEY):
+                if char == ',':
+                    pos += 1
+                    continue
+                if char == '}':
+                    self._state = _DONE if self._state == _TOP_KEY else _TOP_KEY
+                    pos += 1
+                    continue
+                # Key and colon are only consumed together
+                decoded = self._decode_value(pos, final)
+                if decoded is None:
+                    break
+                key, end = decoded
+                end = WHITESPACE.match(buffer, end).end()
+                if end == len(buffer):
+                    break
+                if buffer[end] != ':':
+                    raise ValueError(f'Expected ":" at position {end}')
+                self._key = key
+                pos = end + 1
+                if self._state == _LIST_KEY:
+                    self._state = _LIST_VALUE
+                elif key == self.list_key:
+                    self._state = _LIST_START
+                else:
+                    self._state = _TOP_VALUE
+            elif self._state == _LIST_START:
+                if char == '{':
+                    self._state = _LIST_KEY
+                    pos += 1
+                    continue
+                # Pocket sends an empty array instead of an empty object
+                self._state = _TOP_VALUE
+            else:
+                decoded = self._decode_value(pos, final)
+                if decoded is None:
+                    break
+                value, pos = decoded
+                if self._state == _LIST_VALUE:
+                    items.append((self._key, value))
+                    self._state = _LIST_KEY
+                else:
+                    self.members[self._key] = value
+                    self._state = _TOP_KEY
+        self._buffer = buffer[pos:]
+        return items
@@ -0,0 +1,197 @@
+"""Collects request metrics and timings of the Pocket client"""
+
+import sys
+import json
+import time
+import bisect
+from typing import Dict, List, TextIO
+
+# Upper bounds of the latency histogram buckets in milliseconds
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf'))
+
+
+class Metrics:
+    """Receives measurements from Pocket. Subclass it to plug in your own collector.
+    All hooks do nothing by default"""
+
+    def request(self,
+                endpoint: str,
+                duration: float,
+                status_code: int,
+                request_bytes: int,
+                response_bytes: int):
+        """Called after every request
+
+        Arguments:
+            endpoint {str} -- The requested endpoint
+            duration {float} -- Seconds from sending the request until the body was read
+            status_code {int} -- HTTP status, 0 if no response was received
+            request_bytes {int} -- Size of the request body
+            response_bytes {int} -- Size of the response body as received, still compressed.
+            The decompressed size is counted as 'response_bytes_decoded'
+        """
+
+    def timing(self, name: str, duration: float):
+        """Called after a timed operation, e.g. 'json_decode' or 'article_parse'
+
+        Arguments:
+            name {str} -- Name of the operation
+            duration {float} -- Duration in seconds
+        """
+
+    def count(self, name: str, value: int = 1):
+        """Increments a counter
+
+        Arguments:
+            name {str} -- Name of the counter
+
+        Keyword Arguments:
+            value {int} -- The increment (default: {1})
+        """
+
+class Histogram:
+    """Latency histogram with fixed buckets"""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value_ms: float):
+        """Records a value
+
+        Arguments:
+            value_ms {float} -- The value in milliseconds
+        """
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def to_dict(self) -> Dict[str, any]:
+        """Returns the histogram in a JSON serializable form
+
+        Returns:
+            Dict[str, any] -- Count, mean, max and the non-empty buckets
+        """
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count, 3) if self.count else 0,
+            'max_ms': round(self.max, 3),
+            'buckets': {
+                f'<={bound}': count
+                for bound, count in zip(self.buckets, self.counts) if count
+            }
+        }
+
+class EndpointStats:
+    """Metrics of a single endpoint"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latency = Histogram()
+
+    def to_dict(self) -> Dict[str, any]:
+        """Returns the stats in a JSON serializable form
+
+        Returns:
+            Dict[str, any] -- The stats
+        """
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            'latency': self.latency.to_dict()
+        }
+
+class MetricsCollector(Metrics):
+    """Keeps all measurements in memory and writes a report"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.endpoints = {}
+        self.timings = {}
+        self.counters = {}
+
+    def request(self,
+                endpoint: str,
+                duration: float,
+                status_code: int,
+                request_bytes: int,
+                response_bytes: int):
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = EndpointStats()
+        stats.requests += 1
+        if not 200 <= status_code < 300:
+            stats.errors += 1
+        stats.request_bytes += request_bytes
+        stats.response_bytes += response_bytes
+        stats.latency.add(duration * 1000)
+
+    def timing(self, name: str, duration: float):
+        histogram = self.timings.get(name)
+        if histogram is None:
+            histogram = self.timings[name] = Histogram()
+        histogram.add(duration * 1000)
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def report(self) -> Dict[str, any]:
+        """Returns all measurements
+
+        Returns:
+            Dict[str, any] -- The report
+        """
+        return {
+            'uptime_s': round(time.perf_counter() - self.started, 3),
+            'endpoints': {name: stats.to_dict() for name, stats in self.endpoints.items()},
+            'timings': {name: histogram.to_dict() for name, histogram in self.timings.items()},
+            'counters': dict(self.counters)
+        }
+
+    def format_text(self) -> str:
+        """Formats the report for humans
+
+        Returns:
+            str -- The report
+        """
+        report = self.report()
+        lines = [f'Uptime: {report["uptime_s"]}s']
+        for name, stats in report['endpoints'].items():
+            latency = stats['latency']
+            lines.append(
+                f'{name}: {stats["requests"]} requests, {stats["errors"]} errors, '
+                f'{stats["request_bytes"]} bytes sent, {stats["response_bytes"]} bytes received, '
+                f'mean {latency["mean_ms"]}ms, max {latency["max_ms"]}ms')
+        for name, timing in report['timings'].items():
+            lines.append(
+                f'{name}: {timing["count"]}x, mean {timing["mean_ms"]}ms, max {timing["max_ms"]}ms')
+        for name, value in report['counters'].items():
+            lines.append(f'{name}: {value}')
+        return '\n'.join(lines)
+
+    def dump(self, path: str = None, file: TextIO = None):
+        """Writes the report. Files ending in .json get the JSON report,
+        everything else the text report
+
+        Keyword Arguments:
+            path {str} -- File to write the report to (default: {None})
+            file {TextIO} -- Stream to write the text report to if no path is given
+            (default: {stderr})
+        """
+        if path is None:
+            print(self.format_text(), file=file or sys.stderr)
+            return
+        with open(path, mode='w', encoding='utf-8') as report_file:
+            if path.endswith('.json'):
+                json.dump(self.report(), report_file, indent=4)
+            else:
+                report_file.write(self.format_text() + '\n')
@@ -5,15 +5,23 @@
 __author__ = 'max.nuding@icloud.com'
 __version__ = '0.1'
 
-from urllib import request, parse, error as urllib_error
-from typing import List, Dict
+from urllib import parse
+from typing import List, Dict, AsyncIterator, Tuple, Callable, Awaitable, Sized, Mapping, Iterable
+import sys
+import contextlib
+import functools
+import itertools
+import collections
 import dataclasses
-import webbrowser
 import json
+import time
 import asyncio
 import logging
 from enum import Flag, auto
-import requests
+import transports
+import ratelimit
+import resilience
+import jsonstream
 BASE_URL = 'https://getpocket.com/v3'
 
 REQUEST_TOKEN_URL = '/oauth/request'
@@ -22,11 +30,47 @@ AUTHORIZE_REQUEST_TOKEN = '/oauth/authorize'
 
 REDIRECT_URI = 'https://github.com/hutattedonmyarm/pocket-rename'
 
+# Number of items requested per /get call when paging through the list
+DEFAULT_PAGE_SIZE = 500
+
+# Number of actions sent per /send call when batching
+DEFAULT_BATCH_SIZE = 100
+
+# Items fetched before and after the last known list position of an item
+# when loading its details, in case the list has shifted since
+HYDRATION_SLACK = 10
+# Items requested when searching for an item which wasn't at its position
+HYDRATION_SEARCH_COUNT = 10
+# Most items searched for one by one per hydration, the others are reported as not found
+HYDRATION_MAX_SEARCHES = 50
+
+# /get parameters which leave out parts of the list
+LIST_FILTERS = ('tag', 'domain', 'search', 'contentType', 'favorite', 'since')
+# Seconds the result of get_articles() is reused
+DEFAULT_LIST_CACHE_TTL = 5.0
+# Endpoints which can be requested again after a failure without changing anything twice
+IDEMPOTENT_ENDPOINTS = frozenset(('/get',))
+
+# Item status values as reported by /get
+STATUS_UNREAD = '0'
+STATUS_ARCHIVED = '1'
+STATUS_DELETED = '2'
+
+# Item statuses included in each state filter
+STATE_STATUSES = {
+    'unread': (STATUS_UNREAD,),
+    'archive': (STATUS_ARCHIVED,),
+    'all': (STATUS_UNREAD, STATUS_ARCHIVED)
+}
+
 LOGGER = logging.getLogger(__name__)
 
 Parameter = Dict[str, str]
 Bytes = List[bytes]
 
+# Slots save the per-instance __dict__, dataclasses support them since Python 3.10
+DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
 
 class RenameStatus(Flag):
     UNCHANGED = auto()
@@ -36,7 +80,7 @@ class RenameStatus(Flag):
     ERR_DELETE_FAILED = auto()
     ERR_READD_FAILED = auto()
 
-@dataclasses.dataclass
+@dataclasses.dataclass(**DATACLASS_SLOTS)
 class Article:
     """A Pocket Article"""
     item_id: str
@@ -44,9 +88,11 @@ class Article:
     resolved_url: str
     given_title: str
     resolved_title: str
-    tags: List[str]
+    tags: Tuple[str, ...]
     time_added: str
     rename_status: RenameStatus = RenameStatus.UNCHANGED
+    # False if the article comes from a simple listing and its tags are not loaded yet
+    hydrated: bool = True
 
     def get_title(self) -> str:
         """Returns the title of the article
@@ -64,20 +110,150 @@ class Article:
     def __str__(self):
         return f'{self.get_title()}: {self.resolved_url}'
 
+@dataclasses.dataclass
+class SyncResult:
+    """Changes received by a sync"""
+    articles: List[Article] = dataclasses.field(default_factory=list)
+    statuses: List[str] = dataclasses.field(default_factory=list)
+    since: int = None
+
+    def deleted(self) -> List[str]:
+        """Returns the ids of all deleted items
+
+        Returns:
+            List[str] -- The deleted item ids
+        """
+        return [a.item_id for a, s in zip(self.articles, self.statuses) if s == STATUS_DELETED]
+
+@dataclasses.dataclass
+class Page:
+    """A page of /get results"""
+    articles: List[Article]
+    statuses: List[str]
+    since: int = None
+
+    def __len__(self) -> int:
+        return len(self.articles)
+
 class Pocket:
     """Provides access to the Pocket API"""
     consumer_key = None
     access_token = None
     username = None
     request_token = None
+    store = None
+    rate_limiter = None
+    metrics = None
+    journal = None
+    title_cache = None
+    retry_policy = None
+    circuit_breaker = None
+    list_cache_ttl = DEFAULT_LIST_CACHE_TTL
+
+    def __init__(self,
+                 consumer_key,
+                 access_token=None,
+                 store=None,
+                 transport=None,
+                 rate_limiter=None,
+                 metrics=None,
+                 journal=None,
+                 title_cache=None,
+                 retry_policy=None,
+                 circuit_breaker=None,
+                 list_cache_ttl=DEFAULT_LIST_CACHE_TTL):
+        """
+        Arguments:
+            consumer_key {str} -- The app's consumer key
 
-    def __init__(self, consumer_key, access_token=None):
+        Keyword Arguments:
+            access_token {str} -- A previously obtained access token (default: {None})
+            store {store.ArticleStore} -- Local copy of the list which is
+            synced incrementally instead of downloading the whole list (default: {None})
+            transport {transports.Transport} -- HTTP transport used for all requests.
+            Uses aiohttp if available, otherwise requests. The default transport
+            is only created once the first request is made (default: {None})
+            rate_limiter {ratelimit.RateLimiter} -- Schedules the requests within
+            Pocket's rate limits (default: {None})
+            metrics {metrics.Metrics} -- Receives request metrics and timings.
+            Nothing is measured if not set (default: {None})
+            journal {journal.RenameJournal} -- Records every rename before the article
+            is changed, so interrupted renames can be replayed (default: {None})
+            title_cache {titlecache.TitleCache} -- Learns from every rename
+            whether Pocket ignores the given title for a page (default: {None})
+            retry_policy {resilience.RetryPolicy} -- Backoff of retried /get requests,
+            which are retried after server and network errors (default: {None})
+            circuit_breaker {resilience.CircuitBreaker} -- Pauses all requests
+            while Pocket keeps failing (default: {None})
+            list_cache_ttl {float} -- Seconds the result of get_articles() is reused,
+            0 to only share requests which are in flight (default: {DEFAULT_LIST_CACHE_TTL})
+        """
         self.consumer_key = consumer_key
         self.access_token = access_token
+        self.store = store
+        self._transport = transport
+        self.rate_limiter = rate_limiter if rate_limiter is not None else ratelimit.RateLimiter()
+        self.metrics = metrics
+        self.journal = journal
+        self.title_cache = title_cache
+        self.retry_policy = retry_policy if retry_policy is not None else resilience.RetryPolicy()
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else resilience.CircuitBreaker()
+        self.list_cache_ttl = list_cache_ttl
+        # Running and finished get_articles() calls, by state, filters and details:
+        # the task and the time it finished
+        self._list_requests = {}
+        # Incremented by every change of the list, so results loaded before it aren't reused
+        self._list_generation = 0
+        # Server time of the last complete listing without a store, changes after it are
+        # returned by fetch_changes()
+        self.listed_since = None
+        # List positions of the items of simple listings, by item_id: (state, offset)
+        self._list_offsets = {}
+        # Articles with loaded details, by item_id
+        self._hydrated = {}
+        # Details being loaded by item_id, and articles waiting for the next request
+        self._hydrating = {}
+        # Items changed while their details were being loaded, the details aren't kept
+        self._stale_details = set()
+        self._hydration_queue = []
+        self._hydration_task = None
+
+    @property
+    def transport(self) -> transports.Transport:
+        """HTTP transport used for all requests"""
+        if self._transport is None:
+            self._transport = transports.default_transport()
+        return self._transport
+
+    @transport.setter
+    def transport(self, transport: transports.Transport):
+        self._transport = transport
+
+    async def close(self, close_transport: bool = True):
+        """Closes the connections, the store and the journal
+
+        Keyword Arguments:
+            close_transport {bool} -- Also close the transport,
+            False if it's shared with other instances (default: {True})
+        """
+        if self._transport is not None and close_transport:
+            await self._transport.close()
+        if self.store is not None:
+            self.store.close()
+        if self.journal is not None:
+            self.journal.close()
+        if self.title_cache is not None:
+            self.title_cache.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
 
     async def authorize(self):
         """Authorizes with Pocket"""
-        token_valid = await self._test_access_token()
+        token_valid = await self.validate_access_token()
         if not token_valid:
             await self._get_access_token()
 
@@ -93,32 +269,29 @@ class Pocket:
         """
         parameters = {'redirect_uri' : redirect_uri}
         try:
-            resp = (await self._make_request(REQUEST_TOKEN_URL, parameters=parameters)).text
-        except urllib_error.HTTPError as http_exception:
-            if http_exception.code == 403:
-                raise InvalidConsumerKey(self.consumer_key)
-            else:
-                raise PocketException(
-                    f'{http_exception.code} - {http_exception.reason}: {http_exception.msg}')
+            response_dict = self._decode(await self._make_request(REQUEST_TOKEN_URL, parameters=parameters))
+        except AccessDenied as access_denied:
+            raise InvalidConsumerKey(self.consumer_key) from access_denied
+        except PocketException:
+            raise
         except Exception as exception:
-            raise PocketException(exception)
-
-        response_dict = json.loads(resp.read())
+            raise PocketException(exception) from exception
         request_token = response_dict['code']
         parameters = {
             'request_token' : request_token,
             'redirect_uri' : redirect_uri
         }
+        # Only needed for the first login
+        import webbrowser
         webbrowser.open(AUTHORIZE_REQUEST_URL + '?' + parse.urlencode(parameters))
 
         parameters = {'code' : request_token}
         input('Please authorize me and hit enter')
-        resp = (await self._make_request(AUTHORIZE_REQUEST_TOKEN, parameters=parameters)).text
-        access_token_dict = json.loads(resp.read())
+        access_token_dict = self._decode(await self._make_request(AUTHORIZE_REQUEST_TOKEN, parameters=parameters))
         self.access_token = access_token_dict['access_token']
         self.username = access_token_dict['username']
 
-    async def _test_access_token(self) -> bool:
+    async def validate_access_token(self) -> bool:
         """Checks if the access token is valid
 
         Returns:
@@ -135,54 +308,555 @@ class Pocket:
             return False
         return True
 
-    @staticmethod
-    def _async_post_wrapper(url: str, data: Bytes, headers: Parameter) -> requests.Response:
-        """Wraps a POST request to take only positional arguments
-
-        Arguments:
-            url {str} -- URL to POST to
-            data {Bytes} -- UTF-8 encoded json with the body
-            headers {Parameter} -- Header dictionary
-
-        Returns:
-            requests.Response -- Server response
-        """
-        return requests.post(url, data=data, headers=headers)
-
     @staticmethod
     def _parse_article(item_id: str, article_data: Dict[str, any]) -> Article:
         title = article_data.get('resolved_title')
         if not title:
             title = article_data.get('title')
         rename_status = article_data.get('rename_status', RenameStatus.UNCHANGED)
+        given_url = article_data['given_url']
+        resolved_url = article_data['resolved_url']
+        # Share the string instead of keeping two equal copies
+        if resolved_url == given_url:
+            resolved_url = given_url
+        # The same few tags are used over and over again
+        tags = tuple(sys.intern(tag) for tag in article_data.get('tags', ()))
         return Article(item_id,
-                       article_data['given_url'],
-                       article_data['resolved_url'],
+                       given_url,
+                       resolved_url,
                        article_data.get('given_title'),
                        title,
-                       [*article_data.get('tags', {})],
+                       tags,
                        article_data.get('time_added'),
                        rename_status)
 
-    async def get_articles(self, state: str = 'unread') -> List[Article]:
-        """Fetches all unread items from pocket
+    @staticmethod
+    def _parse_item(item_id: str, article_data: Dict[str, any]) -> Tuple[Article, str]:
+        """Parses an item of a /get response
+
+        Arguments:
+            item_id {str} -- The item id
+            article_data {Dict[str, any]} -- The decoded item
+
+        Returns:
+            Tuple[Article, str] -- The article and its status
+        """
+        status = article_data.get('status', STATUS_UNREAD)
+        if status == STATUS_DELETED:
+            # Deleted items only come with their id and status
+            return Article(item_id, None, None, None, None, (), None), status
+        return Pocket._parse_article(item_id, article_data), status
+
+    async def get_articles(self,
+                           state: str = 'unread',
+                           filters: Parameter = None,
+                           details: bool = False) -> List[Article]:
+        """Fetches all unread items from pocket.
+        Concurrent calls with the same arguments share one download, and the result
+        is reused for list_cache_ttl seconds unless the list is changed in the meantime
 
         Keyword Arguments:
             state {str} -- filter items by state:
                 'unread', 'archive', or 'all' (default: {'unread'})
+            filters {Parameter} -- See iter_pages() (default: {None})
+            details {bool} -- See iter_pages() (default: {False})
 
         Returns:
             List[Article] -- A list of pocket articles
         """
-        # detailType simple is probably default, but the docs make no statement regarding that
+        key = (state, tuple(sorted((filters or {}).items())), details)
+        task, finished = self._list_requests.get(key, (None, None))
+        if task is not None and (finished is None or time.monotonic() - finished < self.list_cache_ttl):
+            if self.metrics is not None:
+                self.metrics.count('list_requests_shared' if finished is None else 'list_cache_hits')
+        else:
+            task = asyncio.ensure_future(self._load_articles(key, state, filters, details))
+            self._list_requests[key] = (task, None)
+        # A cancelled caller doesn't cancel the download for the others
+        articles = await asyncio.shield(task)
+        # Callers are free to change their list
+        return list(articles)
+
+    async def _load_articles(self,
+                             key: Tuple,
+                             state: str,
+                             filters: Parameter,
+                             details: bool) -> List[Article]:
+        """Downloads the list for get_articles() and keeps the result for list_cache_ttl seconds
+
+        Arguments:
+            key {Tuple} -- State, filters and details, the key of the request
+            state {str} -- filter items by state: 'unread', 'archive', or 'all'
+            filters {Parameter} -- See iter_pages()
+            details {bool} -- See iter_pages()
+
+        Returns:
+            List[Article] -- A list of pocket articles
+        """
+        generation = self._list_generation
+        task = asyncio.current_task()
+        articles = []
+        keep = False
+        try:
+            async for page in self.iter_pages(state, filters=filters, details=details):
+                articles.extend(page)
+            # Results loaded while the list was changed might miss the change
+            keep = generation == self._list_generation and self.list_cache_ttl > 0
+        finally:
+            # Failures aren't kept, the next call tries again
+            if self._list_requests.get(key, (None,))[0] is task:
+                if keep:
+                    self._list_requests[key] = (task, time.monotonic())
+                else:
+                    del self._list_requests[key]
+        return articles
+
+    def invalidate_list_cache(self, item_ids: Iterable[str] = ()):
+        """Forgets the results of get_articles() and the loaded details of changed articles.
+        Called by every change of the list, downloads which are running are still
+        shared but their results aren't kept
+
+        Keyword Arguments:
+            item_ids {Iterable[str]} -- Ids of the changed articles (default: {()})
+        """
+        self._list_generation += 1
+        self._list_requests.clear()
+        for item_id in item_ids:
+            self._hydrated.pop(item_id, None)
+            if item_id in self._hydrating:
+                self._stale_details.add(item_id)
+
+    async def iter_articles(self,
+                            state: str = 'unread',
+                            page_size: int = DEFAULT_PAGE_SIZE,
+                            filters: Parameter = None,
+                            details: bool = False) -> AsyncIterator[Article]:
+        """Iterates over all items in the list, fetching them page by page
+
+        Keyword Arguments:
+            state {str} -- filter items by state:
+                'unread', 'archive', or 'all' (default: {'unread'})
+            page_size {int} -- Number of items per request (default: {DEFAULT_PAGE_SIZE})
+            filters {Parameter} -- See iter_pages() (default: {None})
+            details {bool} -- See iter_pages() (default: {False})
+
+        Yields:
+            Article -- The next pocket article
+        """
+        async for page in self.iter_pages(state, page_size, filters, details):
+            for article in page:
+                yield article
+
+    async def iter_pages(self,
+                         state: str = 'unread',
+                         page_size: int = DEFAULT_PAGE_SIZE,
+                         filters: Parameter = None,
+                         details: bool = False) -> AsyncIterator[List[Article]]:
+        """Iterates over the list one page at a time.
+        The next page is already requested while the current one is being consumed.
+        If a store is set, it is synced first and the pages are read from it.
+        Otherwise the articles come without tags unless details are requested, see hydrate()
+
+        Keyword Arguments:
+            state {str} -- filter items by state:
+                'unread', 'archive', or 'all' (default: {'unread'})
+            page_size {int} -- Number of items per request (default: {DEFAULT_PAGE_SIZE})
+            filters {Parameter} -- Further /get parameters narrowing down the list,
+            e.g. tag, domain or search. Not applied to the pages of the store,
+            so callers have to check the articles themselves (default: {None})
+            details {bool} -- Fetch the articles with tags (default: {False})
+
+        Yields:
+            List[Article] -- The articles of the next page
+        """
+        if self.store is not None:
+            async for page in self._iter_store_pages(state, page_size):
+                yield page
+            return
+        # The list doesn't show tags, images etc., they're loaded when needed
+        parameters = dict(filters or {}, detailType='complete' if details else 'simple', state=state)
+        since = None
+        async for page in self._iter_get_pages(parameters, page_size):
+            # The first timestamp is the earliest, later changes are picked up by fetch_changes()
+            since = since or page.since
+            if page.articles:
+                yield page.articles
+        if not filters:
+            self.listed_since = since
+
+    async def _iter_store_pages(self,
+                                state: str,
+                                page_size: int) -> AsyncIterator[List[Article]]:
+        """Syncs the store and iterates over its content one page at a time.
+        If the store is empty, the list is downloaded into the store while the pages are passed on
+
+        Arguments:
+            state {str} -- filter items by state: 'unread', 'archive', or 'all'
+            page_size {int} -- Number of items per page
+
+        Yields:
+            List[Article] -- The articles of the next page
+        """
+        if self.store.since is not None:
+            await self.sync(page_size)
+            articles = self.store.get_articles(state)
+            for offset in range(0, len(articles), page_size):
+                yield articles[offset:offset+page_size]
+            return
+        # Initial sync, pages are handed out as they arrive
+        wanted_statuses = STATE_STATUSES[state]
+        since = None
         parameters = {
             'detailType': 'complete',
-            'state': state
+            'state': 'all'
         }
-        resp = (await self._make_request('/get', parameters=parameters)).text
-        resp = json.loads(resp)['list']
-        articles = [self._parse_article(item_id, a) for item_id, a in resp.items()]
-        return articles
+        async for page in self._iter_get_pages(parameters, page_size):
+            # The first timestamp is the earliest, later changes will be picked up by the next sync
+            since = since or page.since
+            self.store.apply(page.articles, page.statuses)
+            articles = [a for a, s in zip(page.articles, page.statuses) if s in wanted_statuses]
+            if articles:
+                yield articles
+        # Only mark the store as synced once everything is in it
+        self.store.apply([], [], since)
+
+    async def sync(self, page_size: int = DEFAULT_PAGE_SIZE) -> SyncResult:
+        """Fetches all changes since the last sync and applies them to the store.
+        Downloads the whole list if the store has never been synced
+
+        Keyword Arguments:
+            page_size {int} -- Number of items per request (default: {DEFAULT_PAGE_SIZE})
+
+        Raises:
+            PocketException: No store is set
+
+        Returns:
+            SyncResult -- The added, changed, and deleted items
+        """
+        if self.store is None:
+            raise PocketException('Syncing requires a store')
+        result = await self.fetch_changes(self.store.since, page_size, details=True)
+        self.store.apply(result.articles, result.statuses, result.since)
+        LOGGER.debug(f'Synced {len(result.articles)} changed items')
+        return result
+
+    async def fetch_changes(self,
+                            since: int = None,
+                            page_size: int = DEFAULT_PAGE_SIZE,
+                            details: bool = False) -> SyncResult:
+        """Fetches the items of all states which were added, changed or deleted since a point in time
+
+        Keyword Arguments:
+            since {int} -- Server timestamp, e.g. SyncResult.since of an earlier call.
+            The whole list if None (default: {None})
+            page_size {int} -- Number of items per request (default: {DEFAULT_PAGE_SIZE})
+            details {bool} -- Fetch the articles with tags (default: {False})
+
+        Returns:
+            SyncResult -- The changed items and the timestamp to pass on the next call
+        """
+        parameters = {
+            'detailType': 'complete' if details else 'simple',
+            'state': 'all'
+        }
+        if since is not None:
+            parameters['since'] = since
+        result = SyncResult()
+        async for page in self._iter_get_pages(parameters, page_size):
+            result.since = result.since or page.since
+            result.articles.extend(page.articles)
+            result.statuses.extend(page.statuses)
+        return result
+
+    async def iter_items(self,
+                         state: str = 'all',
+                         offset: int = 0,
+                         page_size: int = DEFAULT_PAGE_SIZE,
+                         details: bool = True,
+                         sort: str = 'oldest') -> AsyncIterator[Tuple[str, Dict[str, any]]]:
+        """Iterates over the items of the list as sent by Pocket, with all their fields.
+        Only two pages are held in memory at any time, however long the list is
+
+        Keyword Arguments:
+            state {str} -- filter items by state:
+                'unread', 'archive', or 'all' (default: {'all'})
+            offset {int} -- Index of the first item, to continue an earlier iteration (default: {0})
+            page_size {int} -- Number of items per request (default: {DEFAULT_PAGE_SIZE})
+            details {bool} -- Fetch the items with tags, authors, images etc. (default: {True})
+            sort {str} -- 'oldest' or 'newest'. With 'oldest', items added meanwhile
+            don't shift the offsets of the others (default: {'oldest'})
+
+        Yields:
+            Tuple[str, Dict[str, any]] -- The item_id and the decoded item
+        """
+        parameters = {
+            'detailType': 'complete' if details else 'simple',
+            'state': state,
+            'sort': sort
+        }
+        async for page in self._iter_get_pages(parameters, page_size, offset, self._get_items):
+            for item in page:
+                yield item
+
+    async def _get_items(self, parameters: Parameter, offset: int, count: int) -> List[Tuple[str, Dict[str, any]]]:
+        """Fetches a single page of items without parsing them into articles,
+        retrying after server and network errors, see _request_items()"""
+        return await self._with_retries('/get', functools.partial(self._request_items, parameters, offset, count))
+
+    async def _request_items(self,
+                             parameters: Parameter,
+                             offset: int,
+                             count: int) -> List[Tuple[str, Dict[str, any]]]:
+        """Fetches a single page of items without parsing them into articles
+
+        Arguments:
+            parameters {Parameter} -- Request parameters, without count and offset
+            offset {int} -- Index of the first item
+            count {int} -- Maximum number of items
+
+        Returns:
+            List[Tuple[str, Dict[str, any]]] -- The item_id and the decoded item of every item on this page
+        """
+        parameters = dict(parameters, count=count, offset=offset)
+        items = []
+        decoder = jsonstream.ListDecoder()
+        async with self._stream_request('/get', parameters=parameters) as resp:
+            async for chunk in resp.iter_chunks():
+                items.extend(decoder.feed(chunk))
+        decoder.close()
+        return items
+
+    async def _iter_get_pages(self,
+                              parameters: Parameter,
+                              page_size: int,
+                              offset: int = 0,
+                              get_page: Callable[[Parameter, int, int], Awaitable[Sized]] = None) -> AsyncIterator[Page]:
+        """Pages through /get. The next page is requested before the current one is yielded
+
+        Arguments:
+            parameters {Parameter} -- Request parameters, without count and offset
+            page_size {int} -- Number of items per request
+
+        Keyword Arguments:
+            offset {int} -- Index of the first item (default: {0})
+            get_page {Callable[[Parameter, int, int], Awaitable[Sized]]} -- Fetches a page
+            from parameters, offset and count (default: {self._get_page})
+
+        Yields:
+            Page -- The next page, or whatever get_page returns
+        """
+        get_page = get_page or self._get_page
+        next_page = asyncio.ensure_future(get_page(parameters, offset, page_size))
+        try:
+            while next_page is not None:
+                page = await next_page
+                next_page = None
+                # A short page means there is nothing left to fetch
+                if len(page) == page_size:
+                    offset += page_size
+                    next_page = asyncio.ensure_future(get_page(parameters, offset, page_size))
+                yield page
+        finally:
+            # The consumer might stop early, don't leave the prefetch dangling
+            if next_page is not None:
+                next_page.cancel()
+
+    async def _get_page(self, parameters: Parameter, offset: int, count: int) -> Page:
+        """Fetches a single page of items, retrying after server and network errors, see _request_page()"""
+        return await self._with_retries('/get', functools.partial(self._request_page, parameters, offset, count))
+
+    async def _request_page(self, parameters: Parameter, offset: int, count: int) -> Page:
+        """Fetches a single page of items.
+        Articles are built while the response is read instead of decoding the whole body first
+
+        Arguments:
+            parameters {Parameter} -- Request parameters, without count and offset
+            offset {int} -- Index of the first item
+            count {int} -- Maximum number of items
+
+        Returns:
+            Page -- The articles on this page
+        """
+        # Sorting is needed to get stable pages
+        parameters = dict(parameters, sort='newest', count=count, offset=offset)
+        page = Page([], [])
+        decoder = jsonstream.ListDecoder()
+        decode_time = 0.0
+        parse_time = 0.0
+        async with self._stream_request('/get', parameters=parameters) as resp:
+            async for chunk in resp.iter_chunks():
+                if self.metrics is None:
+                    for item_id, article_data in decoder.feed(chunk):
+                        article, status = self._parse_item(item_id, article_data)
+                        page.articles.append(article)
+                        page.statuses.append(status)
+                    continue
+                start = time.perf_counter()
+                items = decoder.feed(chunk)
+                decode_time += time.perf_counter() - start
+                start = time.perf_counter()
+                for item_id, article_data in items:
+                    article, status = self._parse_item(item_id, article_data)
+                    page.articles.append(article)
+                    page.statuses.append(status)
+                parse_time += time.perf_counter() - start
+        page.since = decoder.close().get('since')
+        if parameters.get('detailType') == 'simple':
+            state = parameters.get('state', 'unread')
+            # Positions in a filtered list don't help finding the article in the whole list
+            filtered = any(name in parameters for name in LIST_FILTERS)
+            for position, article in enumerate(page.articles, start=offset):
+                article.hydrated = False
+                if not filtered:
+                    self._list_offsets[article.item_id] = (state, position)
+        if self.metrics is not None:
+            self.metrics.timing('json_decode', decode_time)
+            self.metrics.timing('article_parse', parse_time)
+            self.metrics.count('articles_parsed', len(page.articles))
+        return page
+
+    async def hydrate(self, articles: List[Article]) -> List[Article]:
+        """Loads the details of articles from a simple listing.
+        The details of all concurrently requested articles are fetched together
+        and cached, so no article is fetched twice
+
+        Arguments:
+            articles {List[Article]} -- The articles, hydrated ones are returned as they are
+
+        Returns:
+            List[Article] -- The articles with details, in the same order.
+            Articles which couldn't be found are returned unchanged
+        """
+        loop = asyncio.get_event_loop()
+        futures = {}
+        for article in articles:
+            item_id = article.item_id
+            if article.hydrated or item_id in self._hydrated or item_id in futures:
+                continue
+            future = self._hydrating.get(item_id)
+            if future is None:
+                future = self._hydrating[item_id] = loop.create_future()
+                self._hydration_queue.append(article)
+            futures[item_id] = future
+        if self._hydration_queue and self._hydration_task is None:
+            self._hydration_task = asyncio.ensure_future(self._run_hydration())
+        found = {}
+        if futures:
+            # The futures are shared with other callers, cancelling this call must not cancel them
+            details = await asyncio.gather(*(asyncio.shield(f) for f in futures.values()))
+            found = dict(zip(futures, details))
+        return [article if article.hydrated else
+                self._hydrated.get(article.item_id) or found.get(article.item_id) or article
+                for article in articles]
+
+    async def _run_hydration(self):
+        """Fetches the details of all queued articles"""
+        # Lets concurrent callers queue their articles first
+        await asyncio.sleep(0)
+        queue, self._hydration_queue = self._hydration_queue, []
+        self._hydration_task = None
+        try:
+            found = await self._fetch_details(queue)
+        except Exception as exception:
+            for article in queue:
+                self._stale_details.discard(article.item_id)
+                self._hydrating.pop(article.item_id).set_exception(exception)
+            return
+        for article in queue:
+            details = found.get(article.item_id)
+            stale = article.item_id in self._stale_details
+            self._stale_details.discard(article.item_id)
+            if details is None:
+                LOGGER.warning(f'Could not load the details of {article}')
+            elif not stale:
+                # Details of items changed during the request might be outdated, they aren't kept
+                self._hydrated[article.item_id] = details
+            self._hydrating.pop(article.item_id).set_result(details)
+
+    def _hydration_windows(self, articles: List[Article], shift: int) -> List[Tuple[str, int, int]]:
+        """Merges the last known list positions of articles into windows of at most one page
+
+        Arguments:
+            articles {List[Article]} -- The articles
+            shift {int} -- Number of items the list has moved down since it was fetched
+
+        Returns:
+            List[Tuple[str, int, int]] -- State, offset and count of each window
+        """
+        offsets = {}
+        for article in articles:
+            position = self._list_offsets.get(article.item_id)
+            if position is not None:
+                offsets.setdefault(position[0], []).append(max(0, position[1] + shift))
+        windows = []
+        for state, state_offsets in offsets.items():
+            state_offsets.sort()
+            start = end = None
+            for offset in state_offsets:
+                if start is not None and offset + HYDRATION_SLACK + 1 - start <= DEFAULT_PAGE_SIZE:
+                    end = offset + HYDRATION_SLACK + 1
+                    continue
+                if start is not None:
+                    windows.append((state, start, end - start))
+                start, end = max(0, offset - HYDRATION_SLACK), offset + HYDRATION_SLACK + 1
+            windows.append((state, start, end - start))
+        return windows
+
+    async def _fetch_details(self, articles: List[Article]) -> Dict[str, Article]:
+        """Fetches complete items around their last known list positions.
+        If the list has moved, e.g. because items were added at the top,
+        the windows are moved along once. Items which still aren't found are searched for by URL
+
+        Arguments:
+            articles {List[Article]} -- The articles
+
+        Returns:
+            Dict[str, Article] -- The complete articles which were found, by item_id
+        """
+        wanted = {article.item_id for article in articles}
+        found = {}
+        missing = articles
+        shift = 0
+        for _ in range(2):
+            windows = self._hydration_windows(missing, shift)
+            pages = await asyncio.gather(*(
+                self._get_page({'detailType': 'complete', 'state': state}, offset, count)
+                for state, offset, count in windows))
+            # How far the items in the windows have moved since the listing
+            shifts = collections.Counter()
+            for (state, offset, _), page in zip(windows, pages):
+                for position, article in enumerate(page.articles, start=offset):
+                    known = self._list_offsets.get(article.item_id)
+                    if known is not None and known[0] == state:
+                        shifts[position - known[1]] += 1
+                    if article.item_id in wanted:
+                        found[article.item_id] = article
+            missing = [article for article in missing if article.item_id not in found]
+            if not missing or not shifts or shifts.most_common(1)[0][0] == shift:
+                break
+            shift = shifts.most_common(1)[0][0]
+            LOGGER.debug(f'The list has moved by {shift} items')
+        if missing:
+            LOGGER.debug(f'{len(missing)} items moved, searching for them')
+            if len(missing) > HYDRATION_MAX_SEARCHES:
+                LOGGER.warning(f'{len(missing)} items moved, only searching for {HYDRATION_MAX_SEARCHES}')
+                missing = missing[:HYDRATION_MAX_SEARCHES]
+            # Not more searches at once than the requests the rate limiter lets through
+            semaphore = asyncio.Semaphore(self.rate_limiter.max_concurrency)
+
+            async def search(article: Article) -> Page:
+                async with semaphore:
+                    return await self._get_page({
+                        'detailType': 'complete',
+                        'state': 'all',
+                        'search': article.resolved_url or article.given_url
+                    }, 0, HYDRATION_SEARCH_COUNT)
+            pages = await asyncio.gather(*(search(article) for article in missing))
+            for article, page in zip(missing, pages):
+                for candidate in page.articles:
+                    if candidate.item_id == article.item_id:
+                        found[article.item_id] = candidate
+        return found
 
     async def rename_article(self, article: Article, new_name: str, clean_url=True) -> Article:
         """Renames a Pocket article by removing and readding it,
@@ -196,21 +870,189 @@ class Pocket:
             clean_url {bool} -- Replace the original url with Pocket's
             resolved url (default: {True})
 
+        Raises:
+            PocketException: The tags of the article couldn't be loaded
+
         Returns:
             Article -- The new article
         """
+        if not article.hydrated:
+            article = (await self.hydrate([article]))[0]
+            if not article.hydrated:
+                raise PocketException(f'Could not load the tags of {article}')
         tags = article.tags
         url = article.resolved_url if clean_url else article.given_url
         time_added = article.time_added
+        if self.journal is not None:
+            self.journal.begin(article, new_name, clean_url)
         new_article = await self.add_item(url, new_name, tags, time_added)
+        if self.journal is not None:
+            self.journal.finish(article.item_id)
+        return self._finish_rename(article, new_article, new_name, url)
+
+    async def rename_articles(self,
+                              renames: List[Tuple[Article, str]],
+                              clean_url=True,
+                              batch_size: int = DEFAULT_BATCH_SIZE) -> List[Article]:
+        """Renames many articles at once by sending the re-adds in batches.
+        Items which Pocket rejects with their timestamp are retried without it,
+        items of requests which failed as a whole are reported as failed
+
+        Arguments:
+            renames {List[Tuple[Article, str]]} -- Pairs of article and new title
+
+        Keyword Arguments:
+            clean_url {bool} -- Replace the original url with Pocket's
+            resolved url (default: {True})
+            batch_size {int} -- Number of actions per request (default: {DEFAULT_BATCH_SIZE})
+
+        Returns:
+            List[Article] -- The new articles, in the same order as the renames.
+            Articles which couldn't be re-added, or whose tags couldn't be loaded,
+            are returned with RenameStatus.ERR_READD_FAILED
+        """
+        new_articles = [None] * len(renames)
+        if not all(article.hydrated for article, _ in renames):
+            articles = await self.hydrate([article for article, _ in renames])
+            renames = [(article, new_name) for article, (_, new_name) in zip(articles, renames)]
+        # Re-adding without the tags would lose them
+        pending = [idx for idx, (article, _) in enumerate(renames) if article.hydrated]
+        if self.journal is not None:
+            self.journal.begin_many([renames[idx] for idx in pending], clean_url)
+        # First try keeps the timestamp, the second one drops it
+        for keep_timestamp in (True, False):
+            async with self.batch(batch_size) as batch:
+                futures = []
+                for idx in pending:
+                    article, new_name = renames[idx]
+                    action = {
+                        'url': article.resolved_url if clean_url else article.given_url,
+                        'title': new_name
+                    }
+                    if article.tags:
+                        action['tags'] = ','.join(article.tags)
+                    if keep_timestamp and article.time_added:
+                        action['time'] = article.time_added
+                    futures.append(batch.add('add', action))
+            failed = []
+            for idx, future in zip(pending, futures):
+                article, new_name = renames[idx]
+                exception = future.exception()
+                if isinstance(exception, ActionError) or (exception is None and not future.result()):
+                    # Pocket rejected the action, maybe because of the timestamp
+                    failed.append(idx)
+                    continue
+                if exception is not None:
+                    # The whole request failed, dropping the timestamp wouldn't help.
+                    # The rename stays in the journal
+                    LOGGER.error(f'Re-adding {article} failed: {exception}')
+                    continue
+                item = future.result()
+                new_article = self._parse_article(item['item_id'], item)
+                if not keep_timestamp:
+                    new_article.rename_status = RenameStatus.WARN_TIMESTAMP
+                url = article.resolved_url if clean_url else article.given_url
+                new_articles[idx] = self._finish_rename(article, new_article, new_name, url)
+            pending = failed
+            if not pending:
+                break
+            LOGGER.warning(f'{len(pending)} items could not be re-added with their timestamp')
+        if self.journal is not None:
+            # Failed renames stay in the journal to be replayed
+            self.journal.finish_many(
+                renames[idx][0].item_id for idx, new_article in enumerate(new_articles)
+                if new_article is not None)
+        for idx, new_article in enumerate(new_articles):
+            if new_article is None:
+                new_articles[idx] = dataclasses.replace(
+                    renames[idx][0], rename_status=RenameStatus.ERR_READD_FAILED)
+        return new_articles
+
+    async def replay_journal(self, batch_size: int = DEFAULT_BATCH_SIZE) -> List[Article]:
+        """Finishes the renames which were interrupted, e.g. by a crash or a lost connection.
+        Re-adding is idempotent, so renames which had already reached Pocket
+        before they were marked as finished are harmless to replay
+
+        Keyword Arguments:
+            batch_size {int} -- Number of actions per request (default: {DEFAULT_BATCH_SIZE})
+
+        Raises:
+            PocketException: No journal is set
+
+        Returns:
+            List[Article] -- The renamed articles
+        """
+        if self.journal is None:
+            raise PocketException('Replaying requires a journal')
+        entries = self.journal.unfinished()
+        if not entries:
+            return []
+        LOGGER.info(f'Replaying {len(entries)} unfinished renames')
+        new_articles = []
+        for clean_url in (True, False):
+            renames = [(article, new_title) for article, new_title, clean in entries
+                       if clean == clean_url]
+            if renames:
+                new_articles += await self.rename_articles(renames, clean_url, batch_size)
+        return new_articles
+
+    def _finish_rename(self,
+                       article: Article,
+                       new_article: Article,
+                       new_name: str,
+                       url: str) -> Article:
+        """Sets the rename status of a re-added article and records
+        in the title cache whether Pocket kept the new title
+
+        Arguments:
+            article {Article} -- The article before the rename
+            new_article {Article} -- The re-added article
+            new_name {str} -- The requested title
+            url {str} -- The URL the article was re-added with
+
+        Returns:
+            Article -- The re-added article
+        """
         if RenameStatus.UNCHANGED in new_article.rename_status:
             new_article.rename_status |= RenameStatus.SUCCESS
             new_article.rename_status &= ~RenameStatus.UNCHANGED
             if new_article.get_title() == article.get_title():
                 new_article.rename_status |= RenameStatus.WARN_NAME_NOT_CHANGED
+        if self.title_cache is not None:
+            self.title_cache.record(url, new_article.get_title() != new_name)
         LOGGER.debug(f'Rename status: {new_article.rename_status}')
         return new_article
 
+    def batch(self, batch_size: int = DEFAULT_BATCH_SIZE) -> 'ActionBatch':
+        """Creates a queue of actions which are sent in batches.
+        Use as an async context manager to send the remaining actions on exit
+
+        Keyword Arguments:
+            batch_size {int} -- Number of actions per request (default: {DEFAULT_BATCH_SIZE})
+
+        Returns:
+            ActionBatch -- The action queue
+        """
+        return ActionBatch(self, batch_size)
+
+    async def remove_items(self,
+                           articles: List[Article],
+                           batch_size: int = DEFAULT_BATCH_SIZE) -> List[bool]:
+        """Removes many articles from the list, sending the deletes in batches
+
+        Arguments:
+            articles {List[Article]} -- The articles to remove
+
+        Keyword Arguments:
+            batch_size {int} -- Number of actions per request (default: {DEFAULT_BATCH_SIZE})
+
+        Returns:
+            List[bool] -- Success for each article
+        """
+        async with self.batch(batch_size) as batch:
+            futures = [batch.add('delete', {'item_id': a.item_id}) for a in articles]
+        return [f.exception() is None and bool(f.result()) for f in futures]
+
     async def add_tags(self, article: Article, tags: List[str]) -> bool:
         """Adds tags to an article
         Arguments:
@@ -274,8 +1116,11 @@ class Pocket:
             
         # The item returned by the /add endpoint is different from the regular one
         # Might be better to go agains Pocket's recommendation and also use the /send endpoint here
-        resp = await self._make_request('/add', params)
-        item = json.loads(resp.text)['item']
+        item = None
+        try:
+            item = self._decode(await self._make_request('/add', params))['item']
+        finally:
+            self.invalidate_list_cache([item['item_id']] if item else ())
         item['rename_status'] = rename_status
         return self._parse_article(item['item_id'], item)
 
@@ -296,19 +1141,53 @@ class Pocket:
                            action_name: str,
                            action: Dict[str, str] = None) -> List[bool]:
         action['action'] = action_name
-        params = {'actions': [action]}
-        resp = await self._make_request('/send', params)
-        resp_text = resp.text
-        resp_dict = json.loads(resp_text)
-        if any(resp_dict.get('action_errors', [])):
-            LOGGER.error(f'Error sending an action to Pocket: {resp_dict["action_errors"]}')
-            raise ActionError(action_name, resp_dict['action_errors'])
-        return resp_dict['action_results']
+        result, error = (await self._send_actions([action]))[0]
+        if error:
+            LOGGER.error(f'Error sending an action to Pocket: {error}')
+            raise ActionError(action_name, error)
+        return [result]
 
-    async def _make_request(self,
-                            endpoint: str,
-                            parameters: Parameter = None,
-                            headers: Parameter = None) -> request.Request:
+    async def _send_actions(self, actions: List[Dict[str, str]]) -> List[Tuple[any, any]]:
+        """Sends multiple actions in a single request
+
+        Arguments:
+            actions {List[Dict[str, str]]} -- The actions, including their 'action' name
+
+        Returns:
+            List[Tuple[any, any]] -- Result and error for each action
+        """
+        resp_dict = {}
+        try:
+            resp_dict = self._decode(await self._make_request('/send', {'actions': actions}))
+        finally:
+            # Even a failed request might have changed the list.
+            # The ids of added items are only known from the response
+            added = [result['item_id'] for result in resp_dict.get('action_results') or ()
+                     if isinstance(result, dict) and result.get('item_id')]
+            self.invalidate_list_cache([action['item_id'] for action in actions if action.get('item_id')] + added)
+        results = resp_dict.get('action_results') or []
+        errors = resp_dict.get('action_errors') or []
+        # Pad, so a short response doesn't silently drop actions
+        results = results + [False] * (len(actions) - len(results))
+        errors = errors + [None] * (len(actions) - len(errors))
+        return list(zip(results, errors))
+
+    def _prepare_request(self,
+                         endpoint: str,
+                         parameters: Parameter = None,
+                         headers: Parameter = None) -> Tuple[str, bytes, Parameter]:
+        """Builds URL, body and headers of a request
+
+        Arguments:
+            endpoint {str} -- Relative or absolute endpoint
+
+        Keyword Arguments:
+            parameters {Parameter} -- Request parameters (default: {None})
+            headers {Parameter} -- Additional headers (default: {None})
+
+        Returns:
+            Tuple[str, bytes, Parameter] -- URL, body and headers
+        """
         # Handles relative and absolute (e.g. for authentication) endpoints
         url = BASE_URL+endpoint if endpoint.startswith('/') else endpoint
         # Using empty dictionaries as default values causes all sorts of troubles in python
@@ -326,35 +1205,299 @@ class Pocket:
         }
         request_headers.update(headers)
         data = json.dumps(params).encode('utf-8')
-        LOGGER.debug(f'Network request to {url}')
-        LOGGER.debug(f'Body: {parameters}')
-        LOGGER.debug(f'Headers: {request_headers}')
-        try:
-            # Requests is blocking, so it's run like that
-            loop = asyncio.get_event_loop()
-            # run_in_executor doesn't take keyword arguments,
-            # => run through a wrapper which takes them positionally
-            resp = await loop.run_in_executor(
-                None,
-                self._async_post_wrapper,
-                url,
-                data,
-                request_headers)
-        except urllib_error.HTTPError as http_exception:
-            logger.error(f'Network error: {http_exception.code} - {http_exception.reason}: {http_exception.msg}')
-            if http_exception.code == 401:
-                raise InvalidAccessToken(self.access_token)
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug('Network request to %s', url)
+            LOGGER.debug('Body: %s', parameters)
+            LOGGER.debug('Headers: %s', request_headers)
+        return url, data, request_headers
+
+    def _raise_for_status(self, status_code: int, headers: Mapping[str, str]):
+        """Maps error responses to exceptions
+
+        Arguments:
+            status_code {int} -- HTTP status
+            headers {Mapping[str, str]} -- Response headers, Pocket explains errors in X-Error
+
+        Raises:
+            InvalidAccessToken: 401
+            AccessDenied: 403
+            ServerError: 5xx and 429
+            APIError: All other error statuses
+        """
+        if 200 <= status_code < 300:
+            return
+        error = headers.get('X-Error')
+        LOGGER.debug(f'Pocket returned {status_code}: {error}')
+        if status_code == 401:
+            raise InvalidAccessToken(self.access_token)
+        if status_code == 403:
+            raise AccessDenied(status_code, error)
+        # Too many requests passes just like an overloaded server
+        if status_code >= 500 or status_code == 429:
+            raise ServerError(status_code, error)
+        raise APIError(status_code, error)
+
+    async def _record_outcome(self, exception: BaseException = None):
+        """Tells the circuit breaker whether a request reached Pocket
+
+        Keyword Arguments:
+            exception {BaseException} -- The error of the request, None if it succeeded (default: {None})
+        """
+        if isinstance(exception, RETRYABLE_ERRORS):
+            trips = self.circuit_breaker.trips
+            await self.circuit_breaker.record_failure()
+            if self.metrics is not None and self.circuit_breaker.trips > trips:
+                self.metrics.count('circuit_opened')
+        else:
+            # Client errors are answered by a working server too
+            await self.circuit_breaker.record_success()
+
+    async def _with_retries(self, endpoint: str, attempt: Callable[[], Awaitable[any]]) -> any:
+        """Runs an idempotent request, retrying it after server and network errors
+
+        Arguments:
+            endpoint {str} -- The requested endpoint, for logs and metrics
+            attempt {Callable[[], Awaitable[any]]} -- Sends the request once
+
+        Returns:
+            any -- The result of the first successful attempt
+        """
+        for attempt_number in itertools.count(1):
+            try:
+                return await attempt()
+            except RETRYABLE_ERRORS as exception:
+                delay = self.retry_policy.delay(attempt_number)
+                if delay is None:
+                    if self.metrics is not None:
+                        self.metrics.count('retries_exhausted')
+                    raise
+                LOGGER.warning(f'Request to {endpoint} failed ({exception}), '
+                               f'retrying in {delay:.1f}s (attempt {attempt_number + 1})')
+                if self.metrics is not None:
+                    self.metrics.count('retries')
+                await asyncio.sleep(delay)
+
+    @contextlib.asynccontextmanager
+    async def _stream_request(self,
+                              endpoint: str,
+                              parameters: Parameter = None,
+                              headers: Parameter = None,
+                              timeout: float = None) -> AsyncIterator[transports.StreamedResponse]:
+        """Sends a request without reading the body, use as an async context manager.
+        Error statuses are raised before the body is handed out
+
+        Arguments:
+            endpoint {str} -- Relative or absolute endpoint
+
+        Keyword Arguments:
+            parameters {Parameter} -- Request parameters (default: {None})
+            headers {Parameter} -- Additional headers (default: {None})
+            timeout {float} -- Seconds until the request is given up (default: {None})
+
+        Raises:
+            APIError: Pocket answered with an error status, see _raise_for_status()
+            NetworkError: The request or the response failed
+
+        Yields:
+            transports.StreamedResponse -- The response
+        """
+        url, data, request_headers = self._prepare_request(endpoint, parameters, headers)
+        async with self.circuit_breaker, self.rate_limiter:
+            if self.metrics is not None:
+                start = time.perf_counter()
+            status_code = 0
+            resp = None
+            try:
+                # Reading the body can fail too, so the caller's reads are mapped as well
+                async with self.transport.stream(url, data, request_headers, timeout) as resp:
+                    status_code = resp.status_code
+                    self.rate_limiter.update(resp.headers)
+                    if LOGGER.isEnabledFor(logging.DEBUG):
+                        LOGGER.debug('Response Headers: %s', resp.headers)
+                        LOGGER.debug('Response Status: %s', resp.status_code)
+                    self._raise_for_status(resp.status_code, resp.headers)
+                    yield resp
+            except transports.TransportTimeout as timeout_exception:
+                await self._record_outcome(RequestTimeout(timeout_exception))
+                raise RequestTimeout(timeout_exception) from timeout_exception
+            except transports.TransportError as transport_error:
+                await self._record_outcome(NetworkError(transport_error))
+                raise NetworkError(transport_error) from transport_error
+            except PocketException as pocket_exception:
+                await self._record_outcome(pocket_exception)
+                raise
             else:
-                raise PocketException(
-                    f'{http_exception.code} - {http_exception.reason}: {http_exception.msg}')
-        LOGGER.debug(f'Response Headers: {resp.headers}')
-        LOGGER.debug(f'Response Encoding: {resp.encoding}')
-        LOGGER.debug(f'Response Status: {resp.status_code }')
-        if not endpoint == '/get' or 'count' in parameters:
-            LOGGER.debug(f'Response Text: {resp.text}')
-            LOGGER.debug(f'Response JSON: {resp.json()}')
+                await self._record_outcome()
+            finally:
+                if self.metrics is not None:
+                    self.metrics.request(endpoint,
+                                         time.perf_counter() - start,
+                                         status_code,
+                                         len(data),
+                                         resp.bytes_read if resp is not None else 0)
+                    if resp is not None:
+                        self.metrics.count('response_bytes_decoded', resp.bytes_decoded)
+
+    async def _make_request(self,
+                            endpoint: str,
+                            parameters: Parameter = None,
+                            headers: Parameter = None,
+                            timeout: float = None) -> transports.Response:
+        """Sends a request and reads the response.
+        Requests to idempotent endpoints are retried after server and network errors
+
+        Arguments:
+            endpoint {str} -- Relative or absolute endpoint
+
+        Keyword Arguments:
+            parameters {Parameter} -- Request parameters (default: {None})
+            headers {Parameter} -- Additional headers (default: {None})
+            timeout {float} -- Seconds until the request is given up (default: {None})
+
+        Raises:
+            APIError: Pocket answered with an error status, see _raise_for_status()
+            NetworkError: The request or the response failed
+
+        Returns:
+            transports.Response -- The response
+        """
+        attempt = functools.partial(self._request_once, endpoint, parameters, headers, timeout)
+        if endpoint in IDEMPOTENT_ENDPOINTS:
+            return await self._with_retries(endpoint, attempt)
+        return await attempt()
+
+    async def _request_once(self,
+                            endpoint: str,
+                            parameters: Parameter = None,
+                            headers: Parameter = None,
+                            timeout: float = None) -> transports.Response:
+        """Sends a request once, see _make_request()"""
+        parameters = {} if parameters is None else parameters
+        url, data, request_headers = self._prepare_request(endpoint, parameters, headers)
+        debug = LOGGER.isEnabledFor(logging.DEBUG)
+        async with self.circuit_breaker:
+            try:
+                async with self.rate_limiter:
+                    if self.metrics is not None:
+                        start = time.perf_counter()
+                    try:
+                        resp = await self.transport.post(url, data, request_headers, timeout)
+                    except Exception:
+                        if self.metrics is not None:
+                            self.metrics.request(endpoint, time.perf_counter() - start, 0, len(data), 0)
+                        raise
+                    if self.metrics is not None:
+                        self.metrics.request(endpoint,
+                                             time.perf_counter() - start,
+                                             resp.status_code,
+                                             len(data),
+                                             resp.bytes_read)
+                        self.metrics.count('response_bytes_decoded', len(resp.content))
+                    self.rate_limiter.update(resp.headers)
+                if debug:
+                    LOGGER.debug('Response Headers: %s', resp.headers)
+                    LOGGER.debug('Response Encoding: %s', resp.encoding)
+                    LOGGER.debug('Response Status: %s', resp.status_code)
+                    # Article lists are too large to be logged
+                    if endpoint != '/get' or parameters.get('count') == 1:
+                        LOGGER.debug('Response Text: %s', resp.text)
+                self._raise_for_status(resp.status_code, resp.headers)
+            except transports.TransportTimeout as timeout_exception:
+                await self._record_outcome(RequestTimeout(timeout_exception))
+                raise RequestTimeout(timeout_exception) from timeout_exception
+            except transports.TransportError as transport_error:
+                await self._record_outcome(NetworkError(transport_error))
+                raise NetworkError(transport_error) from transport_error
+            except PocketException as pocket_exception:
+                await self._record_outcome(pocket_exception)
+                raise
+            await self._record_outcome()
         return resp
 
+    def _decode(self, resp: transports.Response) -> Dict[str, any]:
+        """Decodes a JSON response
+
+        Arguments:
+            resp {transports.Response} -- The response
+
+        Returns:
+            Dict[str, any] -- The decoded body
+        """
+        if self.metrics is None:
+            return json.loads(resp.content)
+        start = time.perf_counter()
+        decoded = json.loads(resp.content)
+        self.metrics.timing('json_decode', time.perf_counter() - start)
+        return decoded
+
+class ActionBatch:
+    """Queues actions and sends them in chunks of batch_size through /send.
+    Every queued action gets a future with its result"""
+
+    def __init__(self, pocket: Pocket, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.pocket = pocket
+        self.batch_size = batch_size
+        self._queue = []
+        self._sending = []
+
+    def add(self, action_name: str, action: Dict[str, str]) -> asyncio.Future:
+        """Queues an action. A full chunk is sent right away
+
+        Arguments:
+            action_name {str} -- Name of the action, e.g. 'add', 'delete', 'tags_add'
+            action {Dict[str, str]} -- The action parameters
+
+        Returns:
+            asyncio.Future -- Resolves to the action's result,
+            or raises ActionError if Pocket reported an error for it
+        """
+        action = dict(action, action=action_name)
+        future = asyncio.get_event_loop().create_future()
+        self._queue.append((action, future))
+        if len(self._queue) >= self.batch_size:
+            self._send_queue()
+        return future
+
+    def _send_queue(self):
+        chunk, self._queue = self._queue, []
+        if chunk:
+            self._sending.append(asyncio.ensure_future(self._send_chunk(chunk)))
+
+    async def _send_chunk(self, chunk: List[Tuple[Dict[str, str], asyncio.Future]]):
+        """Sends a chunk of actions and resolves their futures
+
+        Arguments:
+            chunk {List[Tuple[Dict[str, str], asyncio.Future]]} -- Actions and their futures
+        """
+        try:
+            responses = await self.pocket._send_actions([action for action, _ in chunk])
+        except Exception as exception:
+            for _, future in chunk:
+                if not future.done():
+                    future.set_exception(exception)
+            return
+        for (action, future), (result, error) in zip(chunk, responses):
+            if future.done():
+                continue
+            if error:
+                LOGGER.error(f'Error sending an action to Pocket: {error}')
+                future.set_exception(ActionError(action['action'], error))
+            else:
+                future.set_result(result)
+
+    async def flush(self):
+        """Sends all queued actions and waits until every chunk has been answered"""
+        self._send_queue()
+        sending, self._sending = self._sending, []
+        if sending:
+            await asyncio.gather(*sending)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.flush()
+
 class DataClassJSONEncoder(json.JSONEncoder):
     """JSON Encoder to encode dataclasses"""
     def default(self, o):
@@ -379,6 +1522,30 @@ class InvalidAccessToken(PocketException):
         self.access_token = access_token
         super().__init__(f'The provided "{access_token}" is invalid')
 
+class APIError(PocketException):
+    """Pocket answered with an error status"""
+    status_code = None
+    error = None
+    def __init__(self, status_code, error=None):
+        self.status_code = status_code
+        self.error = error
+        super().__init__(f'{status_code} - {error or "Request failed"}')
+
+class AccessDenied(APIError):
+    """Pocket refused the request (403), e.g. the consumer key is invalid or the rate limit is exceeded"""
+
+class ServerError(APIError):
+    """Pocket failed to handle the request (5xx)"""
+
+class NetworkError(PocketException):
+    """The request didn't reach Pocket, or the response didn't arrive"""
+
+class RequestTimeout(NetworkError):
+    """No response within the timeout"""
+
+# Failures which might pass when the request is sent again
+RETRYABLE_ERRORS = (ServerError, NetworkError)
+
 class ActionError(PocketException):
     """The action endpoint reported an error"""
     action = None
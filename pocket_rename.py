@@ -1,11 +1,21 @@
 #!/usr/bin/env python
 
 '''Small tool to rename items in your pocket list'''
+import time
+# Start of the app, the time to the first frame is measured from here
+STARTED = time.perf_counter()
+import re
 import json
+import os
 import sys
+import hashlib
+import functools
+import dataclasses
 import asyncio
-from typing import List
+import argparse
+from typing import List, Optional, Tuple, Union
 import pocket
+import search
 import logging
 CURSES_AVAILABLE = True
 try:
@@ -17,6 +27,89 @@ except Exception:
 Articles = List[pocket.Article]
 
 CONFIG_FILE_PATH = 'config.json'
+# The local copy of the list is kept next to the config
+STORE_FILE_NAME = 'articles.sqlite'
+JOURNAL_FILE_NAME = 'renames.sqlite'
+TITLE_CACHE_FILE_NAME = 'titles.sqlite'
+TOKEN_CACHE_FILE_NAME = 'token-cache.json'
+# Seconds a validated access token is trusted without waiting for Pocket
+TOKEN_VALIDATION_TTL = 24 * 60 * 60
+# Seconds between checks for a key press where stdin can't be watched by the event loop
+INPUT_POLL_INTERVAL = 0.05
+# Seconds until getch() is called even though stdin isn't readable, to notice resizes
+RESIZE_CHECK_INTERVAL = 0.5
+# Milliseconds to wait for the rest of an escape sequence after Esc
+ESCAPE_DELAY = 25
+# Articles whose tags are loaded per request while the list is filtered
+TAGS_PAGE_SIZE = 100
+
+def record_first_frame(app: pocket.Pocket):
+    """Records the time from the start of the app until the list is first shown
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+    """
+    duration = time.perf_counter() - STARTED
+    logging.info(f'First frame after {duration * 1000:.0f}ms')
+    if app.metrics is not None:
+        app.metrics.timing('first_frame', duration)
+
+def _token_hash(access_token: str) -> str:
+    return hashlib.sha256(access_token.encode('utf-8')).hexdigest()
+
+def read_token_validation(path: str, access_token: str) -> Optional[float]:
+    """Reads when an access token was last found to be valid
+
+    Arguments:
+        path {str} -- The token cache file
+        access_token {str} -- The access token
+
+    Returns:
+        Optional[float] -- Unix time of the last validation, None if unknown
+    """
+    try:
+        with open(path, encoding='utf-8') as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not access_token or cache.get('token') != _token_hash(access_token):
+        return None
+    return cache.get('validated_at')
+
+def write_token_validation(path: str, access_token: Optional[str]):
+    """Records that an access token is valid right now
+
+    Arguments:
+        path {str} -- The token cache file
+        access_token {Optional[str]} -- The valid token, None to clear the cache
+    """
+    if access_token is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path, mode='w', encoding='utf-8') as file:
+        json.dump({'token': _token_hash(access_token), 'validated_at': time.time()}, file)
+
+async def revalidate_token(app: pocket.Pocket, cache_path: str) -> bool:
+    """Checks the cached access token while the app is already running
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        cache_path {str} -- The token cache file
+
+    Returns:
+        bool -- False if Pocket rejected the token
+    """
+    try:
+        valid = await app.validate_access_token()
+    except Exception as exception:
+        # Can't tell, the token stays trusted until the cache expires
+        logging.warning(f'Could not validate the access token: {exception}')
+        return True
+    write_token_validation(cache_path, app.access_token if valid else None)
+    if not valid:
+        logging.error('The access token is no longer valid')
+    return valid
 
 def cli_get_article_selection(num_articles: int) -> int:
     """Prompts the user to select an article from the list
@@ -64,19 +157,114 @@ async def tui_print_loading(screen, message: str = 'Loading'):
         await asyncio.sleep(0.5)
         num_dots = (num_dots+1) % 4
 
+def describe_rename_status(status: pocket.RenameStatus) -> str:
+    """Describes the outcome of a rename for the user
+
+    Arguments:
+        status {pocket.RenameStatus} -- The rename status
+
+    Returns:
+        str -- The description
+    """
+    if pocket.RenameStatus.ERR_READD_FAILED in status:
+        return 'Re-adding the article failed'
+    messages = ['Renamed']
+    if pocket.RenameStatus.WARN_NAME_NOT_CHANGED in status:
+        messages = ['Pocket kept its own title']
+    if pocket.RenameStatus.WARN_TIMESTAMP in status:
+        messages.append('the original timestamp was lost')
+    return ', '.join(messages)
+
+def needs_reconciliation(app: pocket.Pocket, article: pocket.Article) -> bool:
+    """Checks if the list should be compared with the server after a rename.
+    With a store that's a single small request, so it's always done.
+    Otherwise only if the rename didn't go as expected
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        article {pocket.Article} -- The renamed article
+
+    Returns:
+        bool -- True if the list should be reconciled
+    """
+    warnings = pocket.RenameStatus.WARN_NAME_NOT_CHANGED | pocket.RenameStatus.WARN_TIMESTAMP
+    return app.store is not None or bool(article.rename_status & warnings)
+
+async def reconcile_articles(app: pocket.Pocket,
+                             articles: Articles,
+                             state: str = 'unread') -> Tuple[Articles, List[int], bool]:
+    """Brings a list of articles up to date with the server.
+    Uses a delta sync if a store is available, otherwise reloads the whole list
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        articles {List[pocket.Article]} -- The displayed articles
+
+    Keyword Arguments:
+        state {str} -- State filter of the displayed list (default: {'unread'})
+
+    Returns:
+        Tuple[List[pocket.Article], List[int], bool] -- The updated list, indices of changed
+        articles and whether articles were added or removed
+    """
+    if app.store is None:
+        return await app.get_articles(state), [], True
+    return apply_changes(articles, await app.sync(), state)
+
+def apply_changes(articles: Articles,
+                  result: pocket.SyncResult,
+                  state: str = 'unread') -> Tuple[Articles, List[int], bool]:
+    """Applies the changes of a sync or poll to a list of articles
+
+    Arguments:
+        articles {List[pocket.Article]} -- The displayed articles, changed in place
+        result {pocket.SyncResult} -- The changed items
+
+    Keyword Arguments:
+        state {str} -- State filter of the displayed list (default: {'unread'})
+
+    Returns:
+        Tuple[List[pocket.Article], List[int], bool] -- The updated list, indices of changed
+        articles and whether articles were added or removed
+    """
+    wanted_statuses = pocket.STATE_STATUSES[state]
+    positions = {article.item_id: idx for idx, article in enumerate(articles)}
+    changed = []
+    added = []
+    removed = set()
+    for article, status in zip(result.articles, result.statuses):
+        idx = positions.get(article.item_id)
+        if status not in wanted_statuses:
+            if idx is not None:
+                removed.add(idx)
+        elif idx is None:
+            added.append(article)
+        elif articles[idx] != article:
+            articles[idx] = article
+            changed.append(idx)
+    if not added and not removed:
+        return articles, changed, False
+    # New items are the newest, so they go on top
+    added.sort(key=lambda a: int(a.time_added or 0), reverse=True)
+    articles = added + [a for idx, a in enumerate(articles) if idx not in removed]
+    return articles, [], True
+
 async def cli(app: pocket.Pocket):
     """Starts the regular, non-curses CLI
 
     Arguments:
         app {pocket.Pocket} -- The pocket instance
     """
+    articles = []
+    print('Articles in list:')
+    # Articles are printed as soon as their page arrives
+    async for article in app.iter_articles():
+        articles.append(article)
+        # The displayed numbmering starts at 1
+        print(f'{len(articles)}. {article}')
+        if len(articles) == 1:
+            record_first_frame(app)
     while True:
-        articles = await app.get_articles()
-        print('Articles in list:')
-        # +1 so the displayed numbmering starts at 1
-        for idx, article in enumerate(articles):
-            article_string = str(article)
-            print(f'{idx+1}. {article_string}')
         selected_index = cli_get_article_selection(len(articles))
         selected_article = articles[selected_index]
         article_string = str(selected_article)
@@ -84,89 +272,683 @@ async def cli(app: pocket.Pocket):
         new_name = None
         while not new_name:
             new_name = input("Enter a new name: ")
-        await app.rename_article(selected_article, new_name)
+        new_article = await app.rename_article(selected_article, new_name)
+        print(f'{describe_rename_status(new_article.rename_status)}: {new_article}')
+        # The renamed article replaces the old one instead of reloading the list
+        articles[selected_index] = new_article
+        if needs_reconciliation(app, new_article):
+            articles, _, _ = await reconcile_articles(app, articles)
+        print('Articles in list:')
+        for idx, article in enumerate(articles):
+            print(f'{idx+1}. {article}')
+
+class ArticleListView:
+    """Scrollable list of articles in a curses window.
+    Only the visible rows are ever drawn, long lines are cut off at the window border
+    and can be scrolled horizontally. The list can be filtered using a search index"""
+
+    def __init__(self, screen, articles: Articles = None, col: int = 2):
+        """
+        Arguments:
+            screen {ncurses.window} -- The window to draw the list in
+
+        Keyword Arguments:
+            articles {List[pocket.Article]} -- List of articles to display (default: {None})
+            col {int} -- Column to start the list in (default: {2})
+        """
+        self.screen = screen
+        # All articles, and the ones currently displayed
+        self.library = [] if articles is None else articles
+        self.articles = self.library
+        self.index = search.ArticleIndex(self.library)
+        self._positions = {a.item_id: idx for idx, a in enumerate(self.library)}
+        # None if the list isn't filtered
+        self.query = None
+        self.editing_query = False
+        self._matches = None
+        self.col = col
+        self.selected = 0
+        self.top = 0
+        self.hoffset = 0
+        self.status = None
+        # Rows at the top covered by a prompt, they aren't drawn until it's closed
+        self.covered_rows = 0
+        self.num_rows, self.num_cols = screen.getmaxyx()
+
+    @property
+    def list_rows(self) -> int:
+        """Number of rows available for articles, the first row is the header"""
+        return max(0, self.num_rows - 1)
 
-def tui_draw_article_list(
-        pad,
-        articles: Articles,
-        num_rows: int,
-        num_cols: int,
-        col: int = 2):
-    """Draws the list of articles using curses
+    def resize(self):
+        """Adapts to a changed window size and redraws everything"""
+        self.num_rows, self.num_cols = self.screen.getmaxyx()
+        self.select(self.selected)
+        self.draw()
+
+    def reset(self, articles: Articles = None):
+        """Replaces the articles and scrolls back to the top
+
+        Keyword Arguments:
+            articles {List[pocket.Article]} -- The new articles (default: {None})
+        """
+        self.library = [] if articles is None else articles
+        self.index.replace_all(self.library)
+        self._positions = {a.item_id: idx for idx, a in enumerate(self.library)}
+        self.articles = self._filter(self.query)
+        self.selected = 0
+        self.top = 0
+
+    def _filter(self, query: str) -> Articles:
+        """Returns the articles matching a query in list order.
+        If the query extends the previous one, only the previous matches are searched
+
+        Arguments:
+            query {str} -- The query, None or empty for all articles
+
+        Returns:
+            List[pocket.Article] -- The matching articles
+        """
+        previous = self.query
+        self.query = query
+        if not query:
+            self._matches = None
+            return self.library
+        within = self._matches if previous and query.startswith(previous) else None
+        self._matches = self.index.search(query, within)
+        if len(self._matches) * 8 < len(self.library):
+            positions = self._positions
+            return [self.library[positions[i]] for i in sorted(self._matches, key=positions.get)]
+        return [a for a in self.library if a.item_id in self._matches]
+
+    def set_filter(self, query: str = None):
+        """Filters the displayed articles, keeping the selected article selected if it matches
+
+        Keyword Arguments:
+            query {str} -- Search query, None to show all articles (default: {None})
+        """
+        self._show(self._filter(query))
+
+    def _show(self, articles: Articles):
+        """Displays a different list, keeping the selected article selected if possible"""
+        selected_id = self.articles[self.selected].item_id if self.articles else None
+        self.articles = articles
+        selected = next(
+            (idx for idx, a in enumerate(articles) if a.item_id == selected_id), self.selected)
+        self.selected = max(0, min(selected, len(articles) - 1))
+        self.top = max(0, min(self.top, self.selected))
+        if self.selected >= self.top + self.list_rows:
+            self.top = self.selected - self.list_rows + 1
+        self.draw()
+
+    def _draw_header(self):
+        if self.covered_rows > 0:
+            return
+        self.screen.move(0, 0)
+        self.screen.clrtoeol()
+        header = 'Articles in list:'
+        if self.articles:
+            header += f' {self.selected+1}/{len(self.articles)}'
+        if self.query is not None:
+            header += f' /{self.query}'
+            if self.editing_query:
+                header += '_'
+        if self.status:
+            header += f' - {self.status}'
+        self.screen.addstr(0, 0, header[:self.num_cols-1], curses.A_BOLD)
+
+    def draw_row(self, idx: int):
+        """Draws a single article if it is visible
+
+        Arguments:
+            idx {int} -- List index of the article
+        """
+        row = idx - self.top + 1
+        if row < max(1, self.covered_rows) or row > self.list_rows:
+            return
+        self.screen.move(row, 0)
+        self.screen.clrtoeol()
+        if idx >= len(self.articles):
+            return
+        article = self.articles[idx]
+        if idx == self.selected:
+            self.screen.addstr(row, 0, '>')
+        if pocket.RenameStatus.ERR_READD_FAILED in article.rename_status and self.col > 1:
+            # Marks articles whose rename failed
+            self.screen.addstr(row, 1, '!')
+        # The last column is left empty, writing to the bottom right corner fails
+        width = self.num_cols - self.col - 1
+        skip = self.hoffset
+        col = self.col
+        segments = (
+            (article.get_title(), curses.A_NORMAL),
+            (': ', curses.A_NORMAL),
+            (article.resolved_url or '', curses.A_UNDERLINE))
+        for text, attr in segments:
+            if skip >= len(text):
+                skip -= len(text)
+                continue
+            text = text[skip:skip + width - (col - self.col)]
+            skip = 0
+            if not text:
+                break
+            # Line breaks would mess up the following rows
+            self.screen.addstr(row, col, text.replace('\n', ' ').replace('\r', ' '), attr)
+            col += len(text)
+
+    def draw(self):
+        """Redraws the header and all visible rows"""
+        self._draw_header()
+        for idx in range(self.top, self.top + self.list_rows):
+            self.draw_row(idx)
+        self.screen.refresh()
+
+    def select(self, idx: int):
+        """Moves the selection, scrolling if it leaves the visible part
+
+        Arguments:
+            idx {int} -- List index to select
+        """
+        idx = max(0, min(idx, len(self.articles) - 1))
+        previous, self.selected = self.selected, idx
+        if idx < self.top:
+            self.scroll(idx - self.top)
+        elif idx >= self.top + self.list_rows:
+            self.scroll(idx - (self.top + self.list_rows - 1))
+        # Moves the selection marker, rows which aren't visible are skipped
+        self.draw_row(previous)
+        self.draw_row(idx)
+        self._draw_header()
+        self.screen.refresh()
+
+    def scroll(self, lines: int):
+        """Scrolls the list vertically, only the rows which came into view are drawn
+
+        Arguments:
+            lines {int} -- Number of rows, negative values scroll up
+        """
+        self.top = max(0, self.top + lines)
+        if abs(lines) >= self.list_rows or self.list_rows < 2:
+            self.draw()
+            return
+        self.screen.setscrreg(1, self.num_rows - 1)
+        self.screen.scrollok(True)
+        self.screen.scroll(lines)
+        self.screen.scrollok(False)
+        if lines > 0:
+            exposed = range(self.top + self.list_rows - lines, self.top + self.list_rows)
+        else:
+            exposed = range(self.top, self.top - lines)
+        for idx in exposed:
+            self.draw_row(idx)
+
+    def scroll_horizontal(self, cols: int):
+        """Scrolls all rows horizontally
+
+        Arguments:
+            cols {int} -- Number of columns, negative values scroll left
+        """
+        hoffset = max(0, self.hoffset + cols)
+        if hoffset != self.hoffset:
+            self.hoffset = hoffset
+            self.draw()
+
+    def set_status(self, status: str = None):
+        """Shows a message in the header
+
+        Keyword Arguments:
+            status {str} -- The message, None to remove it (default: {None})
+        """
+        self.status = status
+        self._draw_header()
+        self.screen.refresh()
+
+    def replace(self, idx: int, article: pocket.Article):
+        """Replaces a single article and redraws only its row
+
+        Arguments:
+            idx {int} -- List index of the article
+            article {pocket.Article} -- The new article
+        """
+        old_article = self.articles[idx]
+        self.articles[idx] = article
+        if self.articles is not self.library:
+            self.library[self._positions[old_article.item_id]] = article
+        if article.item_id != old_article.item_id:
+            self._positions[article.item_id] = self._positions.pop(old_article.item_id)
+            self.index.remove(old_article.item_id)
+        self.index.add(article)
+        self.draw_row(idx)
+        self.screen.refresh()
+
+    def replace_item(self, item_id: str, article: pocket.Article):
+        """Replaces an article wherever it is by now, the list might have changed
+        since it was picked. Its row is only redrawn if it's displayed
+
+        Arguments:
+            item_id {str} -- Id of the replaced article
+            article {pocket.Article} -- The new article
+        """
+        position = self._positions.get(item_id)
+        if position is None:
+            return
+        old_article = self.library[position]
+        if self.articles is self.library:
+            self.replace(position, article)
+            return
+        idx = next((idx for idx, a in enumerate(self.articles) if a is old_article), None)
+        if idx is not None:
+            self.replace(idx, article)
+            return
+        # Filtered out, so nothing is drawn
+        self.library[position] = article
+        if article.item_id != item_id:
+            self._positions[article.item_id] = self._positions.pop(item_id)
+            self.index.remove(item_id)
+        self.index.add(article)
+
+    def replace_hydrated(self, articles: Articles):
+        """Replaces articles by their versions with details, so their tags can be searched.
+        Articles which got their details in the meantime are kept
+
+        Arguments:
+            articles {List[pocket.Article]} -- The articles with details
+        """
+        changed = []
+        for article in articles:
+            idx = self._positions.get(article.item_id)
+            if idx is not None and not self.library[idx].hydrated:
+                self.library[idx] = article
+                changed.append(idx)
+        self.update(self.library, changed, False)
+
+    def cover(self, rows: int = 0):
+        """Keeps the top rows free for a prompt, or redraws them once it's closed
+
+        Keyword Arguments:
+            rows {int} -- Number of covered rows, 0 when the prompt is closed (default: {0})
+        """
+        covered, self.covered_rows = self.covered_rows, rows
+        if rows == 0 and covered > 0:
+            self._draw_header()
+            for idx in range(self.top, self.top + covered - 1):
+                self.draw_row(idx)
+            self.screen.refresh()
+
+    def update(self, articles: Articles, changed: List[int], structure_changed: bool):
+        """Shows an updated list. Only changed rows are redrawn,
+        unless articles were added or removed or the list is filtered.
+        The selected article stays selected
+
+        Arguments:
+            articles {List[pocket.Article]} -- The updated list of all articles
+            changed {List[int]} -- Indices of changed articles
+            structure_changed {bool} -- Articles were added or removed
+        """
+        self.library = articles
+        if structure_changed:
+            self.index.replace_all(articles)
+            self._positions = {a.item_id: idx for idx, a in enumerate(articles)}
+        else:
+            for idx in changed:
+                self.index.add(articles[idx])
+        if self.query:
+            # A changed article might not match anymore, search again
+            query, self.query = self.query, None
+            self._show(self._filter(query))
+        elif structure_changed:
+            self._show(articles)
+        else:
+            self.articles = articles
+            for idx in changed:
+                self.draw_row(idx)
+            self.screen.refresh()
+
+    def extend(self, articles: Articles):
+        """Appends articles, drawing those which are visible
+
+        Arguments:
+            articles {List[pocket.Article]} -- The articles to add
+        """
+        start = len(self.library)
+        self.library.extend(articles)
+        self.index.extend(articles)
+        for offset, article in enumerate(articles):
+            self._positions[article.item_id] = start + offset
+        if self.articles is not self.library:
+            start = len(self.articles)
+            for article in articles:
+                if self.index.matches(article.item_id, self.query):
+                    self._matches.add(article.item_id)
+                    self.articles.append(article)
+        for idx in range(start, min(len(self.articles), self.top + self.list_rows)):
+            self.draw_row(idx)
+        self._draw_header()
+        self.screen.refresh()
+
+async def tui_load_articles(screen, app: pocket.Pocket, view: ArticleListView) -> Articles:
+    """Loads the articles page by page and draws the list as soon as the first page arrives.
+    A local copy is shown right away and then brought up to date
 
     Arguments:
-        pad {ncurses.window} -- The curses pad to draw the list in
-        articles {List[pocket.Article]} -- List of articles to display
-        num_rows {int} -- Height of the ncurses window
-        num_cols {int} -- Width of the ncurses window
+        screen {ncurses.window} -- The ncurses window
+        app {pocket.Pocket} -- The pocket instance
+        view {ArticleListView} -- The list to display the articles in
 
-    Keyword Arguments:
-        col {int} -- Column to start the list in (default: {2})
+    Returns:
+        List[pocket.Article] -- The loaded articles
+    """
+    if app.store is not None and app.store.since is not None:
+        view.reset(app.store.get_articles())
+        view.draw()
+        record_first_frame(app)
+        await tui_reconcile(app, view)
+        return view.articles
+    view.reset()
+    first_page = True
+    # Display the loading animation until the first page is there
+    loading_tui = asyncio.create_task(
+        tui_print_loading(screen, 'Loading articles'))
+    try:
+        async for page in app.iter_pages():
+            if first_page:
+                loading_tui.cancel()
+                view.draw()
+            view.extend(page)
+            if first_page:
+                first_page = False
+                record_first_frame(app)
+    finally:
+        loading_tui.cancel()
+    if first_page:
+        # Empty list
+        view.draw()
+    return view.articles
+
+async def tui_reconcile(app: pocket.Pocket, view: ArticleListView):
+    """Compares the displayed list with the server and updates the rows that differ
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        view {ArticleListView} -- The displayed list
+    """
+    try:
+        articles, changed, structure_changed = await reconcile_articles(app, list(view.library))
+    except Exception as exception:
+        logging.warning(f'Could not reconcile the list with Pocket: {exception}')
+        return
+    view.update(articles, changed, structure_changed)
+
+async def tui_load_tags(app: pocket.Pocket, view: ArticleListView):
+    """Loads the tags of articles from a simple listing while the list is filtered,
+    so the filter can match them. The visible rows come first, then the rest of the
+    list one page at a time, each page is indexed and filtered again once it's there.
+    Stops when the filter is removed, the next search continues where it stopped
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        view {ArticleListView} -- The displayed list
+    """
+    # Articles which were tried already, so missing ones aren't requested again and again
+    tried = set()
+    position = 0
+    while view.query is not None:
+        articles = [article for article in view.articles[view.top:view.top + view.list_rows]
+                    if not article.hydrated and article.item_id not in tried]
+        while not articles and position < len(view.library):
+            page = view.library[position:position + TAGS_PAGE_SIZE]
+            position += len(page)
+            articles = [article for article in page if not article.hydrated and article.item_id not in tried]
+        if not articles:
+            break
+        tried.update(article.item_id for article in articles)
+        view.set_status('Loading tags')
+        try:
+            hydrated = await app.hydrate(articles)
+        except Exception as exception:
+            logging.warning(f'Could not load the tags: {exception}')
+            view.set_status('Could not load the tags')
+            return
+        view.status = None
+        view.replace_hydrated([article for article in hydrated if article.hydrated])
+    if view.status == 'Loading tags':
+        view.set_status(None)
+
+def tui_watch(app: pocket.Pocket, view: ArticleListView) -> 'watch.ListWatcher':
+    """Keeps the displayed list up to date in the background. Only the rows of
+    changed articles are redrawn, unless articles were added or removed
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        view {ArticleListView} -- The displayed list
+
+    Returns:
+        watch.ListWatcher -- The running watcher
     """
-    pad.addstr(0, 0, 'Articles in list:', curses.A_BOLD)
-    pad.addstr(1, 0, '>')
-    pad.move(1, 0)
-    for idx, article in enumerate(articles):
-        pad.addstr(idx+1, col, article.get_title())
-        pad.addstr(': ')
-        pad.addstr(article.resolved_url, curses.A_UNDERLINE)
-    pad.refresh(0, 0, 0, 0, num_rows-1, num_cols-1)
-
-def tui_get_new_name(screen, old_name_str: str) -> str:
-    """Prompts the user to enter a new name and reads it using ncurses
+    import watch
+    def on_change(result: pocket.SyncResult):
+        view.update(*apply_changes(list(view.library), result))
+
+    watcher = watch.ListWatcher(app, on_change)
+    watcher.start()
+    return watcher
+
+class KeyReader:
+    """Reads key presses without blocking the event loop. getch() never waits,
+    the event loop wakes the reader up when stdin becomes readable.
+    Where stdin can't be watched, e.g. on Windows, getch() is polled instead"""
+
+    def __init__(self, screen, fd: int = None):
+        """
+        Arguments:
+            screen {ncurses.window} -- The window reading the keys
+
+        Keyword Arguments:
+            fd {int} -- File descriptor the terminal input comes from (default: {sys.stdin.fileno()})
+        """
+        self.screen = screen
+        self.fd = sys.stdin.fileno() if fd is None else fd
+        self._readable = asyncio.Event()
+        self._loop = asyncio.get_event_loop()
+        screen.nodelay(True)
+        try:
+            self._loop.add_reader(self.fd, self._readable.set)
+            self.polling = False
+        except (NotImplementedError, ValueError, OSError):
+            self.polling = True
+
+    def close(self):
+        """Stops watching stdin"""
+        if not self.polling:
+            self._loop.remove_reader(self.fd)
+
+    async def read(self) -> Union[int, str]:
+        """Waits for the next key
+
+        Returns:
+            Union[int, str] -- The typed character, or the code of a special key like curses.KEY_DOWN
+        """
+        while True:
+            try:
+                # Curses might have read more than one key from stdin, so ask it first
+                return self.screen.get_wch()
+            except curses.error:
+                pass
+            if self.polling:
+                await asyncio.sleep(INPUT_POLL_INTERVAL)
+                continue
+            self._readable.clear()
+            try:
+                # Resizes don't make stdin readable, but are reported by get_wch()
+                await asyncio.wait_for(self._readable.wait(), RESIZE_CHECK_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def get_key(self) -> int:
+        """Waits for the next key
+
+        Returns:
+            int -- The key code, like getch() returns it
+        """
+        key = await self.read()
+        return ord(key) if isinstance(key, str) else key
+
+async def tui_get_new_name(screen, keys: KeyReader, old_name_str: str) -> Optional[str]:
+    """Prompts the user to enter a new name in the first two rows.
+    The keys are read one by one, so background tasks keep running while the user types
 
     Arguments:
         screen {ncurses.window} -- The curses window to draw the prompt in
+        keys {KeyReader} -- Reads the typed keys
         old_name_str {str} -- Old name of the article
 
     Returns:
-        str -- The entered new name
+        Optional[str] -- The entered new name, None if the prompt was cancelled with Esc
     """
     _, num_cols = screen.getmaxyx()
     lbl_old_name = 'Old name: '
+    lbl_new_name = 'Enter a new name: '
     max_str_len = num_cols - len(lbl_old_name)-1
     if len(old_name_str) > max_str_len:
         old_name_str = old_name_str[:max_str_len-3] + '...'
-    screen.addstr(lbl_old_name, curses.A_BOLD)
-    screen.addstr(f'{old_name_str}\n')
-    screen.addstr('Enter a new name: ')
-    curses.echo()
+    for prompt_row in (0, 1):
+        screen.move(prompt_row, 0)
+        screen.clrtoeol()
+    screen.addstr(0, 0, lbl_old_name, curses.A_BOLD)
+    screen.addstr(f'{old_name_str}')
+    screen.addstr(1, 0, lbl_new_name)
+    enter_keys = ('\n', '\r', curses.KEY_ENTER, getattr(curses, 'PADENTER', None))
+    backspace_keys = ('\x7f', '\b', curses.KEY_BACKSPACE)
+    chars = []
     curses.curs_set(1)
-    screen.refresh()
-    new_name = screen.getstr(1, 18)
-    curses.curs_set(0)
-    return new_name
+    try:
+        while True:
+            # The end of long names is shown
+            width = max(0, num_cols - len(lbl_new_name) - 1)
+            screen.move(1, len(lbl_new_name))
+            screen.clrtoeol()
+            if width:
+                screen.addstr(1, len(lbl_new_name), ''.join(chars)[-width:])
+            screen.refresh()
+            key = await keys.read()
+            if key in enter_keys:
+                return ''.join(chars)
+            if key == '\x1b':
+                return None
+            if key in backspace_keys:
+                if chars:
+                    chars.pop()
+            elif isinstance(key, str) and key.isprintable():
+                chars.append(key)
+    finally:
+        curses.curs_set(0)
+
+async def tui_rename(app: pocket.Pocket,
+                     view: ArticleListView,
+                     article: pocket.Article,
+                     new_name: str,
+                     renames: dict,
+                     watcher: 'watch.ListWatcher' = None):
+    """Renames an article in the background and shows the result in its row,
+    wherever that is once the rename is done
 
-async def tui(screen, app: pocket.Pocket):
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        view {ArticleListView} -- The displayed list
+        article {pocket.Article} -- The article to rename
+        new_name {str} -- The new title
+        renames {dict} -- The running renames by item_id, the article is removed once it's done
+
+    Keyword Arguments:
+        watcher {watch.ListWatcher} -- Is told about the rename, so the list is checked right away (default: {None})
+    """
+    try:
+        try:
+            new_article = await app.rename_article(article, new_name)
+        finally:
+            renames.pop(article.item_id, None)
+    except Exception as exception:
+        # Only unexpected errors are logged with their traceback
+        logging.error(f'Renaming {article.item_id} failed: {exception}',
+                      exc_info=not isinstance(exception, pocket.PocketException))
+        view.replace_item(article.item_id, dataclasses.replace(
+            article, rename_status=pocket.RenameStatus.ERR_READD_FAILED))
+        view.set_status(f'Renaming failed: {exception}')
+        return
+    view.replace_item(article.item_id, new_article)
+    view.set_status(describe_rename_status(new_article.rename_status))
+    if watcher is not None:
+        # The poll picks up the rename with a single small request
+        watcher.wake()
+    elif needs_reconciliation(app, new_article):
+        await tui_reconcile(app, view)
+
+async def tui_show_renames(view: ArticleListView, renames: dict):
+    """Animates the number of running renames in the header until all are done
+
+    Arguments:
+        view {ArticleListView} -- The displayed list
+        renames {dict} -- The running renames, by item_id
+    """
+    num_dots = 0
+    while renames:
+        count = len(renames)
+        view.set_status(f'Renaming {count} article{"s" if count > 1 else ""}{"." * (num_dots + 1)}')
+        await asyncio.sleep(0.5)
+        num_dots = (num_dots + 1) % 3
+
+async def tui(screen, app: pocket.Pocket, watch_list: bool = True):
     """Starts a curses TUI
 
     Arguments:
         screen {ncurses.window} -- The ncurses window to start the TUI in
         app {pocket.Pocket} -- The pocket instance
+
+    Keyword Arguments:
+        watch_list {bool} -- Poll for changes in the background (default: {True})
     """
     col = 2
-    row = 1
 
-    # Display the loading animation while loading the articles
-    loading_tui = asyncio.create_task(
-        tui_print_loading(screen, 'Loading articles'))
-    article_task = asyncio.create_task(
-        app.get_articles())
-    articles = await article_task
-    # Stop loading animation
-    loading_tui.cancel()
-
-    # Create pad and draw article list
-    num_rows, num_cols = screen.getmaxyx()
-    num_articles = len(articles)
-    col_widths = (len(str(a)) for a in articles)
-    pad = curses.newpad(num_articles+1, max(col_widths)+2)
-    pad.keypad(1)
-    screen.move(0, 0)
-    screen.clrtoeol()
-    tui_draw_article_list(pad, articles, num_rows, num_cols, col)
-    # Handle selection
-    pad_row = 0
+    screen.keypad(1)
+    view = ArticleListView(screen, col=col)
+    await tui_load_articles(screen, app, view)
+    watcher = tui_watch(app, view) if watch_list else None
+    try:
+        await tui_input_loop(screen, app, view, watcher)
+    finally:
+        if watcher is not None:
+            watcher.stop()
+
+async def tui_input_loop(screen,
+                         app: pocket.Pocket,
+                         view: ArticleListView,
+                         watcher: 'watch.ListWatcher' = None):
+    """Handles key presses until the user quits
+
+    Arguments:
+        screen {ncurses.window} -- The ncurses window
+        app {pocket.Pocket} -- The pocket instance
+        view {ArticleListView} -- The displayed list
+
+    Keyword Arguments:
+        watcher {watch.ListWatcher} -- Is told about renames, so they show up right away (default: {None})
+    """
+    # Columns moved per key press when scrolling horizontally
+    hscroll_step = 8
+    # References to running background tasks, so they aren't garbage collected
+    background_tasks = set()
+    # Running renames by item_id, and the task showing their progress
+    renames = {}
+    progress = None
+    # Loads the tags for the filter, started by the first search
+    loading_tags = None
+
+    def run_in_background(coroutine) -> asyncio.Task:
+        task = asyncio.create_task(coroutine)
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+        return task
+
     # Some codes are not available on all platforms
     curses_functions = dir(curses)
     # Powershell is reporting the wrong key code
@@ -175,75 +957,107 @@ async def tui(screen, app: pocket.Pocket):
     left_keys = (curses.KEY_LEFT, curses.KEY_B1 if 'KEY_B1' in curses_functions else None)
     right_keys = (curses.KEY_RIGHT, curses.KEY_B3 if 'KEY_B3' in curses_functions else None)
     enter_keys = (curses.PADENTER if 'PADENTER' in curses_functions else None, curses.KEY_ENTER, 13, 10)
-    while True:
-        key = pad.getch()
-        if key in down_keys and row < num_articles:
-            pad.addstr(row, 0, ' ')
-            row += 1
-            pad.addstr(row, 0, '>')
-            row_in_window = row-pad_row
-            if row_in_window == num_rows and row <= num_articles:
-                pad_row += 1
-            pad.refresh(pad_row, 0, 0, 0, num_rows-1, num_cols-1)
-        elif key in up_keys and row > 1:
-            pad.addstr(row, 0, ' ')
-            row -= 1
-            pad.addstr(row, 0, '>')
-            row_in_window = row-pad_row
-            if row_in_window == 0 and row > 0:
-                pad_row -= 1
-            pad.refresh(pad_row, 0, 0, 0, num_rows-1, num_cols-1)
-        elif key in right_keys:
-            pass
-        elif key in left_keys:
-            #TODO Scroll for long lines
-            pass
-        elif key == ord('q'):
-            #TODO Scroll for long lines
-            return
-        elif key in enter_keys:
-            # Get new name from user
-            pad.clear()
-            pad_row = 0
-            pad.refresh(pad_row, 0, 0, 0, num_rows-1, num_cols-1)
-            screen.refresh()
-            try:
-                new_name = tui_get_new_name(screen, str(articles[row-1])).decode('utf-8')
-                screen.clear()
-                screen.refresh()
-                # Rename article
-                loading_tui = asyncio.create_task(
-                    tui_print_loading(screen, 'Renaming article'))
-                rename_task = asyncio.create_task(
-                    app.rename_article(articles[row-1], new_name))
-                await rename_task
-                # Reload and display new list
-                article_task = asyncio.create_task(
-                    app.get_articles())
-                articles = await article_task
-                loading_tui.cancel()
-            except KeyboardInterrupt:
-                pass
-            screen.clear()
-            screen.refresh()
-            row = 1
-            tui_draw_article_list(pad, articles, num_rows, num_cols, col)
-        else:
-            print(f'Unknown key: {key} - {curses.keyname(key)}', file=sys.stderr)
+    backspace_keys = (curses.KEY_BACKSPACE, 127, 8)
+    escape_key = 27
+    keys = KeyReader(screen)
+    try:
+        while True:
+            typed = await keys.read()
+            key = ord(typed) if isinstance(typed, str) else typed
+            articles = view.articles
+            if view.editing_query:
+                # Typing a search query, the list is filtered with every key
+                if key in enter_keys:
+                    view.editing_query = False
+                    view.set_filter(view.query or None)
+                    continue
+                if key == escape_key:
+                    view.editing_query = False
+                    view.set_filter(None)
+                    continue
+                if key in backspace_keys:
+                    view.set_filter(view.query[:-1])
+                    continue
+                # Any printable character, key codes like curses.KEY_DOWN aren't strings
+                if isinstance(typed, str) and typed.isprintable():
+                    view.set_filter(view.query + typed)
+                    continue
+            if key == ord('/'):
+                view.editing_query = True
+                view.set_filter(view.query or '')
+                if loading_tags is None or loading_tags.done():
+                    loading_tags = run_in_background(tui_load_tags(app, view))
+            elif key == escape_key and view.query is not None:
+                view.set_filter(None)
+            elif key in down_keys:
+                view.select(view.selected + 1)
+            elif key in up_keys:
+                view.select(view.selected - 1)
+            elif key == curses.KEY_NPAGE:
+                view.select(view.selected + view.list_rows)
+            elif key == curses.KEY_PPAGE:
+                view.select(view.selected - view.list_rows)
+            elif key == curses.KEY_HOME:
+                view.select(0)
+            elif key == curses.KEY_END:
+                view.select(len(articles) - 1)
+            elif key in right_keys:
+                view.scroll_horizontal(hscroll_step)
+            elif key in left_keys:
+                view.scroll_horizontal(-hscroll_step)
+            elif key == curses.KEY_RESIZE:
+                view.resize()
+            elif key == ord('q'):
+                if renames:
+                    # Interrupted renames would only be finished on the next start
+                    view.set_status(f'Waiting for {len(renames)} running renames')
+                    await asyncio.gather(*renames.values(), return_exceptions=True)
+                return
+            elif key in enter_keys and articles:
+                article = articles[view.selected]
+                if article.item_id in renames:
+                    view.set_status('This article is being renamed')
+                    continue
+                # Get new name from user, the prompt covers the first two rows.
+                # The list is still updated meanwhile, but not drawn there
+                view.cover(2)
+                try:
+                    new_name = await tui_get_new_name(screen, keys, str(article))
+                finally:
+                    view.cover(0)
+                if not new_name:
+                    continue
+                # Renames run in the background, so the list can be used meanwhile
+                renames[article.item_id] = run_in_background(
+                    tui_rename(app, view, article, new_name, renames, watcher))
+                if progress is None or progress.done():
+                    progress = run_in_background(tui_show_renames(view, renames))
+            else:
+                print(f'Unknown key: {key} - {curses.keyname(key)}', file=sys.stderr)
+    finally:
+        keys.close()
+        for task in background_tasks:
+            task.cancel()
 
-async def tui_init(app):
+async def tui_init(app, watch_list: bool = True):
     """Inits the curses library and starts the interface
 
     Arguments:
         app {pocket.Pocket} -- The pocket instance
+
+    Keyword Arguments:
+        watch_list {bool} -- Poll for changes in the background (default: {True})
     """
     screen = curses.initscr()
+    if hasattr(curses, 'set_escdelay'):
+        # Esc closes prompts, so it shouldn't hold up the input for a second
+        curses.set_escdelay(ESCAPE_DELAY)
     curses.start_color()
     curses.raw()
     curses.cbreak()
     curses.noecho()
     try:
-        await tui(screen, app)
+        await tui(screen, app, watch_list)
     except Exception as error:
         print(error)
     finally:
@@ -255,37 +1069,382 @@ async def tui_init(app):
         curses.echo()       # Turn echo back on
         curses.endwin()
 
-async def main():
-    """Main function"""
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    """Parses the command line arguments
+
+    Keyword Arguments:
+        argv {List[str]} -- The arguments, defaults to sys.argv (default: {None})
+
+    Returns:
+        argparse.Namespace -- The parsed arguments
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='-',
+        metavar='FILE',
+        help='Measure requests and parsing and write a report on exit. '
+             'Writes JSON if FILE ends in .json, text to stderr if no FILE is given')
+    parser.add_argument(
+        '--log-level',
+        default='DEBUG',
+        choices=('DEBUG', 'INFO', 'WARNING', 'ERROR'),
+        help='Level of the messages written to pocket.log (default: DEBUG)')
+    bulk_group = parser.add_argument_group(
+        'bulk rename',
+        'Rename articles listed in a CSV (item_id or url, and title columns) '
+        'or JSON lines file without user interaction')
+    bulk_group.add_argument(
+        '--rename-file',
+        metavar='FILE',
+        help='The mapping of articles to new titles')
+    bulk_group.add_argument(
+        '--results',
+        metavar='FILE',
+        help='JSON lines file the result of every rename or tag change is appended to '
+             '(default: FILE.results.jsonl for renames)')
+    bulk_group.add_argument(
+        '--checkpoint',
+        metavar='FILE',
+        help='Keys of finished renames, used to resume an interrupted run '
+             '(default: RESULTS.checkpoint)')
+    bulk_group.add_argument(
+        '--concurrency',
+        type=int,
+        help='Number of renames running at the same time (default: 8)')
+    bulk_group.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Only write which renames would be done, skipped or not found '
+             '(to FILE.plan.jsonl unless --results is given), or which tags would change')
+    bulk_group.add_argument(
+        '--force',
+        action='store_true',
+        help='Also try renames which are predicted to leave the title unchanged')
+    tag_group = parser.add_argument_group(
+        'bulk tags',
+        'Change the tags of all articles matching a query without user interaction. '
+        'The result of every article is written to --results, or printed. '
+        'With --dry-run, only what would change is reported')
+    tag_group.add_argument(
+        '--add-tags',
+        metavar='TAGS',
+        help='Comma separated tags to add')
+    tag_group.add_argument(
+        '--remove-tags',
+        metavar='TAGS',
+        help='Comma separated tags to remove')
+    tag_group.add_argument(
+        '--rename-tag',
+        nargs=2,
+        metavar=('OLD', 'NEW'),
+        help='Tag to rename')
+    tag_group.add_argument(
+        '--tag',
+        help='Only articles with this tag, _untagged_ for articles without tags')
+    tag_group.add_argument(
+        '--domain',
+        help='Only articles on this domain')
+    tag_group.add_argument(
+        '--title',
+        metavar='REGEX',
+        help='Only articles whose title matches this regular expression, ignoring case')
+    tag_group.add_argument(
+        '--older-than',
+        type=float,
+        metavar='DAYS',
+        help='Only articles added more than DAYS ago')
+    tag_group.add_argument(
+        '--newer-than',
+        type=float,
+        metavar='DAYS',
+        help='Only articles added less than DAYS ago')
+    tag_group.add_argument(
+        '--state',
+        default='all',
+        choices=('unread', 'archive', 'all'),
+        help='Only articles in this state, also used by --export and --dedup (default: all)')
+    dedup_group = parser.add_argument_group(
+        'duplicates',
+        'Merge articles saved more than once, e.g. with tracking parameters or via redirects. '
+        'The earliest saved article is kept and gets the tags of the others. '
+        'Selects articles by --state, reports to --results and supports --dry-run')
+    dedup_group.add_argument(
+        '--dedup',
+        action='store_true',
+        help='Find and merge duplicates')
+    export_group = parser.add_argument_group(
+        'export',
+        'Write the list to a file while it is downloaded, oldest articles first. '
+        'Selects articles by --state')
+    export_group.add_argument(
+        '--export',
+        metavar='FILE',
+        help='The file, CSV if it ends in .csv, otherwise JSON lines. - for stdout')
+    export_group.add_argument(
+        '--export-format',
+        choices=('ndjson', 'csv'),
+        help='Format of the file, instead of guessing it from the name')
+    export_group.add_argument(
+        '--fields',
+        help='Comma separated fields of the Pocket items to write (default: item_id,given_url,'
+             'resolved_url,given_title,resolved_title,tags,time_added,status)')
+    export_group.add_argument(
+        '--offset',
+        type=int,
+        default=0,
+        help='Continue an interrupted export, skipping this many articles and appending to FILE')
+    daemon_group = parser.add_argument_group(
+        'daemon',
+        'Keep running and take rename, tag and export jobs for all accounts '
+        'of the config through a local JSON API')
+    daemon_group.add_argument(
+        '--daemon',
+        action='store_true',
+        help='Run as daemon')
+    daemon_group.add_argument(
+        '--listen',
+        metavar='HOST:PORT',
+        help='Address of the API (default: 127.0.0.1:8765)')
+    daemon_group.add_argument(
+        '--socket',
+        metavar='PATH',
+        help='Serve the API on a Unix socket instead')
+    daemon_group.add_argument(
+        '--max-jobs',
+        type=int,
+        help='Jobs running at the same time, at most one per account (default: 4)')
+    return parser.parse_args(argv)
+
+async def bulk_rename(app: pocket.Pocket, args: argparse.Namespace):
+    """Renames the articles of the mapping file given on the command line
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        args {argparse.Namespace} -- The parsed command line arguments
+    """
+    import bulk
+    if args.dry_run:
+        results_path = args.results or args.rename_file + '.plan.jsonl'
+        summary = await bulk.plan_to_file(app, args.rename_file, results_path)
+    else:
+        results_path = args.results or args.rename_file + '.results.jsonl'
+        summary = await bulk.rename_from_file(
+            app,
+            args.rename_file,
+            results_path,
+            checkpoint_path=args.checkpoint,
+            concurrency=args.concurrency or bulk.DEFAULT_CONCURRENCY,
+            skip_predicted=not args.force)
+    for status, count in sorted(summary.items()):
+        print(f'{status}: {count}')
+    print(f'Results written to {results_path}')
+
+def split_tags(tags: Optional[str]) -> List[str]:
+    """Splits a comma separated list of tags"""
+    return [tag.strip() for tag in (tags or '').split(',') if tag.strip()]
+
+async def bulk_tag(app: pocket.Pocket, args: argparse.Namespace):
+    """Changes the tags of the articles matching the query given on the command line
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        args {argparse.Namespace} -- The parsed command line arguments
+    """
+    import tagging
+    try:
+        query = tagging.ArticleQuery(
+            tag=args.tag,
+            domain=args.domain,
+            title=args.title,
+            older_than=args.older_than,
+            newer_than=args.newer_than)
+        change = tagging.TagChange(
+            split_tags(args.add_tags),
+            split_tags(args.remove_tags),
+            tuple(args.rename_tag) if args.rename_tag else None)
+    except (ValueError, re.error) as exception:
+        print(f'Invalid tag change: {exception}')
+        return
+    articles = await tagging.select(app, query, args.state)
+    print(f'{len(articles)} articles match')
+    results_file = open(args.results, mode='a', encoding='utf-8') if args.results else sys.stdout
+
+    def report(result):
+        results_file.write(json.dumps(result) + '\n')
+
+    try:
+        results = await tagging.retag(app, articles, change, dry_run=args.dry_run, progress=report)
+    finally:
+        if results_file is not sys.stdout:
+            results_file.close()
+    for status, count in sorted(tagging.summarize(results).items()):
+        print(f'{status}: {count}')
+    if args.results:
+        print(f'Results written to {args.results}')
+
+async def dedup_list(app: pocket.Pocket, args: argparse.Namespace):
+    """Merges the duplicates in the list
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        args {argparse.Namespace} -- The parsed command line arguments
+    """
+    import dedup
+    import tagging
+    results_file = open(args.results, mode='a', encoding='utf-8') if args.results else sys.stdout
+
+    def report(result):
+        results_file.write(json.dumps(result) + '\n')
+
+    try:
+        results = await dedup.deduplicate(app, args.state, dry_run=args.dry_run, progress=report)
+    finally:
+        if results_file is not sys.stdout:
+            results_file.close()
+    print(f'{len(results)} articles were saved more than once, '
+          f'{sum(len(result["removed"]) for result in results)} duplicates')
+    for status, count in sorted(tagging.summarize(results).items()):
+        print(f'{status}: {count}')
+    if args.results:
+        print(f'Results written to {args.results}')
+
+async def export_list(app: pocket.Pocket, args: argparse.Namespace):
+    """Exports the list to the file given on the command line
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        args {argparse.Namespace} -- The parsed command line arguments
+    """
+    import export
+    # Progress goes to stderr, so stdout can be the export
+    exported = args.offset
+
+    def progress(offset: int):
+        nonlocal exported
+        exported = offset
+        print(f'{offset} articles exported', file=sys.stderr)
+
+    try:
+        await export.export(app,
+                            args.export,
+                            args.export_format,
+                            export.split_fields(args.fields),
+                            args.state,
+                            args.offset,
+                            progress=progress)
+    except BaseException:
+        print(f'Export interrupted, continue it with --offset {exported}', file=sys.stderr)
+        raise
+    if args.export != '-':
+        print(f'Exported to {args.export}', file=sys.stderr)
+
+async def replay_journal(app: pocket.Pocket):
+    """Finishes the renames which were interrupted the last time the app ran
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+    """
+    if not len(app.journal):
+        return
+    print(f'Finishing {len(app.journal)} interrupted renames')
+    try:
+        new_articles = await app.replay_journal()
+    except Exception as exception:
+        logging.error(f'Error replaying the rename journal: {exception}')
+        new_articles = []
+    for new_article in new_articles:
+        logging.info(f'Replayed rename of {new_article}: {new_article.rename_status}')
+    failed = len(app.journal)
+    if failed:
+        print(f'{failed} renames could not be finished and will be retried on the next start')
+
+async def main(args: argparse.Namespace):
+    """Main function
+
+    Arguments:
+        args {argparse.Namespace} -- The parsed command line arguments
+    """
+    # Only the modules of the chosen mode are imported, so the app starts quickly
     ui = None
     app = None
+    validation = None
+    collector = None
+    if args.profile:
+        import metrics
+        collector = metrics.MetricsCollector()
     logging.info(f'Config file: {CONFIG_FILE_PATH}')
-    with open(CONFIG_FILE_PATH, mode='r+') as file:
+    with open(CONFIG_FILE_PATH, encoding='utf-8') as file:
         config = json.load(file)
-        try:
-            app = pocket.Pocket(
-                config.get('POCKET', {}).get('consumer_key'),
-                access_token=config.get('POCKET', {}).get('access_token'))
+    access_token = config.get('POCKET', {}).get('access_token')
+    config_dir = os.path.dirname(os.path.abspath(CONFIG_FILE_PATH))
+    token_cache_path = os.path.join(config_dir, TOKEN_CACHE_FILE_NAME)
+    if args.daemon:
+        import daemon
+        host, _, port = (args.listen or f'{daemon.DEFAULT_HOST}:{daemon.DEFAULT_PORT}').rpartition(':')
+        await daemon.run(config, config_dir, host or daemon.DEFAULT_HOST, int(port), args.socket,
+                         args.max_jobs or daemon.DEFAULT_MAX_JOBS)
+        return
+    try:
+        app = pocket.Pocket(
+            config.get('POCKET', {}).get('consumer_key'),
+            access_token=access_token,
+            metrics=collector)
+        validated_at = read_token_validation(token_cache_path, access_token)
+        if validated_at is not None and time.time() - validated_at < TOKEN_VALIDATION_TTL:
+            # Recently valid, so the UI starts right away and the token is checked meanwhile
+            validation = asyncio.ensure_future(revalidate_token(app, token_cache_path))
+        else:
             await app.authorize()
-            use_tui = config.get('APP', {}).get('use_tui', True)
-            ui = tui_init if CURSES_AVAILABLE and use_tui else cli
-        except pocket.PocketException as pocket_exception:
-            logging.error(f'Error authenticating with pocket: {pocket_exception}')
-            print(f'Error authenticating with pocket: {pocket_exception}')
-            sys.exit(1)
-        except Exception as exception:
-            logging.error(f'An unknown error occured: {exception}')
-            print(f'An unknown error occured: {exception}')
-            sys.exit(1)
-        config['POCKET']['access_token'] = app.access_token
-        # Seek to the beginning to overwrite the existing config
-        # Otherwise json.dump would just append,
-        # because we have read at the beginning and moved the stream position
-        file.seek(0)
-        json.dump(config, file, indent=4)
-
-    await ui(app)
+            write_token_validation(token_cache_path, app.access_token)
+        import journal
+        import titlecache
+        if config.get('APP', {}).get('use_store', True):
+            import store
+            store_path = os.path.join(config_dir, STORE_FILE_NAME)
+            app.store = store.ArticleStore(store_path, app.access_token)
+        app.journal = journal.RenameJournal(os.path.join(config_dir, JOURNAL_FILE_NAME))
+        app.title_cache = titlecache.TitleCache(os.path.join(config_dir, TITLE_CACHE_FILE_NAME))
+        await replay_journal(app)
+        use_tui = config.get('APP', {}).get('use_tui', True)
+        watch_list = config.get('APP', {}).get('watch', True)
+        ui = functools.partial(tui_init, watch_list=watch_list) if CURSES_AVAILABLE and use_tui else cli
+    except pocket.PocketException as pocket_exception:
+        logging.error(f'Error authenticating with pocket: {pocket_exception}')
+        print(f'Error authenticating with pocket: {pocket_exception}')
+        sys.exit(1)
+    except Exception as exception:
+        logging.error(f'An unknown error occured: {exception}')
+        print(f'An unknown error occured: {exception}')
+        sys.exit(1)
+    if app.access_token != access_token:
+        config.setdefault('POCKET', {})['access_token'] = app.access_token
+        with open(CONFIG_FILE_PATH, mode='w', encoding='utf-8') as file:
+            json.dump(config, file, indent=4)
+
+    try:
+        if args.rename_file:
+            await bulk_rename(app, args)
+        elif args.add_tags or args.remove_tags or args.rename_tag:
+            await bulk_tag(app, args)
+        elif args.dedup:
+            await dedup_list(app, args)
+        elif args.export:
+            await export_list(app, args)
+        else:
+            await ui(app)
+    finally:
+        if validation is not None:
+            if not validation.done():
+                validation.cancel()
+            elif not validation.result():
+                print('The access token is no longer valid, you will be asked to log in on the next start')
+        await app.close()
+        if collector is not None:
+            collector.dump(None if args.profile == '-' else args.profile)
 
 if __name__ == "__main__":
-    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S', filename='pocket.log')
-    asyncio.run(main())
+    ARGS = parse_args()
+    logging.basicConfig(level=ARGS.log_level, format='%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S', filename='pocket.log')
+    asyncio.run(main(ARGS))
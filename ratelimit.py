@@ -0,0 +1,167 @@
+"""Schedules API calls within Pocket's rate limits"""
+
+import time
+import asyncio
+import logging
+from typing import Dict, Mapping
+
+LOGGER = logging.getLogger(__name__)
+
+# Maximum number of requests running at the same time
+DEFAULT_CONCURRENCY = 4
+
+# Share of a limit below which the remaining calls are spread over the time until the reset
+DEFAULT_PACE_BELOW = 0.25
+
+# Pocket reports a limit per user and per consumer key
+BUCKETS = ('User', 'Key')
+
+
+class _Bucket:
+    """State of a single rate limit as last reported by Pocket,
+    with the requests in flight that count against it"""
+    __slots__ = ('limit', 'remaining', 'reset_at', 'in_flight', 'last_sent')
+
+    def __init__(self):
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0
+        self.in_flight = 0
+        # When the last request counting against it was let through
+        self.last_sent = None
+
+class RateLimiter:
+    """Caps the number of concurrent requests and paces them within the limits reported
+    by Pocket: once few calls remain, they are spread evenly over the time until the
+    limit resets, and only if they are used up anyway, requests wait for the reset.
+    Use as an async context manager around each request"""
+
+    def __init__(self,
+                 max_concurrency: int = DEFAULT_CONCURRENCY,
+                 pace_below: float = DEFAULT_PACE_BELOW,
+                 shared: 'RateLimiter' = None):
+        """
+        Keyword Arguments:
+            max_concurrency {int} -- Maximum number of requests running at the same time
+            (default: {DEFAULT_CONCURRENCY})
+            pace_below {float} -- Share of a limit below which requests are paced,
+            0 to only wait once the calls are used up (default: {DEFAULT_PACE_BELOW})
+            shared {RateLimiter} -- Limiter of another user with the same consumer key,
+            whose Key limit is shared with this one (default: {None})
+        """
+        self.max_concurrency = max_concurrency
+        self.pace_below = pace_below
+        self.buckets = {name: _Bucket() for name in BUCKETS}
+        if shared is not None:
+            self.buckets['Key'] = shared.buckets['Key']
+        self.in_flight = 0
+        self._semaphore = None
+        self._lock = None
+
+    def _init_primitives(self):
+        # Created lazily, so they belong to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._lock = asyncio.Lock()
+
+    def delay(self) -> float:
+        """Seconds to wait before the next request may be sent
+
+        Returns:
+            float -- The delay, 0 if a request can be sent right away
+        """
+        now = time.monotonic()
+        delay = 0.0
+        for bucket in self.buckets.values():
+            if bucket.remaining is None or bucket.reset_at <= now:
+                # Unknown or already reset
+                continue
+            if bucket.remaining <= 0:
+                delay = max(delay, bucket.reset_at - now)
+            elif (bucket.last_sent is not None and bucket.limit
+                  and bucket.remaining < bucket.limit * self.pace_below):
+                # Bursting through the rest would mean waiting for the reset afterwards
+                interval = (bucket.reset_at - bucket.last_sent) / (bucket.remaining + 1)
+                delay = max(delay, bucket.last_sent + interval - now)
+        return delay
+
+    def exhausted(self) -> bool:
+        """Whether a limit is used up
+
+        Returns:
+            bool -- True if requests have to wait for a reset
+        """
+        now = time.monotonic()
+        return any(bucket.remaining is not None and bucket.remaining <= 0 and bucket.reset_at > now
+                   for bucket in self.buckets.values())
+
+    def update(self, headers: Mapping[str, str]):
+        """Reads the rate limit headers of a response.
+        Call it while the request is still counted as in flight
+
+        Arguments:
+            headers {Mapping[str, str]} -- The response headers
+        """
+        now = time.monotonic()
+        for name, bucket in self.buckets.items():
+            try:
+                remaining = headers.get(f'X-Limit-{name}-Remaining')
+                if remaining is None:
+                    continue
+                # Other requests in flight aren't included in the reported number yet
+                bucket.remaining = int(remaining) - max(0, bucket.in_flight - 1)
+                bucket.limit = int(headers.get(f'X-Limit-{name}-Limit', bucket.limit or 0))
+                bucket.reset_at = now + int(headers.get(f'X-Limit-{name}-Reset', 0))
+            except ValueError:
+                LOGGER.warning(f'Could not parse the {name} rate limit headers')
+
+    def status(self) -> Dict[str, Dict[str, int]]:
+        """Returns the last known limits
+
+        Returns:
+            Dict[str, Dict[str, int]] -- Limit, remaining calls
+            and seconds until reset for each bucket
+        """
+        now = time.monotonic()
+        return {
+            name: {
+                'limit': bucket.limit,
+                'remaining': bucket.remaining,
+                'reset': max(0, int(bucket.reset_at - now))
+            }
+            for name, bucket in self.buckets.items()
+        }
+
+    async def __aenter__(self):
+        self._init_primitives()
+        await self._semaphore.acquire()
+        try:
+            # Only one request at a time checks the budget,
+            # so waiting requests are released in order
+            async with self._lock:
+                delay = self.delay()
+                while delay > 0:
+                    if self.exhausted():
+                        LOGGER.warning(f'Rate limit reached, waiting {delay:.0f}s for it to reset')
+                    else:
+                        LOGGER.debug(f'Few calls left, pacing the next request by {delay:.1f}s')
+                    await asyncio.sleep(delay)
+                    delay = self.delay()
+                self.in_flight += 1
+                now = time.monotonic()
+                # Counted right away, the next response corrects it
+                for bucket in self.buckets.values():
+                    bucket.in_flight += 1
+                    bucket.last_sent = now
+                    if bucket.remaining is not None:
+                        bucket.remaining -= 1
+        except BaseException:
+            self._semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        self.in_flight -= 1
+        for bucket in self.buckets.values():
+            bucket.in_flight -= 1
+        self._semaphore.release()
@@ -0,0 +1,146 @@
+"""Retries of failed requests and a circuit breaker pausing requests while Pocket is failing"""
+
+import time
+import random
+import asyncio
+import logging
+from typing import Optional
+
+LOGGER = logging.getLogger(__name__)
+
+# Attempts of an idempotent request, including the first one
+DEFAULT_MAX_ATTEMPTS = 4
+# Delay before the first retry in seconds, doubled for every further retry
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 30.0
+
+# Consecutive failures which open the circuit
+DEFAULT_FAILURE_THRESHOLD = 5
+# Seconds the circuit stays open before a request is let through to probe
+DEFAULT_RESET_TIMEOUT = 30.0
+
+# Circuit states
+CLOSED = 'CLOSED'
+OPEN = 'OPEN'
+HALF_OPEN = 'HALF_OPEN'
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter: the delay before retry n is
+    a random value between 0 and base_delay * 2^(n - 1), capped at max_delay"""
+
+    def __init__(self,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY,
+                 rng: random.Random = None):
+        """
+        Keyword Arguments:
+            max_attempts {int} -- Attempts including the first one, 1 disables retries
+            (default: {DEFAULT_MAX_ATTEMPTS})
+            base_delay {float} -- Longest delay before the first retry in seconds (default: {DEFAULT_BASE_DELAY})
+            max_delay {float} -- Longest delay before any retry in seconds (default: {DEFAULT_MAX_DELAY})
+            rng {random.Random} -- Source of the jitter (default: {None})
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt: int) -> Optional[float]:
+        """Returns how long to wait after a failed attempt
+
+        Arguments:
+            attempt {int} -- Number of the failed attempt, starting at 1
+
+        Returns:
+            Optional[float] -- Seconds to wait before the next attempt, None if no attempts are left
+        """
+        if attempt >= self.max_attempts:
+            return None
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures. While it's open,
+    requests wait instead of being sent. After reset_timeout a single request
+    is let through: if it succeeds the circuit closes and the waiting requests
+    continue, otherwise it opens again.
+    Use as an async context manager around each request, and report its outcome
+    with record_success() or record_failure()"""
+
+    def __init__(self,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        """
+        Keyword Arguments:
+            failure_threshold {int} -- Consecutive failures which open the circuit
+            (default: {DEFAULT_FAILURE_THRESHOLD})
+            reset_timeout {float} -- Seconds until a request is let through to probe
+            (default: {DEFAULT_RESET_TIMEOUT})
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        # Number of times the circuit opened
+        self.trips = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._changed = None
+
+    def _init_primitives(self):
+        # Created lazily, so it belongs to the running event loop
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+
+    async def _notify(self):
+        self._init_primitives()
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def __aenter__(self):
+        self._init_primitives()
+        async with self._changed:
+            while True:
+                if self.state == CLOSED:
+                    return self
+                remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                if remaining <= 0 and not self._probing:
+                    # This request probes whether Pocket has recovered
+                    self.state = HALF_OPEN
+                    self._probing = True
+                    return self
+                try:
+                    # Woken up when the probe finishes, or when it's time to probe
+                    await asyncio.wait_for(self._changed.wait(), max(remaining, 0.01)
+                                           if not self._probing else None)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        if self._probing and self.state == HALF_OPEN:
+            # The probe neither succeeded nor failed, e.g. it was cancelled
+            self._probing = False
+            self.state = OPEN
+            await self._notify()
+
+    async def record_success(self):
+        """Records a request which reached Pocket"""
+        self.failures = 0
+        if self.state != CLOSED:
+            LOGGER.info('Pocket is responding again, resuming requests')
+            self.state = CLOSED
+            self._probing = False
+            await self._notify()
+
+    async def record_failure(self):
+        """Records a request which failed because Pocket or the network is failing"""
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            LOGGER.warning(f'{self.failures} failed requests in a row, '
+                           f'pausing requests for {self.reset_timeout:g}s')
+            self.state = OPEN
+            self.trips += 1
+            self._opened_at = time.monotonic()
+            self._probing = False
+            await self._notify()
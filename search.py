@@ -0,0 +1,195 @@
+"""Search index over article titles, URLs and tags"""
+
+import re
+import bisect
+from typing import Iterable, List, Set, FrozenSet
+import pocket
+
+TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits text into lower case word tokens
+
+    Arguments:
+        text {str} -- The text
+
+    Returns:
+        List[str] -- The tokens
+    """
+    return TOKEN.findall(text.lower())
+
+def article_tokens(article: pocket.Article) -> FrozenSet[str]:
+    """Returns the searchable tokens of an article: its title, resolved URL and tags
+
+    Arguments:
+        article {pocket.Article} -- The article
+
+    Returns:
+        FrozenSet[str] -- The tokens
+    """
+    tokens = set(tokenize(article.get_title()))
+    tokens.update(tokenize(article.resolved_url or ''))
+    for tag in article.tags:
+        tokens.update(tokenize(tag))
+    return frozenset(tokens)
+
+class ArticleIndex:
+    """Inverted index from tokens to item ids.
+    A query matches an article if every query token is the prefix of one of its tokens,
+    so the index can be used while the user is still typing"""
+
+    def __init__(self, articles: Iterable[pocket.Article] = ()):
+        """
+        Keyword Arguments:
+            articles {Iterable[pocket.Article]} -- Articles to index (default: {()})
+        """
+        self._tokens = {}
+        self._postings = {}
+        # Sorted list of all tokens, used to find the tokens starting with a prefix
+        self._vocabulary = []
+        self.replace_all(articles)
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._tokens
+
+    def add(self, article: pocket.Article):
+        """Adds an article, replacing a previously indexed version of it
+
+        Arguments:
+            article {pocket.Article} -- The article
+        """
+        self._add(article, new_tokens=None)
+
+    def _add(self, article: pocket.Article, new_tokens: List[str] = None):
+        """Adds an article. New tokens are either inserted into the vocabulary
+        or, when adding many articles, collected in new_tokens to be sorted in once
+
+        Arguments:
+            article {pocket.Article} -- The article
+
+        Keyword Arguments:
+            new_tokens {List[str]} -- Collects new tokens instead of inserting them (default: {None})
+        """
+        tokens = article_tokens(article)
+        old_tokens = self._tokens.get(article.item_id)
+        if old_tokens == tokens:
+            return
+        if old_tokens is not None:
+            self.remove(article.item_id)
+        self._tokens[article.item_id] = tokens
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = set()
+                if new_tokens is None:
+                    bisect.insort(self._vocabulary, token)
+                else:
+                    new_tokens.append(token)
+            posting.add(article.item_id)
+
+    def remove(self, item_id: str):
+        """Removes an article
+
+        Arguments:
+            item_id {str} -- Id of the article
+        """
+        tokens = self._tokens.pop(item_id, ())
+        for token in tokens:
+            posting = self._postings[token]
+            posting.discard(item_id)
+            if not posting:
+                del self._postings[token]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+
+    def extend(self, articles: Iterable[pocket.Article]):
+        """Adds many articles at once
+
+        Arguments:
+            articles {Iterable[pocket.Article]} -- The articles
+        """
+        new_tokens = []
+        for article in articles:
+            self._add(article, new_tokens)
+        if new_tokens:
+            self._vocabulary.extend(new_tokens)
+            self._vocabulary.sort()
+
+    def replace_all(self, articles: Iterable[pocket.Article]):
+        """Updates the index to contain exactly the given articles.
+        Unchanged articles are not re-indexed
+
+        Arguments:
+            articles {Iterable[pocket.Article]} -- The articles
+        """
+        item_ids = set()
+        new_tokens = []
+        for article in articles:
+            item_ids.add(article.item_id)
+            self._add(article, new_tokens)
+        if new_tokens:
+            self._vocabulary.extend(new_tokens)
+            self._vocabulary.sort()
+        for item_id in [i for i in self._tokens if i not in item_ids]:
+            self.remove(item_id)
+
+    def _prefix_matches(self, prefix: str) -> Set[str]:
+        """Returns the ids of all articles with a token starting with prefix"""
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + '\uffff', start)
+        if end - start == 1:
+            return self._postings[self._vocabulary[start]]
+        postings = self._postings
+        return set().union(*[postings[token] for token in self._vocabulary[start:end]])
+
+    def matches(self, item_id: str, query: str) -> bool:
+        """Checks if an indexed article matches a query
+
+        Arguments:
+            item_id {str} -- Id of the article
+            query {str} -- The query
+
+        Returns:
+            bool -- True if every query token is the prefix of one of the article's tokens
+        """
+        tokens = self._tokens.get(item_id)
+        if tokens is None:
+            return False
+        return all(
+            any(token.startswith(query_token) for token in tokens)
+            for query_token in tokenize(query))
+
+    def search(self, query: str, within: Set[str] = None) -> Set[str]:
+        """Finds all articles matching a query
+
+        Arguments:
+            query {str} -- The query
+
+        Keyword Arguments:
+            within {Set[str]} -- Only look at these item ids, e.g. the result of
+            a shorter query while the user is typing (default: {None})
+
+        Returns:
+            Set[str] -- Ids of the matching articles, all ids for an empty query
+        """
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return set(self._tokens) if within is None else set(within)
+        if within is not None and len(within) < 256:
+            # Checking a few candidates is cheaper than merging postings
+            return {item_id for item_id in within if self.matches(item_id, query)}
+        # Long tokens have short postings, start with those
+        query_tokens.sort(key=len, reverse=True)
+        result = None
+        for query_token in query_tokens:
+            matches = self._prefix_matches(query_token)
+            if result is None:
+                result = set(matches) if within is None else within & matches
+            else:
+                result &= matches
+            if not result:
+                break
+        return result
@@ -0,0 +1,140 @@
+"""Local copy of the Pocket list, kept in sync with the API"""
+
+import json
+import sqlite3
+import hashlib
+import logging
+from typing import List, Iterable, Optional
+import pocket
+
+LOGGER = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS articles (
+    item_id TEXT PRIMARY KEY,
+    given_url TEXT,
+    resolved_url TEXT,
+    given_title TEXT,
+    resolved_title TEXT,
+    tags TEXT,
+    time_added INTEGER,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS articles_time_added ON articles (time_added DESC);
+'''
+
+class ArticleStore:
+    """SQLite backed store of articles, keyed by item_id"""
+
+    def __init__(self, path: str, account: str = None):
+        """Opens (and creates if needed) the store
+
+        Arguments:
+            path {str} -- Path of the SQLite database
+
+        Keyword Arguments:
+            account {str} -- Identifies the account the data belongs to.
+            The store is reset if it was created for a different account (default: {None})
+        """
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(SCHEMA)
+        if account is not None:
+            account_hash = hashlib.sha256(account.encode('utf-8')).hexdigest()
+            if self._get_meta('account') != account_hash:
+                LOGGER.info(f'Store {path} belongs to a different account, resetting it')
+                self.clear()
+                self._set_meta('account', account_hash)
+                self._connection.commit()
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._connection.execute(
+            'SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: Optional[str]):
+        self._connection.execute(
+            'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    @property
+    def since(self) -> Optional[int]:
+        """Server timestamp of the last sync, None if the store was never synced"""
+        since = self._get_meta('since')
+        return int(since) if since else None
+
+    def apply(self,
+              items: Iterable[pocket.Article],
+              statuses: Iterable[str],
+              since: int = None):
+        """Applies a delta to the store.
+        Items with the deleted status are removed, all others are inserted or updated
+
+        Arguments:
+            items {Iterable[pocket.Article]} -- Added or changed articles
+            statuses {Iterable[str]} -- Pocket status for each article
+
+        Keyword Arguments:
+            since {int} -- New sync timestamp, only stored if set (default: {None})
+        """
+        upserts = []
+        deletes = []
+        for article, status in zip(items, statuses):
+            if status == pocket.STATUS_DELETED:
+                deletes.append((article.item_id,))
+                continue
+            upserts.append((
+                article.item_id,
+                article.given_url,
+                article.resolved_url,
+                article.given_title,
+                article.resolved_title,
+                json.dumps(list(article.tags)),
+                int(article.time_added or 0),
+                status))
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?)', upserts)
+            self._connection.executemany(
+                'DELETE FROM articles WHERE item_id = ?', deletes)
+            if since is not None:
+                self._set_meta('since', str(since))
+
+    def get_articles(self, state: str = 'unread') -> List[pocket.Article]:
+        """Returns the stored articles, newest first
+
+        Keyword Arguments:
+            state {str} -- filter items by state:
+                'unread', 'archive', or 'all' (default: {'unread'})
+
+        Returns:
+            List[pocket.Article] -- The stored articles
+        """
+        statuses = pocket.STATE_STATUSES[state]
+        placeholders = ', '.join('?' * len(statuses))
+        rows = self._connection.execute(
+            'SELECT item_id, given_url, resolved_url, given_title, resolved_title, tags, time_added '
+            f'FROM articles WHERE status IN ({placeholders}) ORDER BY time_added DESC',
+            statuses)
+        return [pocket.Article(item_id,
+                               given_url,
+                               resolved_url,
+                               given_title,
+                               resolved_title,
+                               tuple(json.loads(tags)),
+                               str(time_added))
+                for item_id, given_url, resolved_url, given_title, resolved_title, tags, time_added
+                in rows]
+
+    def clear(self):
+        """Removes all articles and the sync timestamp"""
+        with self._connection:
+            self._connection.execute('DELETE FROM articles')
+            self._connection.execute("DELETE FROM meta WHERE key = 'since'")
+
+    def close(self):
+        """Closes the database"""
+        self._connection.close()
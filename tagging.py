@@ -0,0 +1,239 @@
+"""Adds, removes and renames tags on all articles matching a query"""
+
+import re
+import time
+import logging
+import dataclasses
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Pattern, Tuple
+import pocket
+import urls
+
+LOGGER = logging.getLogger(__name__)
+
+# Result status of every article
+CHANGED = 'CHANGED'
+UNCHANGED = 'UNCHANGED'
+ERROR = 'ERROR'
+# Status of articles which would be changed by a dry run
+PLANNED = 'PLANNED'
+
+# Tag which selects the articles without any tags
+UNTAGGED = '_untagged_'
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+@dataclasses.dataclass
+class ArticleQuery:
+    """Selects articles. All given criteria have to match"""
+    # Articles with this tag, or UNTAGGED for those without any
+    tag: str = None
+    # Articles whose resolved URL is on this domain, www. is ignored
+    domain: str = None
+    # Regular expression searched for in the title, case insensitive
+    title: Pattern = None
+    # Articles added more or less than this many days ago
+    older_than: float = None
+    newer_than: float = None
+    item_ids: FrozenSet[str] = None
+
+    def __post_init__(self):
+        if isinstance(self.title, str):
+            self.title = re.compile(self.title, re.IGNORECASE)
+        if self.domain is not None:
+            self.domain = urls.url_domain(f'//{self.domain}')
+        if self.item_ids is not None:
+            self.item_ids = frozenset(self.item_ids)
+
+    def parameters(self) -> Dict[str, str]:
+        """Returns the /get parameters applying as much of the query as Pocket can
+
+        Returns:
+            Dict[str, str] -- The parameters
+        """
+        parameters = {}
+        if self.tag is not None:
+            parameters['tag'] = self.tag
+        if self.domain is not None:
+            parameters['domain'] = self.domain
+        return parameters
+
+    def matches(self, article: pocket.Article, now: float = None) -> bool:
+        """Checks an article against all criteria
+
+        Arguments:
+            article {pocket.Article} -- The article, with tags if the query has a tag
+
+        Keyword Arguments:
+            now {float} -- Unix time the ages are measured from (default: {time.time()})
+
+        Returns:
+            bool -- The article is selected
+        """
+        if self.item_ids is not None and article.item_id not in self.item_ids:
+            return False
+        if self.tag == UNTAGGED:
+            if article.tags:
+                return False
+        elif self.tag is not None and self.tag not in article.tags:
+            return False
+        if self.domain is not None and urls.url_domain(article.resolved_url) != self.domain:
+            return False
+        if self.title is not None and not self.title.search(article.get_title() or ''):
+            return False
+        if self.older_than is not None or self.newer_than is not None:
+            age = ((now or time.time()) - int(article.time_added or 0)) / SECONDS_PER_DAY
+            if self.older_than is not None and age <= self.older_than:
+                return False
+            if self.newer_than is not None and age >= self.newer_than:
+                return False
+        return True
+
+@dataclasses.dataclass
+class TagChange:
+    """Tags to add and remove, and a tag to rename, on every selected article"""
+    add: FrozenSet[str] = frozenset()
+    remove: FrozenSet[str] = frozenset()
+    # Old and new name
+    rename: Tuple[str, str] = None
+
+    def __post_init__(self):
+        self.add = frozenset(self.add)
+        self.remove = frozenset(self.remove)
+        if not self.add and not self.remove and self.rename is None:
+            raise ValueError('No tags to add, remove or rename')
+
+    def apply(self, tags: Iterable[str]) -> Tuple[str, ...]:
+        """Applies the change to the tags of an article
+
+        Arguments:
+            tags {Iterable[str]} -- The current tags
+
+        Returns:
+            Tuple[str, ...] -- The new tags, sorted
+        """
+        new_tags = (set(tags) | self.add) - self.remove
+        if self.rename is not None and self.rename[0] in new_tags:
+            new_tags.discard(self.rename[0])
+            new_tags.add(self.rename[1])
+        return tuple(sorted(new_tags))
+
+def tag_action(article: pocket.Article, new_tags: Tuple[str, ...]) -> Optional[Tuple[str, Dict[str, str]]]:
+    """Builds the /send action changing the tags of an article
+
+    Arguments:
+        article {pocket.Article} -- The article with its current tags
+        new_tags {Tuple[str, ...]} -- The tags it should have
+
+    Returns:
+        Optional[Tuple[str, Dict[str, str]]] -- Name and parameters of the action, None if nothing changes
+    """
+    old, new = set(article.tags), set(new_tags)
+    if old == new:
+        return None
+    if not new:
+        return 'tags_clear', {'item_id': article.item_id}
+    if old <= new:
+        return 'tags_add', {'item_id': article.item_id, 'tags': ','.join(sorted(new - old))}
+    if new <= old:
+        return 'tags_remove', {'item_id': article.item_id, 'tags': ','.join(sorted(old - new))}
+    # Removing and adding in one action, so the article is never left half done
+    return 'tags_replace', {'item_id': article.item_id, 'tags': ','.join(new_tags)}
+
+async def select(app: pocket.Pocket, query: ArticleQuery, state: str = 'all') -> List[pocket.Article]:
+    """Finds all articles matching a query, with their tags.
+    The tag and domain are sent to Pocket, so only matching articles are downloaded
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        query {ArticleQuery} -- The query
+
+    Keyword Arguments:
+        state {str} -- 'unread', 'archive', or 'all' (default: {'all'})
+
+    Returns:
+        List[pocket.Article] -- The matching articles
+    """
+    now = time.time()
+    return [article
+            async for article in app.iter_articles(state, filters=query.parameters(), details=True)
+            if query.matches(article, now)]
+
+async def retag(app: pocket.Pocket,
+                articles: List[pocket.Article],
+                change: TagChange,
+                batch_size: int = pocket.DEFAULT_BATCH_SIZE,
+                dry_run: bool = False,
+                progress: Callable[[Dict[str, any]], None] = None) -> List[Dict[str, any]]:
+    """Changes the tags of many articles. Only articles whose tags change get an action,
+    the actions are sent batch_size at a time through /send
+
+    Arguments:
+        app {pocket.Pocket} -- The pocket instance
+        articles {List[pocket.Article]} -- The articles, loaded without tags ones are hydrated first
+        change {TagChange} -- The change
+
+    Keyword Arguments:
+        batch_size {int} -- Number of actions per request (default: {pocket.DEFAULT_BATCH_SIZE})
+        dry_run {bool} -- Only report what would change (default: {False})
+        progress {Callable[[Dict[str, any]], None]} -- Called with every result (default: {None})
+
+    Returns:
+        List[Dict[str, any]] -- One result per article, in the same order, with the status,
+        item_id, title, and the old and new tags, or the error
+    """
+    articles = await app.hydrate(articles)
+    results = []
+
+    def report(result: Dict[str, any]):
+        results.append(result)
+        if progress is not None:
+            progress(result)
+
+    pending = []
+    async with app.batch(batch_size) as batch:
+        for article in articles:
+            result = {
+                'item_id': article.item_id,
+                'title': article.get_title(),
+                'tags': list(article.tags)
+            }
+            if not article.hydrated:
+                report(dict(result, status=ERROR, error='The tags could not be loaded'))
+                continue
+            new_tags = change.apply(article.tags)
+            action = tag_action(article, new_tags)
+            if action is None:
+                report(dict(result, status=UNCHANGED))
+            elif dry_run:
+                report(dict(result, status=PLANNED, new_tags=list(new_tags)))
+            else:
+                results.append(None)
+                pending.append((len(results) - 1, result, new_tags, batch.add(*action)))
+    for idx, result, new_tags, future in pending:
+        exception = future.exception()
+        if exception is None:
+            result['status'] = CHANGED
+            result['new_tags'] = list(new_tags)
+        else:
+            LOGGER.error(f'Changing the tags of {result["item_id"]} failed: {exception}')
+            result['status'] = ERROR
+            result['error'] = str(exception)
+        results[idx] = result
+        if progress is not None:
+            progress(result)
+    return results
+
+def summarize(results: Iterable[Dict[str, any]]) -> Dict[str, int]:
+    """Counts results by status
+
+    Arguments:
+        results {Iterable[Dict[str, any]]} -- The results of retag()
+
+    Returns:
+        Dict[str, int] -- Number of articles per status
+    """
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return summary
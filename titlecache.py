@@ -0,0 +1,92 @@
+"""Remembers for which pages Pocket ignores the title given when re-adding them"""
+
+import sqlite3
+from typing import Optional
+import urls
+
+# Ignored renames on a domain, without a single honored one,
+# before all of its pages are predicted to ignore the title
+DEFAULT_MIN_DOMAIN_SAMPLES = 3
+
+# Reasons returned by predict()
+IGNORED_URL = 'IGNORED_URL'
+IGNORED_DOMAIN = 'IGNORED_DOMAIN'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS outcomes (
+    key TEXT PRIMARY KEY,
+    ignored INTEGER NOT NULL DEFAULT 0,
+    honored INTEGER NOT NULL DEFAULT 0
+);
+'''
+
+class TitleCache:
+    """SQLite backed counts of ignored and honored titles per canonical URL and per domain"""
+
+    def __init__(self, path: str, min_domain_samples: int = DEFAULT_MIN_DOMAIN_SAMPLES):
+        """Opens (and creates if needed) the cache
+
+        Arguments:
+            path {str} -- Path of the SQLite database
+
+        Keyword Arguments:
+            min_domain_samples {int} -- Ignored renames needed before a whole domain
+            is predicted to ignore titles (default: {DEFAULT_MIN_DOMAIN_SAMPLES})
+        """
+        self.path = path
+        self.min_domain_samples = min_domain_samples
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(SCHEMA)
+
+    @staticmethod
+    def _keys(url: str):
+        return f'url:{urls.canonicalize_url(url)}', f'domain:{urls.url_domain(url)}'
+
+    def record(self, url: str, ignored: bool):
+        """Records the outcome of a rename
+
+        Arguments:
+            url {str} -- URL the article was re-added with
+            ignored {bool} -- Pocket kept its own title instead of the given one
+        """
+        column = 'ignored' if ignored else 'honored'
+        with self._connection:
+            self._connection.executemany(
+                f'INSERT INTO outcomes (key, {column}) VALUES (?, 1) '
+                f'ON CONFLICT (key) DO UPDATE SET {column} = {column} + 1',
+                [(key,) for key in self._keys(url)])
+
+    def _counts(self, key: str):
+        row = self._connection.execute(
+            'SELECT ignored, honored FROM outcomes WHERE key = ?', (key,)).fetchone()
+        return row if row else (0, 0)
+
+    def predict(self, url: str) -> Optional[str]:
+        """Predicts if Pocket will ignore a new title for a URL
+
+        Arguments:
+            url {str} -- URL the article will be re-added with
+
+        Returns:
+            Optional[str] -- IGNORED_URL or IGNORED_DOMAIN if the title is expected
+            to be ignored, None if it is expected to be kept or nothing is known
+        """
+        url_key, domain_key = self._keys(url)
+        ignored, honored = self._counts(url_key)
+        if ignored and not honored:
+            return IGNORED_URL
+        if honored:
+            return None
+        ignored, honored = self._counts(domain_key)
+        if ignored >= self.min_domain_samples and not honored:
+            return IGNORED_DOMAIN
+        return None
+
+    def clear(self):
+        """Forgets all outcomes"""
+        with self._connection:
+            self._connection.execute('DELETE FROM outcomes')
+
+    def close(self):
+        """Closes the database"""
+        self._connection.close()
@@ -0,0 +1,501 @@
+"""HTTP transports used to talk to the Pocket API"""
+
+import json
+import zlib
+import asyncio
+import logging
+import threading
+import contextlib
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Mapping, AsyncIterator
+# Both HTTP libraries take a while to import, so they're only imported
+# once a transport using them is created
+requests = None
+urllib3 = None
+aiohttp = None
+AIOHTTP_AVAILABLE = importlib.util.find_spec('aiohttp') is not None
+BROTLI_AVAILABLE = importlib.util.find_spec('brotli') is not None
+
+LOGGER = logging.getLogger(__name__)
+
+# Seconds until a request is given up
+DEFAULT_TIMEOUT = 30
+# Number of connections kept open
+DEFAULT_POOL_SIZE = 10
+# Bytes read at once from a response body
+CHUNK_SIZE = 64 * 1024
+
+# Encodings the server may compress responses with
+ACCEPT_ENCODING = 'gzip, deflate, br' if BROTLI_AVAILABLE else 'gzip, deflate'
+
+Headers = Dict[str, str]
+
+
+class Decompressor:
+    """Decompresses a response body chunk by chunk"""
+
+    def __init__(self, content_encoding: str):
+        """
+        Arguments:
+            content_encoding {str} -- Value of the Content-Encoding header
+
+        Raises:
+            TransportError: The encoding is not supported
+        """
+        self.content_encoding = content_encoding.strip().lower()
+        self._brotli = None
+        if self.content_encoding in ('gzip', 'x-gzip'):
+            self._zlib = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self.content_encoding == 'deflate':
+            self._zlib = zlib.decompressobj()
+            self._started = False
+        elif self.content_encoding == 'br' and BROTLI_AVAILABLE:
+            import brotli
+            self._brotli = brotli.Decompressor()
+        else:
+            raise TransportError(f'Unsupported content encoding {content_encoding}')
+
+    def decompress(self, chunk: bytes) -> bytes:
+        """Decompresses the next chunk
+
+        Arguments:
+            chunk {bytes} -- Compressed bytes
+
+        Returns:
+            bytes -- The decompressed bytes, might be empty
+        """
+        if self._brotli is not None:
+            return self._brotli.process(chunk)
+        if self.content_encoding == 'deflate' and not self._started:
+            self._started = True
+            try:
+                return self._zlib.decompress(chunk)
+            except zlib.error:
+                # Some servers send raw deflate data without the zlib header
+                self._zlib = zlib.decompressobj(-zlib.MAX_WBITS)
+        try:
+            return self._zlib.decompress(chunk)
+        except zlib.error as zlib_error:
+            raise TransportError(f'Invalid {self.content_encoding} data: {zlib_error}') from zlib_error
+
+    def flush(self) -> bytes:
+        """Returns the remaining decompressed bytes"""
+        if self._brotli is not None:
+            return b''
+        return self._zlib.flush()
+
+def decompressor(headers: Mapping[str, str]) -> Decompressor:
+    """Creates a decompressor for a response
+
+    Arguments:
+        headers {Mapping[str, str]} -- The response headers
+
+    Returns:
+        Decompressor -- The decompressor, None if the body is not compressed
+    """
+    content_encoding = headers.get('Content-Encoding')
+    if not content_encoding or content_encoding.strip().lower() == 'identity':
+        return None
+    return Decompressor(content_encoding)
+
+def decompress(headers: Mapping[str, str], content: bytes) -> bytes:
+    """Decompresses a complete response body
+
+    Arguments:
+        headers {Mapping[str, str]} -- The response headers
+        content {bytes} -- The body as received
+
+    Returns:
+        bytes -- The decompressed body
+    """
+    body_decompressor = decompressor(headers)
+    if body_decompressor is None:
+        return content
+    return body_decompressor.decompress(content) + body_decompressor.flush()
+
+class Response:
+    """A fully read HTTP response"""
+
+    def __init__(self,
+                 status_code: int,
+                 headers: Mapping[str, str],
+                 content: bytes,
+                 encoding: str = None,
+                 bytes_read: int = None):
+        """
+        Arguments:
+            status_code {int} -- HTTP status
+            headers {Mapping[str, str]} -- Response headers
+            content {bytes} -- The decompressed body
+
+        Keyword Arguments:
+            encoding {str} -- Text encoding of the body (default: {None})
+            bytes_read {int} -- Size of the body as received,
+            the size of content if not set (default: {None})
+        """
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+        self.bytes_read = len(content) if bytes_read is None else bytes_read
+
+    @property
+    def text(self) -> str:
+        """The decoded body"""
+        return self.content.decode(self.encoding or 'utf-8')
+
+    def json(self):
+        """Parses the body as JSON
+
+        Returns:
+            any -- The decoded JSON
+        """
+        return json.loads(self.content)
+
+class StreamedResponse:
+    """An HTTP response whose body is read chunk by chunk.
+    Compressed bodies are decompressed while they are read"""
+
+    def __init__(self,
+                 status_code: int,
+                 headers: Mapping[str, str],
+                 chunks: AsyncIterator[bytes],
+                 encoding: str = None):
+        """
+        Arguments:
+            status_code {int} -- HTTP status
+            headers {Mapping[str, str]} -- Response headers
+            chunks {AsyncIterator[bytes]} -- The body as received, still compressed
+
+        Keyword Arguments:
+            encoding {str} -- Text encoding of the body (default: {None})
+        """
+        self.status_code = status_code
+        self.headers = headers
+        self.encoding = encoding
+        # Bytes received, and bytes after decompression
+        self.bytes_read = 0
+        self.bytes_decoded = 0
+        self._chunks = chunks
+
+    async def iter_chunks(self) -> AsyncIterator[bytes]:
+        """Iterates over the decompressed body
+
+        Yields:
+            bytes -- The next chunk
+        """
+        body_decompressor = decompressor(self.headers)
+        async for chunk in self._chunks:
+            self.bytes_read += len(chunk)
+            if body_decompressor is not None:
+                chunk = body_decompressor.decompress(chunk)
+                if not chunk:
+                    continue
+            self.bytes_decoded += len(chunk)
+            yield chunk
+        if body_decompressor is not None:
+            chunk = body_decompressor.flush()
+            if chunk:
+                self.bytes_decoded += len(chunk)
+                yield chunk
+
+    async def read(self) -> Response:
+        """Reads the rest of the body
+
+        Returns:
+            Response -- The fully read response
+        """
+        chunks = [chunk async for chunk in self.iter_chunks()]
+        return Response(self.status_code, self.headers, b''.join(chunks), self.encoding, self.bytes_read)
+
+class Transport:
+    """Base class of all transports"""
+
+    async def post(self,
+                   url: str,
+                   data: bytes,
+                   headers: Headers,
+                   timeout: float = None) -> Response:
+        """Sends a POST request and reads the response.
+        Cancelling the calling task stops the request
+
+        Arguments:
+            url {str} -- URL to POST to
+            data {bytes} -- The request body
+            headers {Headers} -- Header dictionary
+
+        Keyword Arguments:
+            timeout {float} -- Seconds until the request is given up,
+            uses the transport's default if not set (default: {None})
+
+        Raises:
+            TransportTimeout: The request timed out
+            TransportError: The request failed
+
+        Returns:
+            Response -- The server response
+        """
+        raise NotImplementedError()
+
+    def stream(self,
+               url: str,
+               data: bytes,
+               headers: Headers,
+               timeout: float = None) -> AsyncIterator[StreamedResponse]:
+        """Sends a POST request without reading the body.
+        Use as an async context manager, the connection is released on exit
+
+        Arguments:
+            url {str} -- URL to POST to
+            data {bytes} -- The request body
+            headers {Headers} -- Header dictionary
+
+        Keyword Arguments:
+            timeout {float} -- Seconds until the request is given up,
+            uses the transport's default if not set (default: {None})
+
+        Raises:
+            TransportTimeout: The request timed out
+            TransportError: The request failed
+
+        Returns:
+            StreamedResponse -- The server response
+        """
+        raise NotImplementedError()
+
+    async def close(self):
+        """Closes all open connections"""
+
+class RequestsTransport(Transport):
+    """Runs blocking requests calls in a thread pool and shares one session,
+    so connections are kept alive between requests"""
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, pool_size: int = DEFAULT_POOL_SIZE):
+        global requests, urllib3
+        import requests
+        import requests.adapters
+        import urllib3
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # One thread per pooled connection
+        self._executor = ThreadPoolExecutor(max_workers=pool_size)
+
+    def _post(self,
+              url: str,
+              data: bytes,
+              headers: Headers,
+              timeout: float,
+              cancelled: threading.Event) -> Response:
+        """Sends the request and reads the body in chunks until done or cancelled
+
+        Arguments:
+            url {str} -- URL to POST to
+            data {bytes} -- The request body
+            headers {Headers} -- Header dictionary
+            timeout {float} -- Seconds until the request is given up
+            cancelled {threading.Event} -- Set by the event loop if the request was cancelled
+
+        Returns:
+            Response -- The server response, None if cancelled
+        """
+        try:
+            with self.session.post(url, data=data, headers=headers, timeout=timeout, stream=True) as resp:
+                chunks = []
+                # Raw bytes, so the received size is known
+                for chunk in resp.raw.stream(CHUNK_SIZE, decode_content=False):
+                    if cancelled.is_set():
+                        # Leaving the with block closes the connection
+                        # instead of reading the rest of the body
+                        LOGGER.debug(f'Request to {url} cancelled')
+                        return None
+                    chunks.append(chunk)
+                content = b''.join(chunks)
+                return Response(resp.status_code,
+                                resp.headers,
+                                decompress(resp.headers, content),
+                                resp.encoding,
+                                len(content))
+        except (requests.Timeout, urllib3.exceptions.TimeoutError) as timeout_exception:
+            raise TransportTimeout(url) from timeout_exception
+        except (requests.RequestException, urllib3.exceptions.HTTPError) as request_exception:
+            raise TransportError(request_exception) from request_exception
+
+    async def post(self,
+                   url: str,
+                   data: bytes,
+                   headers: Headers,
+                   timeout: float = None) -> Response:
+        cancelled = threading.Event()
+        loop = asyncio.get_event_loop()
+        # run_in_executor doesn't take keyword arguments
+        future = loop.run_in_executor(
+            self._executor,
+            self._post,
+            url,
+            data,
+            dict(headers, **{'Accept-Encoding': ACCEPT_ENCODING}),
+            timeout or self.timeout,
+            cancelled)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # The thread can't be interrupted while it's waiting for the server,
+            # but it stops reading and drops the connection as soon as it can
+            cancelled.set()
+            raise
+
+    def _open(self, url: str, data: bytes, headers: Headers, timeout: float) -> 'requests.Response':
+        try:
+            return self.session.post(url, data=data, headers=headers, timeout=timeout, stream=True)
+        except requests.Timeout as timeout_exception:
+            raise TransportTimeout(url) from timeout_exception
+        except requests.RequestException as request_exception:
+            raise TransportError(request_exception) from request_exception
+
+    @staticmethod
+    def _next_chunk(url: str, chunks) -> bytes:
+        try:
+            return next(chunks, None)
+        except (requests.Timeout, urllib3.exceptions.TimeoutError) as timeout_exception:
+            raise TransportTimeout(url) from timeout_exception
+        except (requests.RequestException, urllib3.exceptions.HTTPError) as request_exception:
+            raise TransportError(request_exception) from request_exception
+
+    @contextlib.asynccontextmanager
+    async def stream(self,
+                     url: str,
+                     data: bytes,
+                     headers: Headers,
+                     timeout: float = None) -> AsyncIterator[StreamedResponse]:
+        loop = asyncio.get_event_loop()
+        headers = dict(headers, **{'Accept-Encoding': ACCEPT_ENCODING})
+        # The thread's future still gets the response after the awaiting task is cancelled
+        opening = self._executor.submit(self._open, url, data, headers, timeout or self.timeout)
+        try:
+            resp = await asyncio.wrap_future(opening, loop=loop)
+        except asyncio.CancelledError:
+            # Release the connection once the thread got its response
+            opening.add_done_callback(
+                lambda f: not f.cancelled() and f.exception() is None and f.result().close())
+            raise
+        chunks = resp.raw.stream(CHUNK_SIZE, decode_content=False)
+
+        async def iter_chunks():
+            while True:
+                chunk = await loop.run_in_executor(self._executor, self._next_chunk, url, chunks)
+                if chunk is None:
+                    return
+                yield chunk
+        try:
+            yield StreamedResponse(resp.status_code, resp.headers, iter_chunks(), resp.encoding)
+        finally:
+            resp.close()
+
+    async def close(self):
+        self.session.close()
+        self._executor.shutdown(wait=False)
+
+class AiohttpTransport(Transport):
+    """Natively async transport with a keep-alive connection pool"""
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, pool_size: int = DEFAULT_POOL_SIZE):
+        if not AIOHTTP_AVAILABLE:
+            raise RuntimeError('aiohttp is not installed')
+        global aiohttp
+        import aiohttp
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.session = None
+
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        # The session has to be created inside the running event loop
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size)
+            # Bodies are decompressed by StreamedResponse and post(),
+            # so the received size can be measured
+            self.session = aiohttp.ClientSession(connector=connector, auto_decompress=False)
+        return self.session
+
+    async def post(self,
+                   url: str,
+                   data: bytes,
+                   headers: Headers,
+                   timeout: float = None) -> Response:
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+        headers = dict(headers, **{'Accept-Encoding': ACCEPT_ENCODING})
+        try:
+            async with self._get_session().post(
+                    url, data=data, headers=headers, timeout=client_timeout) as resp:
+                content = await resp.read()
+                return Response(resp.status,
+                                resp.headers,
+                                decompress(resp.headers, content),
+                                resp.charset,
+                                len(content))
+        except asyncio.TimeoutError as timeout_exception:
+            raise TransportTimeout(url) from timeout_exception
+        except aiohttp.ClientError as client_exception:
+            raise TransportError(client_exception) from client_exception
+
+    @contextlib.asynccontextmanager
+    async def stream(self,
+                     url: str,
+                     data: bytes,
+                     headers: Headers,
+                     timeout: float = None) -> AsyncIterator[StreamedResponse]:
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+        headers = dict(headers, **{'Accept-Encoding': ACCEPT_ENCODING})
+
+        async def iter_chunks(resp):
+            try:
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    yield chunk
+            except asyncio.TimeoutError as timeout_exception:
+                raise TransportTimeout(url) from timeout_exception
+            except aiohttp.ClientError as client_exception:
+                raise TransportError(client_exception) from client_exception
+        try:
+            request = self._get_session().post(
+                url, data=data, headers=headers, timeout=client_timeout)
+            resp = await request.__aenter__()
+        except asyncio.TimeoutError as timeout_exception:
+            raise TransportTimeout(url) from timeout_exception
+        except aiohttp.ClientError as client_exception:
+            raise TransportError(client_exception) from client_exception
+        try:
+            yield StreamedResponse(resp.status, resp.headers, iter_chunks(resp), resp.charset)
+        finally:
+            resp.release()
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+def default_transport(timeout: float = DEFAULT_TIMEOUT, pool_size: int = DEFAULT_POOL_SIZE) -> Transport:
+    """Returns the natively async transport if aiohttp is installed,
+    otherwise falls back to requests
+
+    Keyword Arguments:
+        timeout {float} -- Default seconds until a request is given up (default: {DEFAULT_TIMEOUT})
+        pool_size {int} -- Maximum number of open connections (default: {DEFAULT_POOL_SIZE})
+
+    Returns:
+        Transport -- A new transport
+    """
+    if AIOHTTP_AVAILABLE:
+        return AiohttpTransport(timeout, pool_size)
+    return RequestsTransport(timeout, pool_size)
+
+class TransportError(Exception):
+    """The request could not be completed"""
+
+class TransportTimeout(TransportError):
+    """The request timed out"""
+    url = None
+    def __init__(self, url):
+        self.url = url
+        super().__init__(f'Request to {url} timed out')
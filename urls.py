@@ -0,0 +1,64 @@
+"""URL normalization, so the same page is recognized behind different URLs"""
+
+from urllib import parse
+
+# Query parameters which only track where a visitor came from
+TRACKING_PARAMETERS = frozenset((
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid', 'ref_src', '_hsenc', '_hsmi'))
+TRACKING_PREFIXES = ('utm_',)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _is_tracking_parameter(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMETERS or name.startswith(TRACKING_PREFIXES)
+
+def canonicalize_url(url: str) -> str:
+    """Normalizes a URL: lower case scheme and host without www. and default port,
+    no fragment, no trailing slash, tracking parameters removed and the query sorted.
+    http and https are treated as the same page
+
+    Arguments:
+        url {str} -- The URL
+
+    Returns:
+        str -- The canonical URL, the input if it can't be parsed
+    """
+    if not url:
+        return url
+    try:
+        parts = parse.urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme in DEFAULT_PORTS:
+        scheme = 'https'
+    host = (parts.hostname or '').rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    netloc = host
+    if port is not None and port != DEFAULT_PORTS.get(parts.scheme.lower()):
+        netloc += f':{port}'
+    path = parts.path.rstrip('/') if parts.path != '/' else ''
+    query = sorted((name, value)
+                   for name, value in parse.parse_qsl(parts.query, keep_blank_values=True)
+                   if not _is_tracking_parameter(name))
+    return parse.urlunsplit((scheme, netloc, path, parse.urlencode(query), ''))
+
+def url_domain(url: str) -> str:
+    """Returns the host of a URL without www.
+
+    Arguments:
+        url {str} -- The URL
+
+    Returns:
+        str -- The lower case domain, empty if there is none
+    """
+    try:
+        host = parse.urlsplit(url or '').hostname or ''
+    except ValueError:
+        return ''
+    host = host.rstrip('.')
+    return host[4:] if host.startswith('www.') else host
@@ -0,0 +1,117 @@
+"""Polls Pocket for changes of the list in the background"""
+
+import asyncio
+import logging
+from typing import Callable
+import pocket
+
+LOGGER = logging.getLogger(__name__)
+
+# Seconds between polls while changes are arriving, and after a long idle time
+DEFAULT_MIN_INTERVAL = 15.0
+DEFAULT_MAX_INTERVAL = 300.0
+# Factor the interval grows by after every poll without changes
+DEFAULT_BACKOFF = 2.0
+
+
+class ListWatcher:
+    """Polls for the items changed since the last poll, using the since parameter of /get.
+    Polls come quickly while the list is changing and slow down while it's idle.
+    With a store, the store is synced, otherwise the polls start at the last complete listing"""
+
+    def __init__(self,
+                 app: pocket.Pocket,
+                 on_change: Callable[[pocket.SyncResult], None],
+                 min_interval: float = DEFAULT_MIN_INTERVAL,
+                 max_interval: float = DEFAULT_MAX_INTERVAL,
+                 backoff: float = DEFAULT_BACKOFF):
+        """
+        Arguments:
+            app {pocket.Pocket} -- The pocket instance
+            on_change {Callable[[pocket.SyncResult], None]} -- Called with the changes of every poll that found some
+
+        Keyword Arguments:
+            min_interval {float} -- Seconds between polls while changes are arriving (default: {DEFAULT_MIN_INTERVAL})
+            max_interval {float} -- Longest time between polls in seconds (default: {DEFAULT_MAX_INTERVAL})
+            backoff {float} -- Factor the interval grows by after a poll without changes (default: {DEFAULT_BACKOFF})
+        """
+        self.app = app
+        self.on_change = on_change
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        # Server timestamp the next poll starts at, if there is no store
+        self.since = None
+        self.polls = 0
+        self._wakeup = None
+        self._task = None
+
+    async def poll(self) -> pocket.SyncResult:
+        """Fetches the changes since the last poll
+
+        Returns:
+            pocket.SyncResult -- The changes, empty if the list hasn't been loaded completely yet
+        """
+        self.polls += 1
+        if self.app.store is not None:
+            return await self.app.sync()
+        since = self.since if self.since is not None else self.app.listed_since
+        if since is None:
+            return pocket.SyncResult()
+        result = await self.app.fetch_changes(since)
+        self.since = result.since or since
+        return result
+
+    def _adapt_interval(self, changed: bool):
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+
+    def wake(self):
+        """Polls right away, e.g. after the list was changed"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self):
+        """Polls until cancelled. Failed polls are logged and count as polls without changes"""
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                result = await self.poll()
+            except pocket.PocketException as exception:
+                LOGGER.warning(f'Polling for changes failed: {exception}')
+                self._adapt_interval(False)
+                continue
+            except Exception:
+                # Unexpected, but the watcher must keep running. Cancelling isn't caught,
+                # CancelledError is no Exception
+                LOGGER.exception('Polling for changes failed')
+                self._adapt_interval(False)
+                continue
+            self._adapt_interval(bool(result.articles))
+            LOGGER.debug(f'{len(result.articles)} items changed, next poll in {self.interval:.0f}s')
+            if result.articles:
+                self.on_change(result)
+
+    def start(self) -> asyncio.Task:
+        """Starts polling in the background
+
+        Returns:
+            asyncio.Task -- The polling task
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    def stop(self):
+        """Stops polling"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None